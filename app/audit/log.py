@@ -0,0 +1,114 @@
+import asyncio
+import json
+import logging
+import typing
+from datetime import UTC, datetime
+
+from app.audit.models import AuditLogModel
+from app.web.logger import request_log_context
+
+if typing.TYPE_CHECKING:
+    from app.store.store import Store
+
+logger = logging.getLogger(__name__)
+
+# occurred_at, admin_id, action, entity, entity_id, details, request_id
+AuditEvent = tuple[datetime, int | None, str, str, int | None, str | None, str | None]
+AUDIT_COLUMNS = (
+    "occurred_at", "admin_id", "action", "entity", "entity_id", "details", "request_id"
+)
+
+
+class AuditLog:
+    """Buffers admin actions in memory and writes them to audit_log in batches with COPY.
+
+    A batch goes out when AUDIT_BATCH_SIZE events are waiting or AUDIT_FLUSH_INTERVAL
+    after its first event, so a mutation never pays for its audit row. When the
+    buffer is full, recording waits for room, which slows the writers down to what
+    the database takes, and after AUDIT_ENQUEUE_TIMEOUT the event is dropped and
+    logged. Whatever is buffered is written on shutdown.
+    """
+
+    def __init__(self, store: "Store") -> None:
+        self.store = store
+        self.written_total = 0
+        self.dropped_total = 0
+        self._queue: asyncio.Queue[AuditEvent] = asyncio.Queue(store.config.AUDIT_MAX_PENDING)
+        # The batch being written, kept here so shutdown can finish it
+        self._batch: list[AuditEvent] = []
+        self._flusher: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() + len(self._batch)
+
+    async def record(
+        self,
+        admin_id: int | None,
+        action: str,
+        entity: str,
+        entity_id: int | None = None,
+        details: dict[str, typing.Any] | None = None,
+    ) -> None:
+        context = request_log_context.get()
+        event = (
+            datetime.now(UTC),
+            admin_id,
+            action,
+            entity,
+            entity_id,
+            None if details is None else json.dumps(details, default=str),
+            context.request_id if context is not None else None,
+        )
+        try:
+            async with asyncio.timeout(self.store.config.AUDIT_ENQUEUE_TIMEOUT):
+                await self._queue.put(event)
+        except TimeoutError:
+            self.dropped_total += 1
+            logger.error("Audit buffer is full, event dropped: %s", event)
+
+    async def start(self) -> None:
+        self._flusher = asyncio.create_task(self._flush_forever(), name="audit-flusher")
+
+    async def stop(self) -> None:
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        pending = self._batch
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        size = self.store.config.AUDIT_BATCH_SIZE
+        for start in range(0, len(pending), size):
+            await self._write(pending[start:start + size])
+        self._batch = []
+        logger.info("Audit log stopped, [%s] event(s) written on shutdown", len(pending))
+
+    async def _flush_forever(self) -> None:
+        config = self.store.config
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch = [await self._queue.get()]
+            deadline = loop.time() + config.AUDIT_FLUSH_INTERVAL
+            try:
+                async with asyncio.timeout_at(deadline):
+                    while len(self._batch) < config.AUDIT_BATCH_SIZE:
+                        self._batch.append(await self._queue.get())
+            except TimeoutError:
+                pass
+            try:
+                await self._write(self._batch)
+            except Exception as e:
+                self.dropped_total += len(self._batch)
+                logger.error("Failed to write [%s] audit event(s)", len(self._batch), exc_info=e)
+            # Cleared before the next await, so a cancelled write is the only one redone
+            self._batch = []
+
+    async def _write(self, batch: list[AuditEvent]) -> None:
+        async with self.store.database.engine.connect() as connection:
+            raw = await connection.get_raw_connection()
+            # COPY runs in its own implicit transaction on the asyncpg connection
+            await raw.driver_connection.copy_records_to_table(
+                AuditLogModel.__tablename__, records=batch, columns=AUDIT_COLUMNS
+            )
+        self.written_total += len(batch)
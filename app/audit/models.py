@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.store.db.sqlalchemy_db import BaseModel
+
+
+class AuditLogModel(BaseModel):
+    """Admin actions, written in batches by app.audit.log.AuditLog.
+
+    No foreign keys, the trail outlives the admins and entities it mentions.
+    """
+
+    __tablename__ = "audit_log"
+
+    audit_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    # When the action happened, not when its batch was flushed
+    occurred_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    admin_id: Mapped[int | None] = mapped_column(nullable=True)
+    action: Mapped[str] = mapped_column(nullable=False)
+    entity: Mapped[str] = mapped_column(nullable=False)
+    entity_id: Mapped[int | None] = mapped_column(nullable=True)
+    details: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    request_id: Mapped[str | None] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        Index("ix_audit_log_entity", "entity", "entity_id", "occurred_at"),
+        Index("ix_audit_log_admin", "admin_id", "occurred_at"),
+    )
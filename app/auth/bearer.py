@@ -7,6 +7,7 @@ from app.admin.schemes import AdminScheme
 from app.auth.service import decode_token
 from app.web.config import Config
 from app.web.exceptions import AccessTokenNotFoundError, InvalidAccessTokenError
+from app.web.logger import request_log_context
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +21,11 @@ class AccessTokenBearer(HTTPBearer):
         token_data = decode_token(token, config)
         if token_data is None:
             raise InvalidAccessTokenError
-        return AdminScheme(**token_data["current_user"])
+        admin = AdminScheme(**token_data["current_user"])
+        context = request_log_context.get()
+        if context is not None:
+            context.admin_id = admin.admin_id
+        return admin
 
 
 class RefreshTokenBearer(HTTPBearer):
@@ -12,12 +12,13 @@ from app.admin.schemes import AdminRegisterScheme, AdminScheme
 from app.auth.bearer import RefreshTokenBearer
 from app.auth.schemes import TokenScheme
 from app.auth.service import create_access_token, hash_password, verify_password
+from app.monitoring.tracing import TracedRoute
 from app.web.config import Config
 from app.web.dependencies import get_admin_repo, get_config, get_session
 from app.web.exceptions import EmailAlreadyTakenError, InvalidCredentialsError
 from app.web.utils import ResponseScheme
 
-router = APIRouter(prefix="/auth")
+router = APIRouter(prefix="/auth", route_class=TracedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -0,0 +1,44 @@
+from datetime import datetime
+from enum import StrEnum
+
+from sqlalchemy import BigInteger, ForeignKey, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.store.db.sqlalchemy_db import BaseModel
+
+
+class JobStatus(StrEnum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class JobModel(BaseModel):
+    __tablename__ = "jobs"
+
+    job_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    kind: Mapped[str] = mapped_column(nullable=False)
+    params: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    status: Mapped[str] = mapped_column(nullable=False, default=JobStatus.QUEUED)
+    progress: Mapped[float] = mapped_column(nullable=False, default=0.0)
+    result_file: Mapped[str | None] = mapped_column(nullable=True, default=None)
+    error: Mapped[str | None] = mapped_column(nullable=True, default=None)
+    created_by: Mapped[int | None] = mapped_column(
+        ForeignKey("admins.admin_id", ondelete="SET NULL"), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+    started_at: Mapped[datetime | None] = mapped_column(nullable=True, default=None)
+    finished_at: Mapped[datetime | None] = mapped_column(nullable=True, default=None)
+    # Heartbeat of a running job, bumped every JOB_HEARTBEAT_INTERVAL and on progress
+    updated_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_jobs_queued", "job_id", postgresql_where=text("status = 'queued'")),
+        Index(
+            "ix_jobs_running_updated_at",
+            "updated_at",
+            postgresql_where=text("status = 'running'"),
+        ),
+    )
@@ -0,0 +1,138 @@
+import logging
+import typing
+from collections.abc import Collection
+from datetime import timedelta
+
+from sqlalchemy import ColumnElement, and_, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.jobs.models import JobModel, JobStatus
+from app.jobs.schemes import JobCreateScheme
+
+if typing.TYPE_CHECKING:
+    from app.store.store import Store
+
+
+logger = logging.getLogger(__name__)
+
+
+class JobRepository:
+    def __init__(self, store: "Store") -> None:
+        self.store = store
+
+    async def add_job(
+        self, session: AsyncSession, data_job: JobCreateScheme, admin_id: int | None
+    ) -> JobModel:
+        job = JobModel(kind=data_job.kind, params=data_job.params, created_by=admin_id)
+        session.add(job)
+        await session.commit()
+        return job
+
+    async def get_job(self, session: AsyncSession, job_id: int) -> JobModel | None:
+        return await session.get(JobModel, job_id)
+
+    async def claim_job(self, session: AsyncSession, kinds: Collection[str]) -> JobModel | None:
+        """Mark the oldest queued job as running and return it, None when there is none.
+
+        Jobs taken by other workers are locked and skipped, so each one runs once.
+        """
+        queued = (
+            select(JobModel.job_id)
+            .where(and_(JobModel.status == JobStatus.QUEUED, JobModel.kind.in_(kinds)))
+            .order_by(JobModel.job_id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stm = (
+            update(JobModel)
+            .where(JobModel.job_id == queued)
+            .values(status=JobStatus.RUNNING, started_at=func.now(), updated_at=func.now())
+            .returning(JobModel)
+            # started_at identifies the attempt, a job already in the session must get it too
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        job = await session.scalar(stm)
+        await session.commit()
+        return job
+
+    def _owned(self, job: JobModel) -> ColumnElement[bool]:
+        """The job is still running as the attempt that claimed it.
+
+        started_at is set anew by every claim, so it tells the attempts apart: once a
+        job is requeued, the writes of its previous attempt match nothing.
+        """
+        return and_(
+            JobModel.job_id == job.job_id,
+            JobModel.status == JobStatus.RUNNING,
+            JobModel.started_at == job.started_at,
+        )
+
+    async def touch_job(self, session: AsyncSession, job: JobModel) -> bool:
+        """Heartbeat of a running job, False once it is no longer this attempt's."""
+        stm = update(JobModel).where(self._owned(job)).values(updated_at=func.now())
+        result = await session.execute(stm)
+        await session.commit()
+        return bool(result.rowcount)
+
+    async def set_progress(self, session: AsyncSession, job: JobModel, progress: float) -> None:
+        stm = (
+            update(JobModel)
+            .where(self._owned(job))
+            .values(progress=progress, updated_at=func.now())
+        )
+        await session.execute(stm)
+        await session.commit()
+
+    async def finish_job(self, session: AsyncSession, job: JobModel, result_file: str) -> bool:
+        stm = (
+            update(JobModel)
+            .where(self._owned(job))
+            .values(
+                status=JobStatus.SUCCEEDED,
+                progress=1.0,
+                result_file=result_file,
+                finished_at=func.now(),
+                updated_at=func.now(),
+            )
+        )
+        result = await session.execute(stm)
+        await session.commit()
+        return bool(result.rowcount)
+
+    async def fail_job(self, session: AsyncSession, job: JobModel, error: str) -> bool:
+        stm = (
+            update(JobModel)
+            .where(self._owned(job))
+            .values(
+                status=JobStatus.FAILED, error=error, finished_at=func.now(), updated_at=func.now()
+            )
+        )
+        result = await session.execute(stm)
+        await session.commit()
+        return bool(result.rowcount)
+
+    async def requeue_job(self, session: AsyncSession, job: JobModel) -> None:
+        stm = (
+            update(JobModel)
+            .where(self._owned(job))
+            .values(status=JobStatus.QUEUED, progress=0.0, started_at=None, updated_at=func.now())
+        )
+        await session.execute(stm)
+        await session.commit()
+
+    async def requeue_stale_jobs(self, session: AsyncSession) -> None:
+        """Put back in the queue running jobs whose heartbeat stopped, e.g. the worker crashed."""
+        stale_after = timedelta(seconds=self.store.config.JOB_STALE_AFTER)
+        stm = (
+            update(JobModel)
+            .where(and_(
+                JobModel.status == JobStatus.RUNNING,
+                JobModel.updated_at < func.now() - stale_after,
+            ))
+            .values(status=JobStatus.QUEUED, progress=0.0, started_at=None, updated_at=func.now())
+        )
+        result = await session.execute(stm)
+        await session.commit()
+        if result.rowcount:
+            logger.warning("Requeued [%s] stale job(s)", result.rowcount)
@@ -0,0 +1,72 @@
+import logging
+import os
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.admin.schemes import AdminScheme
+from app.auth.bearer import AccessTokenBearer
+from app.jobs.models import JobStatus
+from app.jobs.repository import JobRepository
+from app.jobs.schemes import JobCreateScheme, JobReadScheme
+from app.monitoring.tracing import TracedRoute
+from app.store.store import Store
+from app.web.dependencies import get_job_repo, get_session, get_store
+from app.web.exceptions import JobNotFinishedError, JobNotFoundError, UnknownJobKindError
+from app.web.utils import ResponseScheme
+
+router = APIRouter(prefix="/jobs", route_class=TracedRoute)
+logger = logging.getLogger(__name__)
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    data_job: JobCreateScheme,
+    store: Annotated[Store, Depends(get_store)],
+    repository: Annotated[JobRepository, Depends(get_job_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> ResponseScheme[JobReadScheme]:
+    if data_job.kind not in store.job_runner.kinds:
+        logger.warning("Unknown job kind: [%s]", data_job.kind)
+        raise UnknownJobKindError(data_job.kind, store.job_runner.kinds)
+    job = await repository.add_job(session, data_job, current_user.admin_id)
+    store.job_runner.notify()
+    logger.info("Job ID: [%s] of kind [%s] queued", job.job_id, job.kind)
+    return ResponseScheme(data=job)
+
+
+@router.get("/{job_id}", status_code=status.HTTP_200_OK)
+async def get_job(
+    job_id: int,
+    repository: Annotated[JobRepository, Depends(get_job_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> ResponseScheme[JobReadScheme]:
+    job = await repository.get_job(session, job_id)
+    if job is None:
+        logger.warning("There is no job with this ID: [%s]", job_id)
+        raise JobNotFoundError(job_id)
+    return ResponseScheme(data=job)
+
+
+@router.get("/{job_id}/result", status_code=status.HTTP_200_OK, response_class=FileResponse)
+async def download_job_result(
+    job_id: int,
+    repository: Annotated[JobRepository, Depends(get_job_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> FileResponse:
+    job = await repository.get_job(session, job_id)
+    if job is None:
+        logger.warning("There is no job with this ID: [%s]", job_id)
+        raise JobNotFoundError(job_id)
+    if job.status != JobStatus.SUCCEEDED or job.result_file is None:
+        logger.warning("Job ID: [%s] has no result, status: [%s]", job_id, job.status)
+        raise JobNotFinishedError(job_id, job.status)
+    # Sent in chunks from the file, the report is never loaded in memory
+    return FileResponse(
+        job.result_file, media_type="text/csv", filename=os.path.basename(job.result_file)
+    )
@@ -0,0 +1,158 @@
+import asyncio
+import csv
+import logging
+import os
+import time
+import typing
+from collections.abc import Awaitable, Callable, Iterable, Sequence
+from contextlib import suppress
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.jobs.models import JobModel
+
+if typing.TYPE_CHECKING:
+    from app.store.store import Store
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[["JobContext"], Awaitable[None]]
+
+
+class JobContext:
+    """What a running job gets: its parameters, a CSV result writer and progress reporting."""
+
+    def __init__(self, runner: "JobRunner", job: JobModel, writer: typing.Any) -> None:
+        self.store = runner.store
+        self.job = job
+        self.params = job.params
+        self._runner = runner
+        self._writer = writer
+        self._reported_at = time.monotonic()
+
+    def session(self) -> AsyncSession:
+        return self.store.database.session_maker()
+
+    async def write_rows(self, rows: Iterable[Sequence[typing.Any]]) -> None:
+        await asyncio.to_thread(self._writer.writerows, rows)
+
+    async def report_progress(self, done: int, total: int) -> None:
+        """Store how far the job got, at most every JOB_PROGRESS_INTERVAL seconds."""
+        now = time.monotonic()
+        if now - self._reported_at < self.store.config.JOB_PROGRESS_INTERVAL:
+            return
+        self._reported_at = now
+        async with self.session() as session:
+            await self.store.job_repo.set_progress(
+                session, self.job, min(done / total, 1.0) if total else 0.0
+            )
+
+
+class JobRunner:
+    """Runs heavy reports in the background, off the request path.
+
+    Jobs are rows of the jobs table, so they survive restarts and any worker
+    process may take them: each of the JOB_WORKERS tasks of a process claims
+    the oldest queued job with FOR UPDATE SKIP LOCKED. Results are CSV files
+    in JOB_RESULTS_DIR, written under a temporary name and renamed when done.
+    A running job sends a heartbeat every JOB_HEARTBEAT_INTERVAL, however long
+    its steps take, and only the jobs that stop sending it are requeued.
+    """
+
+    def __init__(self, store: "Store") -> None:
+        self.store = store
+        self._jobs: dict[str, JobFunc] = {}
+        self._workers: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def add_job(self, kind: str, func: JobFunc) -> None:
+        self._jobs[kind] = func
+
+    @property
+    def kinds(self) -> list[str]:
+        return list(self._jobs)
+
+    def notify(self) -> None:
+        """Wake up an idle worker of this process, e.g. right after a job was queued."""
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        os.makedirs(self.store.config.JOB_RESULTS_DIR, exist_ok=True)
+        for number in range(self.store.config.JOB_WORKERS):
+            self._workers.append(asyncio.create_task(self._work(), name=f"job-worker-{number}"))
+        logger.info("Job runner started with %s worker(s)", len(self._workers))
+
+    async def stop(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+        logger.info("Job runner stopped")
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                async with self.store.database.session_maker() as session:
+                    job = await self.store.job_repo.claim_job(session, self.kinds)
+            except Exception as e:
+                logger.error("Failed to claim a job", exc_info=e)
+                job = None
+            if job is not None:
+                await self._run(job)
+                continue
+            with suppress(TimeoutError):
+                async with asyncio.timeout(self.store.config.JOB_POLL_INTERVAL):
+                    await self._wakeup.wait()
+            self._wakeup.clear()
+
+    async def _run(self, job: JobModel) -> None:
+        repository = self.store.job_repo
+        path = os.path.join(self.store.config.JOB_RESULTS_DIR, f"{job.job_id}-{job.kind}.csv")
+        partial = f"{path}.part"
+        logger.info("Job ID: [%s] of kind [%s] started", job.job_id, job.kind)
+        heartbeat = asyncio.create_task(self._heartbeat(job), name=f"job-heartbeat-{job.job_id}")
+        try:
+            try:
+                file = await asyncio.to_thread(open, partial, "w", newline="", encoding="utf-8")
+                try:
+                    await self._jobs[job.kind](JobContext(self, job, csv.writer(file)))
+                finally:
+                    await asyncio.to_thread(file.close)
+                await asyncio.to_thread(os.replace, partial, path)
+            except BaseException:
+                # No half-written result is left behind, whether the job failed or was interrupted
+                with suppress(FileNotFoundError):
+                    await asyncio.to_thread(os.unlink, partial)
+                raise
+            async with self.store.database.session_maker() as session:
+                finished = await repository.finish_job(session, job, path)
+            if finished:
+                logger.info("Job ID: [%s] finished", job.job_id)
+            else:
+                logger.warning("Job ID: [%s] finished after it was requeued", job.job_id)
+        except asyncio.CancelledError:
+            # Shutting down, another worker runs it from the start
+            async with self.store.database.session_maker() as session:
+                await repository.requeue_job(session, job)
+            logger.info("Job ID: [%s] interrupted and requeued", job.job_id)
+            raise
+        except Exception as e:
+            logger.error("Job ID: [%s] failed", job.job_id, exc_info=e)
+            async with self.store.database.session_maker() as session:
+                await repository.fail_job(session, job, f"{e.__class__.__name__}: {e}")
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+
+    async def _heartbeat(self, job: JobModel) -> None:
+        while True:
+            await asyncio.sleep(self.store.config.JOB_HEARTBEAT_INTERVAL)
+            try:
+                async with self.store.database.session_maker() as session:
+                    alive = await self.store.job_repo.touch_job(session, job)
+            except Exception as e:
+                logger.error("Heartbeat of job ID: [%s] failed", job.job_id, exc_info=e)
+                continue
+            if not alive:
+                logger.warning("Job ID: [%s] was requeued while running", job.job_id)
+                return
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from pydantic import Field
+
+from app.base.schemes import BaseScheme
+
+
+class JobCreateScheme(BaseScheme):
+    kind: str
+    params: dict = Field(default_factory=dict)
+
+
+class JobReadScheme(BaseScheme):
+    job_id: int
+    kind: str
+    params: dict
+    status: str
+    progress: float
+    error: str | None
+    created_at: datetime
+    started_at: datetime | None
+    finished_at: datetime | None
@@ -0,0 +1,115 @@
+import bisect
+import logging
+import typing
+from collections.abc import Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.library.models import AuthorModel, BookModel
+
+if typing.TYPE_CHECKING:
+    from app.store.store import Store
+
+logger = logging.getLogger(__name__)
+
+AutocompleteKind = typing.Literal["book", "author"]
+# (normalized text, kind, id), kept sorted so a prefix is a contiguous slice
+Entry = tuple[str, AutocompleteKind, int]
+
+# Change log entity -> (kind, column holding the text)
+SOURCES: dict[str, tuple[AutocompleteKind, str]] = {
+    BookModel.__tablename__: ("book", "title"),
+    AuthorModel.__tablename__: ("author", "name"),
+}
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """Book titles and author names in a sorted list, looked up with bisect."""
+
+    def __init__(self) -> None:
+        self._entries: list[Entry] = []
+        self._texts: dict[tuple[AutocompleteKind, int], str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self, items: Iterable[tuple[AutocompleteKind, int, str]]) -> None:
+        texts = {(kind, item_id): text for kind, item_id, text in items}
+        self._entries = sorted(
+            (normalize(text), kind, item_id) for (kind, item_id), text in texts.items()
+        )
+        self._texts = texts
+
+    def put(self, kind: AutocompleteKind, item_id: int, text: str) -> None:
+        self.remove(kind, item_id)
+        bisect.insort(self._entries, (normalize(text), kind, item_id))
+        self._texts[kind, item_id] = text
+
+    def remove(self, kind: AutocompleteKind, item_id: int) -> None:
+        text = self._texts.pop((kind, item_id), None)
+        if text is None:
+            return
+        entry = (normalize(text), kind, item_id)
+        position = bisect.bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def lookup(self, prefix: str, limit: int) -> list[tuple[AutocompleteKind, int, str]]:
+        key = normalize(prefix)
+        # (key,) sorts right before every entry starting with key
+        position = bisect.bisect_left(self._entries, (key,))
+        found = []
+        for text, kind, item_id in self._entries[position:position + limit]:
+            if not text.startswith(key):
+                break
+            found.append((kind, item_id, self._texts[kind, item_id]))
+        return found
+
+
+class Autocomplete:
+    """Type-ahead over book titles and author names, answered from process memory.
+
+    The index is loaded on the first refresh and then follows the change log, so
+    every worker process catches up with edits within AUTOCOMPLETE_REFRESH_INTERVAL.
+    Until it is loaded, and for queries it cannot answer, LibraryRepository.search_names
+    goes to the trigram indexes instead.
+    """
+
+    def __init__(self, store: "Store") -> None:
+        self.store = store
+        self.index = PrefixIndex()
+        self.loaded = False
+        self._cursor = (0, 0)
+
+    def lookup(self, prefix: str, limit: int) -> list[tuple[AutocompleteKind, int, str]] | None:
+        """Matches from memory, None when the database has to answer."""
+        config = self.store.config
+        if not self.loaded or len(prefix) > config.AUTOCOMPLETE_MEMORY_MAX_PREFIX:
+            return None
+        return self.index.lookup(prefix, limit)
+
+    async def refresh(self, session: AsyncSession) -> None:
+        repository = self.store.library_repo
+        if not self.loaded:
+            # Changes from here on are replayed over the load, they are full row snapshots
+            self._cursor = (await repository.get_change_log_horizon(session), 0)
+            self.index.load(await repository.get_catalogue_names(session))
+            self.loaded = True
+            logger.info("Autocomplete index loaded with [%s] entries", len(self.index))
+        batch_size = self.store.config.AUTOCOMPLETE_REFRESH_BATCH_SIZE
+        while True:
+            changes = await repository.get_changes(session, self._cursor, batch_size, SOURCES)
+            for change in changes:
+                kind, column = SOURCES[change.entity]
+                if change.operation == "delete" or change.payload is None:
+                    self.index.remove(kind, change.entity_id)
+                else:
+                    self.index.put(kind, change.entity_id, change.payload[column])
+            if changes:
+                self._cursor = (changes[-1].txid, changes[-1].change_id)
+            if len(changes) < batch_size:
+                return
@@ -1,6 +1,16 @@
-from datetime import datetime
+from datetime import date, datetime
+from enum import StrEnum
 
-from sqlalchemy import CheckConstraint, ForeignKey, func
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    ForeignKey,
+    Index,
+    SmallInteger,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.store.db.sqlalchemy_db import BaseModel
@@ -11,6 +21,17 @@ class AuthorModel(BaseModel):
     author_id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(nullable=False, unique=True)
 
+    __table_args__ = (
+        # Autocomplete fallback, serves ILIKE 'prefix%' and word similarity
+        Index(
+            "ix_authors_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
+    # lazy="raise": related rows are loaded by the query that needs them, never one by one
+    books: Mapped[list["BookModel"]] = relationship(back_populates="author", lazy="raise")
+
 
 class BookModel(BaseModel):
     __tablename__ = "books"
@@ -22,12 +43,22 @@ class BookModel(BaseModel):
     isbn: Mapped[str | None] = mapped_column(nullable=True, unique=True)
     amount: Mapped[int] = mapped_column(nullable=False, default=1)
     description: Mapped[str | None] = mapped_column(nullable=True, server_default="No description")
+    stock_shards: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
 
     __table_args__ = (
         CheckConstraint("amount >= 0", name="ck_books_amount_positive"),
+        Index(
+            "ix_books_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        # Books of an author, in keyset pages
+        Index("ix_books_author_id", "author_id", "book_id"),
     )
 
-    library_cards: Mapped[list["LibraryCardModel"]] = relationship(back_populates="book")
+    author: Mapped["AuthorModel"] = relationship(back_populates="books", lazy="raise")
+    library_cards: Mapped[list["LibraryCardModel"]] = relationship(
+        back_populates="book", lazy="raise"
+    )
 
 
 class ReaderModel(BaseModel):
@@ -37,17 +68,197 @@ class ReaderModel(BaseModel):
     name: Mapped[str] = mapped_column(nullable=False)
     email: Mapped[str] = mapped_column(nullable=False, unique=True)
 
+    __table_args__ = (
+        # Reader search, serves ILIKE '%substring%' on both columns
+        Index(
+            "ix_readers_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_readers_email_trgm", "email",
+            postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+    )
+
     library_cards: Mapped[list["LibraryCardModel"]] = relationship(back_populates="reader")
 
 
 class LibraryCardModel(BaseModel):
+    """A loan. The table is range-partitioned by month of ``borrow_date``.
+
+    The partition key has to be in the primary key, so it is (library_card_id,
+    borrow_date). Ids still come from one sequence and stay unique on their own.
+    Partitions are managed in app.library.partitions.
+    """
+
     __tablename__ = "library_cards"
 
-    library_card_id: Mapped[int] = mapped_column(primary_key=True)
+    library_card_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     reader_id: Mapped[int] = mapped_column(ForeignKey("readers.reader_id"))
     book_id: Mapped[int] = mapped_column(ForeignKey("books.book_id"))
-    borrow_date: Mapped[datetime] = mapped_column(server_default=func.now())
+    borrow_date: Mapped[datetime] = mapped_column(primary_key=True, server_default=func.now())
     return_date: Mapped[datetime | None] = mapped_column(nullable=True, default=None)
+    due_date: Mapped[datetime | None] = mapped_column(nullable=True, default=None)
 
     reader: Mapped["ReaderModel"] = relationship(back_populates="library_cards")
     book: Mapped["BookModel"] = relationship(back_populates="library_cards")
+
+    # Keyset pages of a reader's or a book's history, scanned backwards for newest first
+    __table_args__ = (
+        Index("ix_library_cards_reader_history", "reader_id", "borrow_date", "library_card_id"),
+        Index("ix_library_cards_book_history", "book_id", "borrow_date", "library_card_id"),
+        # Keeps the open loans watermark query off the returned loans
+        Index(
+            "ix_library_cards_open_borrow_date",
+            "borrow_date",
+            postgresql_where=text("return_date IS NULL"),
+        ),
+        # Overdue loans are read off this one, returned loans are not in it
+        Index(
+            "ix_library_cards_open_due_date",
+            "due_date",
+            postgresql_where=text("return_date IS NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (borrow_date)"},
+    )
+
+
+class LibraryCardArchiveModel(BaseModel):
+    """Returned loans moved out of library_cards by the archival job, read by the history."""
+
+    __tablename__ = "library_cards_archive"
+
+    library_card_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    reader_id: Mapped[int] = mapped_column(ForeignKey("readers.reader_id"))
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.book_id"))
+    borrow_date: Mapped[datetime] = mapped_column(nullable=False)
+    return_date: Mapped[datetime] = mapped_column(nullable=False)
+    due_date: Mapped[datetime | None] = mapped_column(nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_library_cards_archive_reader_history",
+            "reader_id",
+            "borrow_date",
+            "library_card_id",
+        ),
+        Index("ix_library_cards_archive_book_history", "book_id", "borrow_date", "library_card_id"),
+    )
+
+
+class BookStockShardModel(BaseModel):
+    __tablename__ = "book_stock_shards"
+
+    book_id: Mapped[int] = mapped_column(
+        ForeignKey("books.book_id", ondelete="CASCADE"), primary_key=True
+    )
+    shard_no: Mapped[int] = mapped_column(primary_key=True)
+    amount: Mapped[int] = mapped_column(nullable=False, default=0)
+
+    __table_args__ = (
+        CheckConstraint("amount >= 0", name="ck_book_stock_shards_amount_positive"),
+    )
+
+
+class ChangeLogModel(BaseModel):
+    __tablename__ = "change_log"
+
+    change_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    txid: Mapped[int] = mapped_column(
+        BigInteger, server_default=text("pg_current_xact_id()::text::bigint")
+    )
+    entity: Mapped[str] = mapped_column(nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    operation: Mapped[str] = mapped_column(nullable=False)
+    payload: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_change_log_cursor", "txid", "change_id"),
+        Index("ix_change_log_entity", "entity", "entity_id", "change_id"),
+        Index("ix_change_log_created_at", "created_at"),
+    )
+
+
+class HoldStatus(StrEnum):
+    WAITING = "waiting"
+    READY = "ready"
+    FULFILLED = "fulfilled"
+    EXPIRED = "expired"
+    CANCELLED = "cancelled"
+
+
+class HoldModel(BaseModel):
+    __tablename__ = "holds"
+
+    hold_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.book_id"))
+    reader_id: Mapped[int] = mapped_column(ForeignKey("readers.reader_id"))
+    status: Mapped[str] = mapped_column(nullable=False, default=HoldStatus.WAITING)
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+    expires_at: Mapped[datetime | None] = mapped_column(nullable=True, default=None)
+
+    __table_args__ = (
+        Index(
+            "ix_holds_waiting_queue",
+            "book_id",
+            "hold_id",
+            postgresql_where=text("status = 'waiting'"),
+        ),
+        Index("ix_holds_ready_expires_at", "expires_at", postgresql_where=text("status = 'ready'")),
+        Index(
+            "uq_holds_active_reader_book",
+            "reader_id",
+            "book_id",
+            unique=True,
+            postgresql_where=text("status IN ('waiting', 'ready')"),
+        ),
+    )
+
+
+class DailyBookLoansModel(BaseModel):
+    """Loans and returns of a book per day, kept up to date by the borrow/return path.
+
+    A sharded book spreads its counters over ``stock_shards`` buckets, the same way
+    its stock is spread, so popular books do not contend on one counter row.
+    """
+
+    __tablename__ = "daily_book_loans"
+
+    day: Mapped[date] = mapped_column(primary_key=True)
+    book_id: Mapped[int] = mapped_column(
+        ForeignKey("books.book_id", ondelete="CASCADE"), primary_key=True
+    )
+    bucket: Mapped[int] = mapped_column(SmallInteger, primary_key=True, default=0)
+    loans: Mapped[int] = mapped_column(nullable=False, default=0)
+    returns: Mapped[int] = mapped_column(nullable=False, default=0)
+
+
+class DailyReaderActivityModel(BaseModel):
+    """Readers who borrowed anything on a given day."""
+
+    __tablename__ = "daily_reader_activity"
+
+    day: Mapped[date] = mapped_column(primary_key=True)
+    reader_id: Mapped[int] = mapped_column(
+        ForeignKey("readers.reader_id", ondelete="CASCADE"), primary_key=True
+    )
+
+
+class BookRecommendationModel(BaseModel):
+    """Top books borrowed by readers of a book, rebuilt from the loans by a periodic job.
+
+    The primary key is the lookup: the recommendations of a book are one index range.
+    """
+
+    __tablename__ = "book_recommendations"
+
+    book_id: Mapped[int] = mapped_column(
+        ForeignKey("books.book_id", ondelete="CASCADE"), primary_key=True
+    )
+    rank: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    recommended_book_id: Mapped[int] = mapped_column(
+        ForeignKey("books.book_id", ondelete="CASCADE"), nullable=False
+    )
+    # Readers who borrowed both books
+    readers: Mapped[int] = mapped_column(nullable=False)
@@ -0,0 +1,116 @@
+"""Monthly range partitions of ``library_cards`` on ``borrow_date``.
+
+The scheduler keeps the partitions of the coming months in place. Old ones are
+emptied by the archival job, which moves their returned loans out, and are
+detached by hand::
+
+    python -m app.library.partitions --ahead 3 --detach-before 2024-01-01
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, create_async_engine
+
+from app.web.config import load_from_env
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "library_cards"
+PARTITION_PREFIX = f"{PARENT_TABLE}_p"
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+
+def partition_month(name: str) -> date | None:
+    try:
+        return datetime.strptime(name.removeprefix(PARTITION_PREFIX), "%Y_%m").date()
+    except ValueError:
+        return None
+
+
+async def create_partitions(session: AsyncSession, months_ahead: int) -> list[str]:
+    """Make sure the current month and the next ``months_ahead`` ones have a partition."""
+    current = (await session.scalar(select(func.current_date()))).replace(day=1)
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        name = partition_name(month)
+        # Creating a partition locks the parent table, so existing ones are not touched at all
+        if await session.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}):
+            continue
+        # Another process may get there in between, IF NOT EXISTS turns that into a notice
+        await session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+        ))
+        created.append(name)
+    await session.commit()
+    if created:
+        logger.info("Created partitions of %s: [%s]", PARENT_TABLE, ", ".join(created))
+    return created
+
+
+async def detach_partitions(connection: AsyncConnection, before: date) -> list[str]:
+    """Detach the partitions that end before ``before`` and hold no loan at all.
+
+    Returned loans count too until the archival job has moved them out, the
+    history and the stats read them from here. A detached partition stays behind
+    as a plain table, to be dumped and dropped by hand. DETACH ... CONCURRENTLY
+    cannot run inside a transaction, so the connection has to be in autocommit mode.
+    """
+    names = await connection.scalars(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid "
+        f"WHERE pg_inherits.inhparent = '{PARENT_TABLE}'::regclass "
+        "ORDER BY child.relname"
+    ))
+    detached = []
+    for name in names.all():
+        month = partition_month(name)
+        if month is None or add_months(month, 1) > before:
+            continue
+        has_loans = await connection.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {name})"))
+        if has_loans:
+            logger.warning("Partition [%s] still has loans, left attached", name)
+            continue
+        await connection.execute(
+            text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name} CONCURRENTLY")
+        )
+        detached.append(name)
+        logger.info("Detached partition [%s] of %s", name, PARENT_TABLE)
+    return detached
+
+
+async def main(months_ahead: int | None, detach_before: date | None) -> None:
+    config = load_from_env()
+    if months_ahead is None:
+        months_ahead = config.LIBRARY_CARDS_PARTITIONS_AHEAD
+    engine = create_async_engine(config.ASYNC_DATABASE_URL)
+    try:
+        async with AsyncSession(engine) as session:
+            await create_partitions(session, months_ahead)
+        if detach_before is not None:
+            async with engine.connect() as connection:
+                autocommit = await connection.execution_options(isolation_level="AUTOCOMMIT")
+                await detach_partitions(autocommit, detach_before)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ahead", type=int, default=None, help="months to create in advance")
+    parser.add_argument("--detach-before", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.ahead, args.detach_before))
@@ -1,20 +1,67 @@
+import asyncio
 import logging
+import random
 import typing
+from collections.abc import AsyncIterator, Collection
+from datetime import date, datetime, timedelta
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import (
+    BigInteger,
+    ColumnElement,
+    Date,
+    Row,
+    Text,
+    and_,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    lambda_stmt,
+    literal,
+    literal_column,
+    or_,
+    select,
+    true,
+    tuple_,
+    union,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql import Subquery
 
 from app.library.models import (
     AuthorModel,
     BookModel,
+    BookRecommendationModel,
+    BookStockShardModel,
+    ChangeLogModel,
+    DailyBookLoansModel,
+    DailyReaderActivityModel,
+    HoldModel,
+    HoldStatus,
+    LibraryCardArchiveModel,
     LibraryCardModel,
     ReaderModel,
 )
+from app.library.partitions import create_partitions
 from app.library.schemes import (
     AuthorCreateScheme,
     BookCreateScheme,
     ReaderCreateScheme,
 )
+from app.store.db.sqlalchemy_db import BaseModel
+from app.web.exceptions import (
+    BookAvailableError,
+    BookInUseError,
+    LibraryCardNotFoundError,
+    ReaderInUseError,
+)
 
 if typing.TYPE_CHECKING:
     from app.store.store import Store
@@ -22,16 +69,46 @@ if typing.TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Transactions below the snapshot xmin have all finished, and any transaction that
+# commits later gets a bigger txid, so reading up to it keeps the feed cursor monotonic
+CHANGE_LOG_VISIBLE_TXID = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+# Largest change_id, a cursor (txid, CHANGE_ID_MAX) sits after every change of txid
+CHANGE_ID_MAX = 2**63 - 1
+
+HOLD_EXPIRY_BATCH_SIZE = 100
+OVERDUE_LOANS_BATCH_SIZE = 1000
+CATALOGUE_NAMES_BATCH_SIZE = 10000
+# Advisory lock taken by every transaction of a recommendations rebuild
+RECOMMENDATIONS_LOCK = "book_recommendations"
+
+LIKE_ESCAPE = "\\"
+
+
+def escape_like(value: str) -> str:
+    """Make value match itself literally in a LIKE pattern escaped by LIKE_ESCAPE."""
+    for char in (LIKE_ESCAPE, "%", "_"):
+        value = value.replace(char, LIKE_ESCAPE + char)
+    return value
+
+
+ChangeOperation = typing.Literal["insert", "update", "delete"]
+Change = tuple[type[BaseModel], int, ChangeOperation]
+
 
 class LibraryRepository:
     def __init__(self, store: "Store") -> None:
         self.store = store
+        # No open loan was borrowed before this, so open-loan queries can skip older
+        # partitions of library_cards. Loans only ever close, a stale value is just lower
+        self.open_loans_since = datetime.min
 
     async def add_author(
         self, session: AsyncSession, data_author: AuthorCreateScheme
     ) -> AuthorModel:
         author = AuthorModel(name=data_author.name)
         session.add(author)
+        await session.flush()
+        await self._log_changes(session, (AuthorModel, author.author_id, "insert"))
         await session.commit()
         return author
 
@@ -40,21 +117,121 @@ class LibraryRepository:
     ) -> BookModel:
         book = BookModel(**data_book.dict())
         session.add(book)
+        await session.flush()
+        await self._log_changes(session, (BookModel, book.book_id, "insert"))
         await session.commit()
         return book
 
-    async def get_books(self, session: AsyncSession) -> typing.Sequence[BookModel]:
-        books = await session.scalars(select(BookModel))
-        return books.all()
+    async def get_authors(
+        self, session: AsyncSession, after_id: int, limit: int
+    ) -> typing.Sequence[Row]:
+        authors = (
+            select(AuthorModel.author_id, AuthorModel.name)
+            .where(AuthorModel.author_id > after_id)
+            .order_by(AuthorModel.author_id)
+            .limit(limit)
+            .subquery("authors")
+        )
+        return await self._author_stats(session, authors)
+
+    async def get_author_stats(self, session: AsyncSession, author_id: int) -> Row | None:
+        authors = (
+            select(AuthorModel.author_id, AuthorModel.name)
+            .where(AuthorModel.author_id == author_id)
+            .subquery("authors")
+        )
+        stats = await self._author_stats(session, authors)
+        return stats[0] if stats else None
+
+    async def _author_stats(self, session: AsyncSession, authors: Subquery) -> typing.Sequence[Row]:
+        """Book and copy counts of the given authors, grouped in a single query."""
+        on_shelf, on_loan, on_hold = self._book_copies()
+        books = (
+            select(
+                BookModel.author_id,
+                on_shelf.label("on_shelf"),
+                on_loan.label("on_loan"),
+                on_hold.label("on_hold"),
+            )
+            .subquery("books")
+        )
+        total = books.c.on_shelf + books.c.on_loan + books.c.on_hold
+        stm = (
+            select(
+                authors.c.author_id,
+                authors.c.name,
+                func.count(books.c.author_id).label("books"),
+                cast(func.coalesce(func.sum(total), 0), BigInteger).label("total_copies"),
+                cast(func.coalesce(func.sum(books.c.on_shelf), 0), BigInteger)
+                .label("available_copies"),
+            )
+            .outerjoin(books, books.c.author_id == authors.c.author_id)
+            .group_by(authors.c.author_id, authors.c.name)
+            .order_by(authors.c.author_id)
+        )
+        return (await session.execute(stm)).all()
+
+    async def get_author(self, session: AsyncSession, author_id: int) -> AuthorModel | None:
+        return await session.get(AuthorModel, author_id)
 
+    async def get_author_books(
+        self, session: AsyncSession, author_id: int, after_id: int, limit: int
+    ) -> typing.Sequence[Row]:
+        stm = (
+            select(*self._book_read_columns())
+            .where(and_(BookModel.author_id == author_id, BookModel.book_id > after_id))
+            .order_by(BookModel.book_id)
+            .limit(limit)
+        )
+        return (await session.execute(stm)).all()
+
+    # Related entities of a page of rows, one query per entity type however long the page
+    async def get_authors_by_ids(
+        self, session: AsyncSession, author_ids: Collection[int]
+    ) -> typing.Sequence[Row]:
+        stm = select(AuthorModel.name, AuthorModel.author_id).where(
+            AuthorModel.author_id.in_(author_ids)
+        )
+        return (await session.execute(stm)).all()
+
+    async def get_books_by_ids(
+        self, session: AsyncSession, book_ids: Collection[int]
+    ) -> typing.Sequence[Row]:
+        stm = select(*self._book_read_columns()).where(BookModel.book_id.in_(book_ids))
+        return (await session.execute(stm)).all()
+
+    async def get_readers_by_ids(
+        self, session: AsyncSession, reader_ids: Collection[int]
+    ) -> typing.Sequence[Row]:
+        stm = select(ReaderModel.name, ReaderModel.reader_id).where(
+            ReaderModel.reader_id.in_(reader_ids)
+        )
+        return (await session.execute(stm)).all()
+
+    async def get_books(self, session: AsyncSession) -> typing.Sequence[Row]:
+        return (await session.execute(select(*self._book_read_columns()))).all()
+
+    # Hot-path lookups use lambda_stmt: the select() is built and cache-keyed once per
+    # code location instead of on every call, closure variables become bound parameters
     async def get_book(self, session: AsyncSession, book_id: int) -> BookModel | None:
-        return await session.scalar(select(BookModel).where(BookModel.book_id == book_id))
+        stm = lambda_stmt(lambda: select(BookModel).where(BookModel.book_id == book_id))
+        book = await session.scalar(stm)
+        if book is not None:
+            await self._consolidate_stock(session, [book])
+        return book
 
     async def del_book(self, session: AsyncSession, book_id: int) -> BookModel | None:
         book = await session.get(BookModel, book_id)
         if book is None:
             return None
-        await session.delete(book)
+        try:
+            await session.delete(book)
+            await self._log_changes(session, (BookModel, book_id, "delete"))
+            await session.commit()
+        except IntegrityError as e:
+            # Loans, archived loans and holds keep their book, the history stays whole
+            await session.rollback()
+            raise BookInUseError(book_id) from e
         return book
 
     async def update_book(
@@ -73,16 +250,19 @@ class LibraryRepository:
         book.author_id = author_id or book.author_id
         book.year = year or book.year
         book.isbn = isbn or book.isbn
+        await self._log_changes(session, (BookModel, book_id, "update"))
         await session.commit()
         return book
 
     async def count_reader_books(self, session: AsyncSession, reader_id: int) -> int:
-        stm = select(func.count(1)).where(
+        since = self.open_loans_since
+        stm = lambda_stmt(lambda: select(func.count(1)).where(
             and_(
                 LibraryCardModel.reader_id == reader_id,
-                LibraryCardModel.return_date.is_(None)
+                LibraryCardModel.return_date.is_(None),
+                LibraryCardModel.borrow_date >= since,
             )
-        )
+        ))
         result = await session.scalar(stm)
         return typing.cast(int, result)
 
@@ -90,58 +270,419 @@ class LibraryRepository:
     # SELECT b.* FROM books as b
     # JOIN library_cards as lc ON lc.book_id = b.book_id
     # JOIN readers as r ON r.reader_id = lc.reader_id
-    # WHERE r.reader_id = {reader_id} AND lc.return_date IS NULL
+    # WHERE r.reader_id = {reader_id} AND lc.return_date IS NULL AND lc.borrow_date >= {since}
     async def get_books_for_reader(
         self, session: AsyncSession, reader_id: int
-    ) -> typing.Sequence[BookModel]:
+    ) -> typing.Sequence[Row]:
         stm = (
-            select(BookModel)
+            select(*self._book_read_columns())
             .join(LibraryCardModel, BookModel.book_id == LibraryCardModel.book_id)
             .join(ReaderModel, ReaderModel.reader_id == LibraryCardModel.reader_id)
-            .where(and_(ReaderModel.reader_id == reader_id, LibraryCardModel.return_date.is_(None)))
+            .where(and_(ReaderModel.reader_id == reader_id, self._open_loan()))
         )
-        books = await session.scalars(stm)
-        return books.all()
+        return (await session.execute(stm)).all()
+
+    async def get_reader_history(
+        self,
+        session: AsyncSession,
+        reader_id: int,
+        before: tuple[datetime, int] | None,
+        limit: int,
+    ) -> typing.Sequence[Row]:
+        return await self._loan_history(session, "reader_id", reader_id, before, limit)
+
+    async def get_book_history(
+        self,
+        session: AsyncSession,
+        book_id: int,
+        before: tuple[datetime, int] | None,
+        limit: int,
+    ) -> typing.Sequence[Row]:
+        return await self._loan_history(session, "book_id", book_id, before, limit)
+
+    async def get_reader_monthly_loans(
+        self, session: AsyncSession, reader_id: int
+    ) -> typing.Sequence[Row]:
+        return await self._monthly_loans(session, "reader_id", reader_id)
+
+    async def get_book_monthly_loans(
+        self, session: AsyncSession, book_id: int
+    ) -> typing.Sequence[Row]:
+        return await self._monthly_loans(session, "book_id", book_id)
+
+    async def _loan_history(
+        self,
+        session: AsyncSession,
+        owner: str,
+        owner_id: int,
+        before: tuple[datetime, int] | None,
+        limit: int,
+    ) -> typing.Sequence[Row]:
+        """Newest loans first, the page starts right after the (borrow_date, id) cursor.
+
+        Each of the hot and archived tables gives its own first page off its history
+        index, the merged page is taken from at most twice the limit.
+        """
+        pages = []
+        for model in (LibraryCardModel, LibraryCardArchiveModel):
+            page = (
+                select(*model.__table__.columns)
+                .where(getattr(model, owner) == owner_id)
+                .order_by(model.borrow_date.desc(), model.library_card_id.desc())
+                .limit(limit)
+            )
+            if before is not None:
+                cursor = tuple_(model.borrow_date, model.library_card_id)
+                page = page.where(cursor < tuple_(*before))
+            pages.append(page)
+        loans = union_all(*pages).subquery("loans")
+        stm = (
+            select(loans)
+            .order_by(loans.c.borrow_date.desc(), loans.c.library_card_id.desc())
+            .limit(limit)
+        )
+        return (await session.execute(stm)).all()
+
+    # TODO: Помесячная статистика с нарастающим итогом через оконную функцию
+    # SELECT date_trunc('month', borrow_date) AS month, count(*) AS loans,
+    #        sum(count(*)) OVER (ORDER BY date_trunc('month', borrow_date)) AS running_total
+    # FROM library_cards WHERE reader_id = {reader_id} GROUP BY 1 ORDER BY 1
+    async def _monthly_loans(
+        self, session: AsyncSession, owner: str, owner_id: int
+    ) -> typing.Sequence[Row]:
+        loans = union_all(*(
+            select(model.borrow_date).where(getattr(model, owner) == owner_id)
+            for model in (LibraryCardModel, LibraryCardArchiveModel)
+        )).subquery("loans")
+        month = func.date_trunc("month", loans.c.borrow_date)
+        running_total = func.sum(func.count()).over(order_by=month)
+        stm = (
+            select(
+                cast(month, Date).label("month"),
+                func.count().label("loans"),
+                cast(running_total, BigInteger).label("running_total"),
+            )
+            .group_by(month)
+            .order_by(month)
+        )
+        return (await session.execute(stm)).all()
 
     async def get_unreturned_library_record(
         self, session: AsyncSession, book_id: int, reader_id: int
     ) -> LibraryCardModel | None:
-        stm = select(LibraryCardModel).where(and_(
+        since = self.open_loans_since
+        stm = lambda_stmt(lambda: select(LibraryCardModel).where(and_(
             LibraryCardModel.book_id == book_id,
             LibraryCardModel.reader_id == reader_id,
-            LibraryCardModel.return_date.is_(None)
+            LibraryCardModel.return_date.is_(None),
+            LibraryCardModel.borrow_date >= since,
             )
-        )
+        ))
         return await session.scalar(stm)
 
     async def borrow_book(
-        self, session: AsyncSession, book: BookModel, reader_id: int
-    ) -> LibraryCardModel:
-        issue_record = LibraryCardModel(reader_id=reader_id, book_id=book.book_id)
-        book.amount -= 1
-        session.add_all([issue_record, book])
+        self,
+        session: AsyncSession,
+        book: BookModel,
+        reader_id: int,
+        hold: HoldModel | None = None,
+    ) -> LibraryCardModel | None:
+        if hold is not None:
+            # The copy was already taken out of stock when the hold became ready
+            hold.status = HoldStatus.FULFILLED
+        elif not await self._take_copy(session, book):
+            return None
+        loan_period = timedelta(days=self.store.config.business_config.loan_period_days)
+        # Inserted with RETURNING, so the dates set by the database come back loaded
+        stm = (
+            insert(LibraryCardModel)
+            .values(reader_id=reader_id, book_id=book.book_id, due_date=func.now() + loan_period)
+            .returning(LibraryCardModel)
+        )
+        issue_record = await session.scalar(stm)
+        session.add(book)
+        await session.flush()
+        await self._log_changes(
+            session,
+            (LibraryCardModel, issue_record.library_card_id, "insert"),
+            (BookModel, book.book_id, "update"),
+        )
+        await self._count_circulation(session, book, reader_id, loans=1)
         await session.commit()
         return issue_record
 
     async def return_book(
         self, session: AsyncSession, book: BookModel, note: LibraryCardModel
-    ) -> LibraryCardModel | None:
-        note.return_date = func.now()
-        book.amount += 1
+    ) -> LibraryCardModel:
+        # The partition key in the WHERE clause keeps the update to one partition
+        stm = (
+            update(LibraryCardModel)
+            .where(and_(
+                LibraryCardModel.library_card_id == note.library_card_id,
+                LibraryCardModel.borrow_date == note.borrow_date,
+                LibraryCardModel.return_date.is_(None),
+            ))
+            .values(return_date=func.now())
+            .returning(LibraryCardModel.return_date)
+            .execution_options(synchronize_session=False)
+        )
+        return_date = await session.scalar(stm)
+        if return_date is None:
+            # A concurrent request returned it first, its copy is already back
+            raise LibraryCardNotFoundError(note.book_id, note.reader_id)
+        set_committed_value(note, "return_date", return_date)
+        await self._release_copy(session, book)
+        await self._log_changes(
+            session,
+            (LibraryCardModel, note.library_card_id, "update"),
+            (BookModel, book.book_id, "update"),
+        )
+        await self._count_circulation(session, book, note.reader_id, returns=1)
         await session.commit()
         return note
 
+    async def _count_circulation(
+        self,
+        session: AsyncSession,
+        book: BookModel,
+        reader_id: int,
+        loans: int = 0,
+        returns: int = 0,
+    ) -> None:
+        """Bump today's rollups in the loan's own transaction, in one round-trip."""
+        today = func.current_date()
+        counters = pg_insert(DailyBookLoansModel).values(
+            day=today,
+            book_id=book.book_id,
+            bucket=random.randrange(max(book.stock_shards, 1)),
+            loans=loans,
+            returns=returns,
+        )
+        stm = counters.on_conflict_do_update(
+            index_elements=[
+                DailyBookLoansModel.day, DailyBookLoansModel.book_id, DailyBookLoansModel.bucket
+            ],
+            set_={
+                "loans": DailyBookLoansModel.loans + counters.excluded.loans,
+                "returns": DailyBookLoansModel.returns + counters.excluded.returns,
+            },
+        )
+        if loans:
+            activity = (
+                pg_insert(DailyReaderActivityModel)
+                .values(day=today, reader_id=reader_id)
+                .on_conflict_do_nothing()
+            )
+            stm = stm.add_cte(activity.cte("reader_activity"))
+        await session.execute(stm)
+
+    async def get_current_date(self, session: AsyncSession) -> date:
+        """The day the rollups are counted in, today as the database sees it."""
+        return await session.scalar(select(func.current_date()))
+
+    # TODO: Статистика читается только из дневных агрегатов, library_cards не сканируется
+    async def get_top_books(
+        self, session: AsyncSession, since: date, until: date, limit: int
+    ) -> typing.Sequence[Row]:
+        loans = func.sum(DailyBookLoansModel.loans)
+        stm = (
+            select(BookModel.book_id, BookModel.title, loans.label("loans"))
+            .join(BookModel, BookModel.book_id == DailyBookLoansModel.book_id)
+            .where(DailyBookLoansModel.day.between(since, until))
+            .group_by(BookModel.book_id)
+            .having(loans > 0)
+            .order_by(loans.desc(), BookModel.book_id)
+            .limit(limit)
+        )
+        return (await session.execute(stm)).all()
+
+    async def get_daily_circulation(
+        self, session: AsyncSession, since: date, until: date
+    ) -> typing.Sequence[Row]:
+        stm = (
+            select(
+                DailyBookLoansModel.day,
+                func.sum(DailyBookLoansModel.loans).label("loans"),
+                func.sum(DailyBookLoansModel.returns).label("returns"),
+            )
+            .where(DailyBookLoansModel.day.between(since, until))
+            .group_by(DailyBookLoansModel.day)
+            .order_by(DailyBookLoansModel.day)
+        )
+        return (await session.execute(stm)).all()
+
+    async def count_circulating_books(self, session: AsyncSession, since: date, until: date) -> int:
+        stm = select(func.count(func.distinct(DailyBookLoansModel.book_id))).where(
+            DailyBookLoansModel.day.between(since, until)
+        )
+        return typing.cast(int, await session.scalar(stm))
+
+    async def get_circulation_page(
+        self, session: AsyncSession, since: date, until: date, after_book_id: int, limit: int
+    ) -> typing.Sequence[Row]:
+        stm = (
+            select(
+                BookModel.book_id,
+                BookModel.title,
+                func.sum(DailyBookLoansModel.loans).label("loans"),
+                func.sum(DailyBookLoansModel.returns).label("returns"),
+            )
+            .join(BookModel, BookModel.book_id == DailyBookLoansModel.book_id)
+            .where(and_(
+                DailyBookLoansModel.day.between(since, until),
+                DailyBookLoansModel.book_id > after_book_id,
+            ))
+            .group_by(BookModel.book_id)
+            .order_by(BookModel.book_id)
+            .limit(limit)
+        )
+        return (await session.execute(stm)).all()
+
+    async def count_books(self, session: AsyncSession) -> int:
+        return typing.cast(int, await session.scalar(select(func.count(BookModel.book_id))))
+
+    async def get_inventory_page(
+        self, session: AsyncSession, after_book_id: int, limit: int
+    ) -> typing.Sequence[Row]:
+        on_shelf, on_loan, on_hold = self._book_copies()
+        page = (
+            select(
+                BookModel.book_id,
+                BookModel.title,
+                on_shelf.label("on_shelf"),
+                on_loan.label("on_loan"),
+                on_hold.label("on_hold"),
+            )
+            .where(BookModel.book_id > after_book_id)
+            .order_by(BookModel.book_id)
+            .limit(limit)
+            .subquery("page")
+        )
+        stm = select(
+            page, (page.c.on_shelf + page.c.on_loan + page.c.on_hold).label("total")
+        ).order_by(page.c.book_id)
+        return (await session.execute(stm)).all()
+
+    async def count_active_readers(self, session: AsyncSession, since: date, until: date) -> int:
+        stm = select(func.count(DailyReaderActivityModel.reader_id.distinct())).where(
+            DailyReaderActivityModel.day.between(since, until)
+        )
+        return typing.cast(int, await session.scalar(stm))
+
+    # TODO: Весь ответ дашборда собирается в Postgres одним запросом
+    # SELECT json_build_object('status', 'ok', 'data', json_build_object(
+    #     'reader_id', r.reader_id, ..., 'active_loans', coalesce(loans.loans_json, '[]'),
+    #     'active_loans_count', loans.total, 'remaining_allowance', greatest(:max - loans.total, 0)
+    # ))::text
+    # FROM readers AS r
+    # CROSS JOIN LATERAL (
+    #     SELECT json_agg(... ORDER BY lc.borrow_date) AS loans_json, count(*) AS total
+    #     FROM library_cards AS lc JOIN books AS b ... JOIN authors AS a ...
+    #     WHERE lc.reader_id = r.reader_id AND lc.return_date IS NULL
+    # ) AS loans
+    # WHERE r.reader_id = {reader_id}
+    async def get_reader_dashboard(
+        self, session: AsyncSession, reader_id: int, max_books_per_reader: int
+    ) -> str | None:
+        """Return the ready-made JSON body of the reader dashboard, None for an unknown reader."""
+        loan = func.json_build_object(
+            "library_card_id", LibraryCardModel.library_card_id,
+            "borrow_date", LibraryCardModel.borrow_date,
+            "due_date", LibraryCardModel.due_date,
+            "book_id", BookModel.book_id,
+            "title", BookModel.title,
+            "author_id", AuthorModel.author_id,
+            "author_name", AuthorModel.name,
+            "year", BookModel.year,
+            "isbn", BookModel.isbn,
+        )
+        ordered_loans = aggregate_order_by(loan, LibraryCardModel.borrow_date)
+        loans = (
+            select(func.json_agg(ordered_loans).label("loans_json"), func.count().label("total"))
+            .join(BookModel, BookModel.book_id == LibraryCardModel.book_id)
+            .join(AuthorModel, AuthorModel.author_id == BookModel.author_id)
+            .where(LibraryCardModel.reader_id == ReaderModel.reader_id, self._open_loan())
+            .lateral("loans")
+        )
+        dashboard = func.json_build_object(
+            "reader_id", ReaderModel.reader_id,
+            "name", ReaderModel.name,
+            "email", ReaderModel.email,
+            "active_loans", func.coalesce(loans.c.loans_json, literal_column("'[]'::json")),
+            "active_loans_count", loans.c.total,
+            "remaining_allowance", func.greatest(max_books_per_reader - loans.c.total, 0),
+        )
+        stm = (
+            select(cast(func.json_build_object("status", "ok", "data", dashboard), Text))
+            .select_from(ReaderModel)
+            .join(loans, true())
+            .where(ReaderModel.reader_id == reader_id)
+        )
+        return await session.scalar(stm)
+
+    async def stream_overdue_loans(self, session: AsyncSession) -> AsyncIterator[Row]:
+        """Open loans past their due date with the reader's contacts, most overdue first.
+
+        Rows come in batches from a server-side cursor, and only overdue loans are
+        read, off the partial index on the due date of open loans.
+        """
+        stm = (
+            select(
+                LibraryCardModel.library_card_id,
+                BookModel.book_id,
+                BookModel.title,
+                LibraryCardModel.borrow_date,
+                LibraryCardModel.due_date,
+                ReaderModel.reader_id,
+                ReaderModel.name.label("reader_name"),
+                ReaderModel.email,
+            )
+            .join(BookModel, BookModel.book_id == LibraryCardModel.book_id)
+            .join(ReaderModel, ReaderModel.reader_id == LibraryCardModel.reader_id)
+            .where(self._open_loan(), LibraryCardModel.due_date < func.now())
+            .order_by(LibraryCardModel.due_date)
+            .execution_options(yield_per=OVERDUE_LOANS_BATCH_SIZE)
+        )
+        result = await session.stream(stm)
+        async for row in result:
+            yield row
+
     async def add_reader(
         self, session: AsyncSession, data_reader: ReaderCreateScheme
     ) -> ReaderModel:
         reader = ReaderModel(**data_reader.dict())
         session.add(reader)
+        await session.flush()
+        await self._log_changes(session, (ReaderModel, reader.reader_id, "insert"))
         await session.commit()
         return reader
 
-    async def get_readers(self, session: AsyncSession) -> typing.Sequence[ReaderModel]:
-        readers = await session.scalars(select(ReaderModel))
-        return readers.all()
+    async def get_readers(
+        self,
+        session: AsyncSession,
+        query: str | None = None,
+        after_id: int | None = None,
+        limit: int = 50,
+    ) -> typing.Sequence[Row]:
+        """A page of readers by id, whose name or email contains query if it is given.
+
+        Substring matches are served by the trigram indexes on both columns.
+        """
+        # Columns in ReaderReadScheme field order
+        stm = (
+            select(ReaderModel.name, ReaderModel.reader_id)
+            .order_by(ReaderModel.reader_id)
+            .limit(limit)
+        )
+        if after_id is not None:
+            stm = stm.where(ReaderModel.reader_id > after_id)
+        if query is not None:
+            pattern = f"%{escape_like(query)}%"
+            stm = stm.where(or_(
+                ReaderModel.name.ilike(pattern, escape=LIKE_ESCAPE),
+                ReaderModel.email.ilike(pattern, escape=LIKE_ESCAPE),
+            ))
+        return (await session.execute(stm)).all()
 
     async def get_reader(self, session: AsyncSession, reader_id: int) -> ReaderModel | None:
         return await session.get(ReaderModel, reader_id)
@@ -150,7 +691,14 @@ class LibraryRepository:
         reader = await session.get(ReaderModel, reader_id)
         if reader is None:
             return None
-        await session.delete(reader)
+        try:
+            await session.delete(reader)
+            await self._log_changes(session, (ReaderModel, reader_id, "delete"))
+            await session.commit()
+        except IntegrityError as e:
+            # Loans, archived loans and holds keep their reader, the history stays whole
+            await session.rollback()
+            raise ReaderInUseError(reader_id) from e
         return reader
 
     async def update_reader(
@@ -165,5 +713,540 @@ class LibraryRepository:
             return None
         reader.name = name or reader.name
         reader.email = email or reader.email
+        await self._log_changes(session, (ReaderModel, reader_id, "update"))
         await session.commit()
         return reader
+
+    async def warm_up(self, session: AsyncSession) -> None:
+        """Run the hot read queries once, ids that do not exist keep them cheap."""
+        await self.get_book(session, 0)
+        await self.get_reader(session, 0)
+        await self.count_reader_books(session, 0)
+        await self.get_books_for_reader(session, 0)
+        await self.get_unreturned_library_record(session, 0, 0)
+        await self.get_ready_hold(session, 0, 0)
+
+    async def place_hold(
+        self, session: AsyncSession, book_id: int, reader_id: int
+    ) -> HoldModel | None:
+        """Queue the reader for a book with no copy in stock, None when there is no such book.
+
+        The book row stays locked until the hold is committed. _release_copy locks it too
+        before it looks for a waiting hold, so a copy coming back either is counted here
+        or goes to this hold.
+        """
+        stock = await session.scalar(
+            select(self._stock_expression())
+            .where(BookModel.book_id == book_id)
+            .with_for_update(of=BookModel)
+        )
+        if stock is None:
+            return None
+        if stock > 0:
+            raise BookAvailableError(book_id)
+        hold = HoldModel(book_id=book_id, reader_id=reader_id, status=HoldStatus.WAITING)
+        session.add(hold)
+        await session.commit()
+        return hold
+
+    async def get_ready_hold(
+        self, session: AsyncSession, book_id: int, reader_id: int
+    ) -> HoldModel | None:
+        stm = (
+            select(HoldModel)
+            .where(and_(
+                HoldModel.book_id == book_id,
+                HoldModel.reader_id == reader_id,
+                HoldModel.status == HoldStatus.READY,
+                HoldModel.expires_at > func.now(),
+            ))
+            .with_for_update()
+        )
+        return await session.scalar(stm)
+
+    async def cancel_hold(
+        self, session: AsyncSession, book_id: int, reader_id: int
+    ) -> HoldModel | None:
+        stm = (
+            select(HoldModel)
+            .where(and_(
+                HoldModel.book_id == book_id,
+                HoldModel.reader_id == reader_id,
+                HoldModel.status.in_([HoldStatus.WAITING, HoldStatus.READY]),
+            ))
+            .with_for_update()
+        )
+        hold = await session.scalar(stm)
+        if hold is None:
+            return None
+        if hold.status == HoldStatus.READY:
+            book = await session.get(BookModel, book_id, with_for_update=True)
+            await self._release_copy(session, book)
+            await self._log_changes(session, (BookModel, book_id, "update"))
+        hold.status = HoldStatus.CANCELLED
+        await session.commit()
+        return hold
+
+    async def expire_holds(self, session: AsyncSession) -> None:
+        stm = (
+            select(HoldModel)
+            .where(and_(HoldModel.status == HoldStatus.READY, HoldModel.expires_at <= func.now()))
+            .order_by(HoldModel.expires_at)
+            .limit(HOLD_EXPIRY_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        holds = (await session.scalars(stm)).all()
+        for hold in holds:
+            hold.status = HoldStatus.EXPIRED
+            book = await session.get(BookModel, hold.book_id, with_for_update=True)
+            await self._release_copy(session, book)
+            await self._log_changes(session, (BookModel, hold.book_id, "update"))
+        await session.commit()
+        if holds:
+            logger.info("Expired [%s] unclaimed holds", len(holds))
+
+    async def _release_copy(self, session: AsyncSession, book: BookModel) -> HoldModel | None:
+        """Hand a copy that came back to the head of the book's waitlist, or to the shelf."""
+        # Waits for a place_hold or a stock split in progress, KEY SHARE does not hold up
+        # other returns. The shards are counted again under it, a split may have changed them
+        stock_shards = await session.scalar(
+            select(BookModel.stock_shards)
+            .where(BookModel.book_id == book.book_id)
+            .with_for_update(read=True, key_share=True)
+        )
+        set_committed_value(book, "stock_shards", stock_shards)
+        stm = (
+            select(HoldModel)
+            .where(and_(HoldModel.book_id == book.book_id, HoldModel.status == HoldStatus.WAITING))
+            .order_by(HoldModel.hold_id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        hold = await session.scalar(stm)
+        if hold is None:
+            await self._put_copy(session, book)
+            return None
+        pickup = timedelta(hours=self.store.config.business_config.hold_pickup_hours)
+        hold.status = HoldStatus.READY
+        hold.expires_at = func.now() + pickup
+        logger.info("Hold ID: [%s] is ready for the reader: [%s]", hold.hold_id, hold.reader_id)
+        return hold
+
+    async def split_book_stock(
+        self, session: AsyncSession, book_id: int, shards: int
+    ) -> BookModel | None:
+        book = await session.get(BookModel, book_id, with_for_update=True, populate_existing=True)
+        if book is None:
+            return None
+        stored = await session.execute(
+            delete(BookStockShardModel)
+            .where(BookStockShardModel.book_id == book_id)
+            .returning(BookStockShardModel.amount)
+        )
+        total = book.amount + sum(stored.scalars())
+        if shards > 0:
+            per_shard, remainder = divmod(total, shards)
+            session.add_all(
+                BookStockShardModel(
+                    book_id=book_id, shard_no=n, amount=per_shard + (n < remainder)
+                )
+                for n in range(shards)
+            )
+            book.amount = 0
+        else:
+            book.amount = total
+        book.stock_shards = shards
+        await self._log_changes(session, (BookModel, book_id, "update"))
+        await session.commit()
+        set_committed_value(book, "amount", total)
+        return book
+
+    def _book_read_columns(self) -> list[ColumnElement]:
+        """Columns in BookReadScheme field order, with the stock of sharded books summed up."""
+        amount = case(
+            (BookModel.stock_shards > 0, self._stock_expression()), else_=BookModel.amount
+        )
+        return [
+            BookModel.title,
+            BookModel.author_id,
+            BookModel.year,
+            BookModel.isbn,
+            amount.label("amount"),
+            BookModel.book_id,
+        ]
+
+    def _book_copies(self) -> tuple[ColumnElement[int], ColumnElement[int], ColumnElement[int]]:
+        """Copies of a book on the shelf, out on loan and set aside for a hold."""
+        on_shelf = case(
+            (BookModel.stock_shards > 0, self._stock_expression()), else_=BookModel.amount
+        )
+        on_loan = (
+            select(func.count())
+            .where(and_(LibraryCardModel.book_id == BookModel.book_id, self._open_loan()))
+            .scalar_subquery()
+        )
+        on_hold = (
+            select(func.count())
+            .where(and_(
+                HoldModel.book_id == BookModel.book_id, HoldModel.status == HoldStatus.READY
+            ))
+            .scalar_subquery()
+        )
+        return on_shelf, on_loan, on_hold
+
+    def _open_loan(self) -> ColumnElement[bool]:
+        return and_(
+            LibraryCardModel.return_date.is_(None),
+            LibraryCardModel.borrow_date >= self.open_loans_since,
+        )
+
+    def _stock_expression(self) -> ColumnElement[int]:
+        shards_total = (
+            select(func.coalesce(func.sum(BookStockShardModel.amount), 0))
+            .where(BookStockShardModel.book_id == BookModel.book_id)
+            .scalar_subquery()
+        )
+        return BookModel.amount + shards_total
+
+    async def _consolidate_stock(
+        self, session: AsyncSession, books: typing.Sequence[BookModel]
+    ) -> None:
+        """Report the stock of sharded books as _stock_expression counts it."""
+        sharded = {book.book_id: book for book in books if book.stock_shards}
+        if not sharded:
+            return
+        stm = (
+            select(BookModel.book_id, self._stock_expression())
+            .where(BookModel.book_id.in_(sharded))
+        )
+        for book_id, total in await session.execute(stm):
+            set_committed_value(sharded[book_id], "amount", total)
+
+    async def _take_copy(self, session: AsyncSession, book: BookModel) -> bool:
+        if not book.stock_shards:
+            amount = await session.scalar(
+                update(BookModel)
+                .where(and_(BookModel.book_id == book.book_id, BookModel.amount > 0))
+                .values(amount=BookModel.amount - 1)
+                .returning(BookModel.amount)
+            )
+            if amount is None:
+                return False
+            set_committed_value(book, "amount", amount)
+            return True
+        # Try a random shard that nobody else holds first, then wait for any shard with stock
+        for skip_locked in (True, False):
+            shard_no = (
+                select(BookStockShardModel.shard_no)
+                .where(and_(
+                    BookStockShardModel.book_id == book.book_id,
+                    BookStockShardModel.amount > 0,
+                ))
+                .order_by(func.random())
+                .limit(1)
+                .with_for_update(skip_locked=skip_locked)
+                .scalar_subquery()
+            )
+            stm = (
+                update(BookStockShardModel)
+                .where(and_(
+                    BookStockShardModel.book_id == book.book_id,
+                    BookStockShardModel.shard_no == shard_no,
+                    BookStockShardModel.amount > 0,
+                ))
+                .values(amount=BookStockShardModel.amount - 1)
+                .returning(BookStockShardModel.shard_no)
+            )
+            if await session.scalar(stm) is not None:
+                set_committed_value(book, "amount", max(book.amount - 1, 0))
+                return True
+        return False
+
+    async def _put_copy(self, session: AsyncSession, book: BookModel) -> None:
+        if not book.stock_shards:
+            amount = await session.scalar(
+                update(BookModel)
+                .where(BookModel.book_id == book.book_id)
+                .values(amount=BookModel.amount + 1)
+                .returning(BookModel.amount)
+            )
+            set_committed_value(book, "amount", amount)
+            return
+        await session.execute(
+            update(BookStockShardModel)
+            .where(and_(
+                BookStockShardModel.book_id == book.book_id,
+                BookStockShardModel.shard_no == random.randrange(book.stock_shards),
+            ))
+            .values(amount=BookStockShardModel.amount + 1)
+        )
+        set_committed_value(book, "amount", book.amount + 1)
+
+    async def _log_changes(self, session: AsyncSession, *changes: Change) -> None:
+        await session.flush()
+        for model, entity_id, operation in changes:
+            table = model.__table__
+            pk = next(iter(table.primary_key.columns))
+            row = func.to_jsonb(table.table_valued())
+            if model is BookModel:
+                # Mirrors must see the consolidated stock, not the shelf counter of sharded books
+                row = row.op("||")(func.jsonb_build_object("amount", self._stock_expression()))
+            snapshot = select(row).where(pk == entity_id)
+            await session.execute(
+                insert(ChangeLogModel).values(
+                    entity=table.name,
+                    entity_id=entity_id,
+                    operation=operation,
+                    payload=snapshot.scalar_subquery(),
+                )
+            )
+
+    async def get_changes(
+        self,
+        session: AsyncSession,
+        since: tuple[int, int],
+        limit: int,
+        entities: Collection[str] | None = None,
+    ) -> typing.Sequence[ChangeLogModel]:
+        cursor = tuple_(*(literal(value, BigInteger) for value in since))
+        stm = (
+            select(ChangeLogModel)
+            .where(and_(
+                tuple_(ChangeLogModel.txid, ChangeLogModel.change_id) > cursor,
+                ChangeLogModel.txid < CHANGE_LOG_VISIBLE_TXID,
+            ))
+            .order_by(ChangeLogModel.txid, ChangeLogModel.change_id)
+            .limit(limit)
+        )
+        if entities is not None:
+            stm = stm.where(ChangeLogModel.entity.in_(entities))
+        changes = await session.scalars(stm)
+        return changes.all()
+
+    async def get_change_cursor(self, session: AsyncSession, change_id: int) -> tuple[int, int]:
+        """A (txid, change_id) cursor that misses no change after change_id.
+
+        Changes of a transaction still in progress get a txid at or above the horizon,
+        so the cursor stops right before the smaller of the two. Changes up to
+        change_id in the same transactions are sent again, they are full snapshots.
+        """
+        first_txid = (
+            select(func.min(ChangeLogModel.txid))
+            .where(ChangeLogModel.change_id > change_id)
+            .scalar_subquery()
+        )
+        txid = await session.scalar(select(func.least(first_txid, CHANGE_LOG_VISIBLE_TXID)))
+        return txid - 1, CHANGE_ID_MAX
+
+    async def get_change_log_horizon(self, session: AsyncSession) -> int:
+        """The txid every change below which is committed, a cursor to follow a fresh read."""
+        return await session.scalar(select(CHANGE_LOG_VISIBLE_TXID))
+
+    async def get_catalogue_names(self, session: AsyncSession) -> list[Row]:
+        """(kind, id, text) of every book title and author name."""
+        stm = union_all(
+            select(literal("book"), BookModel.book_id, BookModel.title),
+            select(literal("author"), AuthorModel.author_id, AuthorModel.name),
+        ).execution_options(yield_per=CATALOGUE_NAMES_BATCH_SIZE)
+        result = await session.stream(stm)
+        return [row async for row in result]
+
+    async def search_names(self, session: AsyncSession, prefix: str, limit: int) -> list[Row]:
+        """Titles and names starting with prefix or close to it, by the trigram indexes."""
+        pattern = escape_like(prefix) + "%"
+        sources = (
+            ("book", BookModel.book_id, BookModel.title),
+            ("author", AuthorModel.author_id, AuthorModel.name),
+        )
+        stm = (
+            union_all(*(
+                select(
+                    literal(kind).label("kind"),
+                    item_id.label("id"),
+                    text.label("text"),
+                    func.word_similarity(prefix, text).label("score"),
+                )
+                .where(or_(text.ilike(pattern, escape=LIKE_ESCAPE), text.op("%>")(prefix)))
+                for kind, item_id, text in sources
+            ))
+            .order_by(literal_column("score").desc(), literal_column("text"))
+            .limit(limit)
+        )
+        return list((await session.execute(stm)).all())
+
+    async def refresh_open_loan_watermark(self, session: AsyncSession) -> None:
+        lag = timedelta(seconds=self.store.config.OPEN_LOAN_WATERMARK_LAG)
+        # least() skips the NULL min() of no open loans
+        stm = select(
+            func.least(func.min(LibraryCardModel.borrow_date), func.localtimestamp() - lag)
+        ).where(LibraryCardModel.return_date.is_(None))
+        self.open_loans_since = await session.scalar(stm)
+        logger.info("Open loans watermark moved to [%s]", self.open_loans_since)
+
+    async def archive_returned_loans(self, session: AsyncSession) -> None:
+        """Move old returned loans to library_cards_archive, one small batch per transaction.
+
+        A batch is a single DELETE ... RETURNING feeding an INSERT, so an interrupted
+        run loses nothing and the next one carries on from what is left. Loans locked
+        by a request are skipped, and the pause between batches bounds the load.
+        """
+        config = self.store.config
+        cutoff = func.localtimestamp() - timedelta(days=config.LOAN_ARCHIVE_AFTER_DAYS)
+        columns = LibraryCardModel.__table__.columns.keys()
+        after_id, archived = 0, 0
+        while True:
+            batch = (
+                select(LibraryCardModel.library_card_id, LibraryCardModel.borrow_date)
+                .where(and_(
+                    LibraryCardModel.library_card_id > after_id,
+                    # A loan returned before the cutoff was borrowed before it, which prunes
+                    # the newer partitions
+                    LibraryCardModel.borrow_date < cutoff,
+                    LibraryCardModel.return_date < cutoff,
+                ))
+                .order_by(LibraryCardModel.library_card_id)
+                .limit(config.LOAN_ARCHIVE_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )
+            moved = (
+                delete(LibraryCardModel)
+                .where(
+                    tuple_(LibraryCardModel.library_card_id, LibraryCardModel.borrow_date)
+                    .in_(batch)
+                )
+                .returning(*LibraryCardModel.__table__.columns)
+                .cte("moved")
+            )
+            stm = (
+                insert(LibraryCardArchiveModel)
+                .from_select(columns, select(*(moved.c[column] for column in columns)))
+                .returning(LibraryCardArchiveModel.library_card_id)
+                .add_cte(moved)
+            )
+            ids = (await session.scalars(stm)).all()
+            await session.commit()
+            if not ids:
+                break
+            after_id = max(ids)
+            archived += len(ids)
+            await asyncio.sleep(config.LOAN_ARCHIVE_BATCH_PAUSE)
+        logger.info("Archived [%s] returned loans", archived)
+
+    async def get_recommendations(
+        self, session: AsyncSession, book_id: int, limit: int
+    ) -> typing.Sequence[Row]:
+        stm = lambda_stmt(lambda: (
+            select(
+                BookModel.book_id,
+                BookModel.title,
+                BookModel.author_id,
+                BookRecommendationModel.readers,
+            )
+            .join(BookModel, BookModel.book_id == BookRecommendationModel.recommended_book_id)
+            .where(BookRecommendationModel.book_id == book_id)
+            .order_by(BookRecommendationModel.rank)
+            .limit(limit)
+        ))
+        return (await session.execute(stm)).all()
+
+    async def refresh_recommendations(self, session: AsyncSession) -> None:
+        """Rebuild the top RECOMMENDATIONS_TOP_K co-borrowed books of every book.
+
+        The book x book co-occurrence counts are computed by Postgres, set-based over
+        current and archived loans, for a range of books per transaction: the readers
+        of those books, then every other book those readers borrowed. Each transaction
+        holds an advisory lock, a run that finds it taken leaves the rebuild to the
+        process holding it.
+        """
+        config = self.store.config
+        loan_models = (LibraryCardModel, LibraryCardArchiveModel)
+        after_id, refreshed = 0, 0
+        while True:
+            locked = await session.scalar(
+                select(func.pg_try_advisory_xact_lock(func.hashtext(RECOMMENDATIONS_LOCK)))
+            )
+            if not locked:
+                logger.info("Recommendations are rebuilt by another process, skipped")
+                return
+            books = (
+                select(BookModel.book_id)
+                .where(BookModel.book_id > after_id)
+                .order_by(BookModel.book_id)
+                .limit(config.RECOMMENDATIONS_BATCH_SIZE)
+                .subquery()
+            )
+            last_id = await session.scalar(select(func.max(books.c.book_id)))
+            if last_id is None:
+                break
+            # UNION, not UNION ALL: a reader counts once however often they borrowed a book
+            source = union(*(
+                select(model.reader_id, model.book_id)
+                .where(and_(model.book_id > after_id, model.book_id <= last_id))
+                for model in loan_models
+            )).cte("source")
+            other = union(*(
+                select(model.reader_id, model.book_id)
+                .where(model.reader_id.in_(select(source.c.reader_id)))
+                for model in loan_models
+            )).subquery("other")
+            pairs = (
+                select(
+                    source.c.book_id,
+                    other.c.book_id.label("recommended_book_id"),
+                    func.count().label("readers"),
+                )
+                .join(other, and_(
+                    other.c.reader_id == source.c.reader_id,
+                    other.c.book_id != source.c.book_id,
+                ))
+                .group_by(source.c.book_id, other.c.book_id)
+                .subquery("pairs")
+            )
+            ranked = select(
+                pairs,
+                func.row_number().over(
+                    partition_by=pairs.c.book_id,
+                    order_by=(pairs.c.readers.desc(), pairs.c.recommended_book_id),
+                ).label("rank"),
+            ).subquery("ranked")
+            top = select(
+                ranked.c.book_id, ranked.c.rank, ranked.c.recommended_book_id, ranked.c.readers
+            ).where(ranked.c.rank <= config.RECOMMENDATIONS_TOP_K)
+            await session.execute(
+                delete(BookRecommendationModel).where(and_(
+                    BookRecommendationModel.book_id > after_id,
+                    BookRecommendationModel.book_id <= last_id,
+                ))
+            )
+            await session.execute(
+                insert(BookRecommendationModel).from_select(
+                    ["book_id", "rank", "recommended_book_id", "readers"], top
+                )
+            )
+            await session.commit()
+            after_id, refreshed = last_id, refreshed + 1
+            await asyncio.sleep(config.RECOMMENDATIONS_BATCH_PAUSE)
+        logger.info("Recommendations rebuilt in [%s] batch(es)", refreshed)
+
+    async def create_loan_partitions(self, session: AsyncSession) -> None:
+        await create_partitions(session, self.store.config.LIBRARY_CARDS_PARTITIONS_AHEAD)
+
+    async def compact_change_log(self, session: AsyncSession) -> None:
+        retention = timedelta(days=self.store.config.CHANGE_LOG_RETENTION_DAYS)
+        newer = aliased(ChangeLogModel)
+        superseded = (
+            select(newer.change_id)
+            .where(and_(
+                newer.entity == ChangeLogModel.entity,
+                newer.entity_id == ChangeLogModel.entity_id,
+                newer.change_id > ChangeLogModel.change_id,
+            ))
+            .exists()
+        )
+        stm = delete(ChangeLogModel).where(and_(
+            ChangeLogModel.created_at < func.now() - retention,
+            or_(superseded, ChangeLogModel.operation == "delete"),
+        ))
+        result = await session.execute(stm)
+        await session.commit()
+        logger.info("Change log compacted, removed [%s] entries", result.rowcount)
@@ -1,42 +1,73 @@
 import logging
+from collections.abc import AsyncIterator, Sequence
+from datetime import date, datetime
 from typing import Annotated
 
-from fastapi import APIRouter, Body, Depends, Path, status
+from fastapi import APIRouter, Body, Depends, Path, Query, status
+from fastapi.responses import StreamingResponse
 from pydantic import EmailStr
+from sqlalchemy import Row
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.admin.schemes import AdminScheme
+from app.audit.log import AuditLog
 from app.auth.bearer import AccessTokenBearer
 from app.library.repository import LibraryRepository
 from app.library.schemes import (
+        ActiveReadersScheme,
+        AuthorBooksScheme,
         AuthorCreateScheme,
         AuthorReadScheme,
+        AuthorStatsScheme,
+        AutocompleteScheme,
         BookCreateScheme,
+        BookExpandedScheme,
         BookReadScheme,
-        LibraryCardCSchemes,
+        ChangeFeedScheme,
+        ChangeScheme,
+        DailyCirculationScheme,
+        HoldReadScheme,
+        LoanExpandedScheme,
+        LoanHistoryScheme,
+        MonthlyLoansScheme,
+        OverdueLoanScheme,
         ReaderCreateScheme,
+        ReaderDashboardScheme,
         ReaderReadScheme,
+        RecommendationScheme,
+        TopBookScheme,
 )
+from app.library.services import expand_books, expand_loans
+from app.monitoring.tracing import TracedRoute
+from app.store.store import Store
 from app.web.config import BusinessConfig
 from app.web.dependencies import (
+        Includes,
+        get_audit_log,
         get_business_config,
         get_library_repo,
         get_session,
+        get_store,
 )
 from app.web.exceptions import (
         AuthorNotFoundError,
+        BookAvailableError,
+        BookInUseError,
         BookNotFoundError,
         BookUnavailableError,
         ConflictError,
         EmailAlreadyTakenError,
+        HoldAlreadyExistsError,
+        HoldNotFoundError,
         LibraryCardNotFoundError,
         MaxBooksLimitReachedError,
+        ReaderInUseError,
         ReaderNotFoundError,
 )
-from app.web.utils import ResponseScheme
+from app.web.utils import JSONTextResponse, ResponseScheme, RowsResponse
 
-router = APIRouter(prefix="/library")
+router = APIRouter(prefix="/library", route_class=TracedRoute)
 logger = logging.getLogger(__name__)
 
 
@@ -45,6 +76,7 @@ logger = logging.getLogger(__name__)
 async def add_author(
     data_author: AuthorCreateScheme,
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
 ) -> ResponseScheme[AuthorReadScheme]:
@@ -56,13 +88,61 @@ async def add_author(
             raise ConflictError(
                 status.HTTP_409_CONFLICT,
                 detail=f"There is already an author with this name [{data_author.name}]") from e
+        await audit.record(current_user.admin_id, "create", "author", author.author_id)
         return ResponseScheme(data=author)
 
 
+@router.get("/author", status_code=status.HTTP_200_OK)
+async def get_authors(
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    # Keyset cursor, the author_id of the last author of the previous page
+    after_id: int = 0,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> ResponseScheme[list[AuthorStatsScheme]]:
+    authors = await repository.get_authors(session, after_id, limit)
+    return ResponseScheme(data=[AuthorStatsScheme.model_validate(author) for author in authors])
+
+
+@router.get("/author/{author_id}", status_code=status.HTTP_200_OK)
+async def get_author(
+    author_id: int,
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> ResponseScheme[AuthorStatsScheme]:
+    author = await repository.get_author_stats(session, author_id)
+    if author is None:
+        logger.warning("There is no author with this ID: [%s]", author_id)
+        raise AuthorNotFoundError(author_id)
+    return ResponseScheme(data=AuthorStatsScheme.model_validate(author))
+
+
+@router.get("/author/{author_id}/books", status_code=status.HTTP_200_OK)
+async def get_author_books(
+    author_id: int,
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    after_id: int = 0,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> ResponseScheme[AuthorBooksScheme]:
+    if await repository.get_author(session, author_id) is None:
+        logger.warning("There is no author with this ID: [%s]", author_id)
+        raise AuthorNotFoundError(author_id)
+    books = await repository.get_author_books(session, author_id, after_id, limit)
+    return ResponseScheme(data=AuthorBooksScheme(
+        books=[BookReadScheme.model_validate(book) for book in books],
+        next_after_id=books[-1].book_id if len(books) == limit else None,
+    ))
+
+
 @router.post("/books", status_code=status.HTTP_201_CREATED)
 async def add_book(
     data_book: BookCreateScheme,
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
 ) -> ResponseScheme[BookReadScheme]:
@@ -79,16 +159,24 @@ async def add_book(
         if e.orig.pgcode == '23503':
             logger.warning("There is no author with such ID: [%s]", data_book.author_id)
             raise AuthorNotFoundError(data_book.author_id) from e
+    await audit.record(current_user.admin_id, "create", "book", book.book_id)
     return ResponseScheme(data=book)
 
 
-@router.get("/books", status_code=status.HTTP_200_OK)
+@router.get(
+    "/books",
+    status_code=status.HTTP_200_OK,
+    response_model=ResponseScheme[list[BookExpandedScheme]],
+)
 async def get_books(
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
     session: Annotated[AsyncSession, Depends(get_session)],
-) -> ResponseScheme[list[BookReadScheme]]:
+    include: Annotated[frozenset[str], Depends(Includes("author"))],
+) -> RowsResponse | ResponseScheme[list[BookExpandedScheme]]:
     books = await repository.get_books(session)
-    return ResponseScheme(data=list(books))
+    if not include:
+        return RowsResponse(books)
+    return ResponseScheme(data=await expand_books(repository, session, books, include))
 
 
 @router.get("/books/{book_id}", status_code=status.HTTP_200_OK)
@@ -97,27 +185,35 @@ async def get_book(
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
-) -> ResponseScheme[BookReadScheme]:
+    include: Annotated[frozenset[str], Depends(Includes("author"))],
+) -> ResponseScheme[BookExpandedScheme]:
     book = await repository.get_book(session, book_id)
     if book is None:
         logger.warning("There is no book with this ID: [%s]", book_id)
         raise BookNotFoundError(book_id)
-    return ResponseScheme(data=book)
+    [expanded] = await expand_books(repository, session, [book], include)
+    return ResponseScheme(data=expanded)
 
 
 @router.delete("/books/{book_id}", status_code=status.HTTP_200_OK)
 async def del_book(
     book_id: int,
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
 ) -> ResponseScheme[BookReadScheme]:
-    book = await repository.del_book(session, book_id)
+    try:
+        book = await repository.del_book(session, book_id)
+    except BookInUseError:
+        logger.warning("The book ID: [%s] has loans or holds, not deleted", book_id)
+        raise
     if book is None:
         logger.warning("There is no book with this ID: [%s]", book_id)
         raise BookNotFoundError(book_id)
     logger.info("Book with this ID: [%s] has been deleted successfully", book_id)
-    return ResponseScheme(book)
+    await audit.record(current_user.admin_id, "delete", "book", book_id)
+    return ResponseScheme(data=book)
 
 
 # TODO: Не добавлял возможность изменять количество книг намеренно
@@ -126,6 +222,7 @@ async def del_book(
 async def update_book(
     book_id: Annotated[int, Path()],
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
     title: Annotated[str | None, Body()] = None,
@@ -142,18 +239,134 @@ async def update_book(
         logger.warning("There is no book with this ID: [%s]", book_id)
         raise BookNotFoundError(book_id)
     logger.info("Book with this ID: [%s] has been updated successfully", book_id)
+    changes = {"title": title, "author_id": author_id, "year": year, "isbn": isbn}
+    await audit.record(
+        current_user.admin_id, "update", "book", book_id,
+        {field: value for field, value in changes.items() if value is not None},
+    )
+    return ResponseScheme(data=book)
+
+
+@router.put("/books/{book_id}/stock-shards", status_code=status.HTTP_200_OK)
+async def split_book_stock(
+    book_id: Annotated[int, Path()],
+    shards: Annotated[int, Body(embed=True, ge=0, le=64)],
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> ResponseScheme[BookReadScheme]:
+    book = await repository.split_book_stock(session, book_id, shards)
+    if book is None:
+        logger.warning("There is no book with this ID: [%s]", book_id)
+        raise BookNotFoundError(book_id)
+    logger.info("Stock of the book ID: [%s] is now split into [%s] shards", book_id, shards)
+    await audit.record(current_user.admin_id, "split_stock", "book", book_id, {"shards": shards})
     return ResponseScheme(data=book)
 
 
-@router.get("/readers/{reader_id}/books", status_code=status.HTTP_200_OK)
+@router.get(
+    "/readers/{reader_id}/books",
+    status_code=status.HTTP_200_OK,
+    response_model=ResponseScheme[list[BookExpandedScheme]],
+)
 async def get_books_for_reader(
     reader_id: int,
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
-) -> ResponseScheme[BookReadScheme]:
+    include: Annotated[frozenset[str], Depends(Includes("author"))],
+) -> RowsResponse | ResponseScheme[list[BookExpandedScheme]]:
     books = await repository.get_books_for_reader(session, reader_id)
-    return ResponseScheme(data=list(books))
+    if not include:
+        return RowsResponse(books)
+    return ResponseScheme(data=await expand_books(repository, session, books, include))
+
+
+# TODO: История выдач с keyset пагинацией по borrow_date
+@router.get("/readers/{reader_id}/history", status_code=status.HTTP_200_OK)
+async def get_reader_history(
+    reader_id: int,
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    include: Annotated[frozenset[str], Depends(Includes("book", "reader"))],
+    before: datetime | None = None,
+    before_id: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    monthly: bool = False,
+) -> ResponseScheme[LoanHistoryScheme]:
+    cursor = (before, before_id) if before is not None and before_id is not None else None
+    loans = await repository.get_reader_history(session, reader_id, cursor, limit)
+    months = await repository.get_reader_monthly_loans(session, reader_id) if monthly else None
+    expanded = await expand_loans(repository, session, loans, include)
+    return ResponseScheme(data=_history_page(expanded, limit, months))
+
+
+@router.get("/books/{book_id}/recommendations", status_code=status.HTTP_200_OK)
+async def get_book_recommendations(
+    book_id: int,
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+) -> ResponseScheme[list[RecommendationScheme]]:
+    # Precomputed by the book_recommendations job, a book it has not seen yet has none
+    books = await repository.get_recommendations(session, book_id, limit)
+    return ResponseScheme(data=[RecommendationScheme.model_validate(book) for book in books])
+
+
+@router.get("/books/{book_id}/history", status_code=status.HTTP_200_OK)
+async def get_book_history(
+    book_id: int,
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    include: Annotated[frozenset[str], Depends(Includes("book", "reader"))],
+    before: datetime | None = None,
+    before_id: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    monthly: bool = False,
+) -> ResponseScheme[LoanHistoryScheme]:
+    cursor = (before, before_id) if before is not None and before_id is not None else None
+    loans = await repository.get_book_history(session, book_id, cursor, limit)
+    months = await repository.get_book_monthly_loans(session, book_id) if monthly else None
+    expanded = await expand_loans(repository, session, loans, include)
+    return ResponseScheme(data=_history_page(expanded, limit, months))
+
+
+def _history_page(
+    loans: list[LoanExpandedScheme], limit: int, months: Sequence[Row] | None
+) -> LoanHistoryScheme:
+    last = loans[-1] if len(loans) == limit else None
+    return LoanHistoryScheme(
+        loans=loans,
+        next_before=last.borrow_date if last else None,
+        next_before_id=last.library_card_id if last else None,
+        monthly=None if months is None else [
+            MonthlyLoansScheme.model_validate(month) for month in months
+        ],
+    )
+
+
+# TODO: Дашборд читателя для терминала выдачи, тело ответа собирает Postgres
+@router.get(
+    "/readers/{reader_id}/dashboard",
+    status_code=status.HTTP_200_OK,
+    response_model=ResponseScheme[ReaderDashboardScheme],
+)
+async def get_reader_dashboard(
+    reader_id: int,
+    config: Annotated[BusinessConfig, Depends(get_business_config)],
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> JSONTextResponse:
+    body = await repository.get_reader_dashboard(session, reader_id, config.max_books_per_reader)
+    if body is None:
+        logger.warning("There is no reader with this ID: [%s]", reader_id)
+        raise ReaderNotFoundError(reader_id)
+    return JSONTextResponse(body)
 
 
 # TODO: CRUD операции над Читателями Readers
@@ -161,6 +374,7 @@ async def get_books_for_reader(
 async def add_reader(
     data_reader: ReaderCreateScheme,
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
 ) -> ResponseScheme[ReaderReadScheme]:
     try:
@@ -169,17 +383,28 @@ async def add_reader(
     except SQLAlchemyError as e:
         logger.info("There is already an reader with this email [%s]", data_reader.email)
         raise EmailAlreadyTakenError(data_reader.email) from e
+    # Readers sign up without a token, so there is no admin behind this one
+    await audit.record(None, "create", "reader", reader.reader_id)
     return ResponseScheme(data=reader)
 
 
-@router.get("/readers", status_code=status.HTTP_200_OK)
+@router.get(
+    "/readers",
+    status_code=status.HTTP_200_OK,
+    response_model=ResponseScheme[list[ReaderReadScheme]],
+)
 async def get_readers(
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
-) -> ResponseScheme[list[ReaderReadScheme]]:
-    readers = await repository.get_readers(session)
-    return ResponseScheme(data=list(readers))
+    # Trigrams need three characters, shorter queries would scan the whole table
+    q: Annotated[str | None, Query(min_length=3, max_length=200)] = None,
+    # Keyset cursor, the reader_id of the last reader of the previous page
+    after_id: int | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> RowsResponse:
+    readers = await repository.get_readers(session, q, after_id, limit)
+    return RowsResponse(readers)
 
 
 @router.get("/readers/{reader_id}", status_code=status.HTTP_200_OK)
@@ -200,14 +425,20 @@ async def get_reader(
 async def del_reader(
     reader_id: int,
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
 ) -> ResponseScheme[ReaderReadScheme]:
-    reader = await repository.del_reader(session, reader_id)
+    try:
+        reader = await repository.del_reader(session, reader_id)
+    except ReaderInUseError:
+        logger.warning("The reader ID: [%s] has loans or holds, not deleted", reader_id)
+        raise
     if reader is None:
         logger.warning("There is no reader with this ID: [%s]", reader_id)
         raise ReaderNotFoundError(reader_id)
     logger.info("Reader with this ID: [%s] has been deleted successfully", reader_id)
+    await audit.record(current_user.admin_id, "delete", "reader", reader_id)
     return ResponseScheme(data=reader)
 
 
@@ -215,6 +446,7 @@ async def del_reader(
 async def update_reader(
     reader_id: Annotated[int, Path()],
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
     name: Annotated[str | None, Body()] = None,
@@ -228,6 +460,11 @@ async def update_reader(
     if reader is None:
         logger.warning("There is no reader with this ID: [%s]", reader_id)
         raise ReaderNotFoundError(reader_id)
+    changes = {"name": name, "email": email}
+    await audit.record(
+        current_user.admin_id, "update", "reader", reader_id,
+        {field: value for field, value in changes.items() if value is not None},
+    )
     return ResponseScheme(data=reader)
 
 
@@ -238,16 +475,19 @@ async def borrow_book(
     reader_id: int,
     config: Annotated[BusinessConfig, Depends(get_business_config)],
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
-) -> ResponseScheme[LibraryCardCSchemes]:
+    include: Annotated[frozenset[str], Depends(Includes("book", "reader"))],
+) -> ResponseScheme[LoanExpandedScheme]:
     book = await repository.get_book(session, book_id)
 
     if book is None:
         logger.warning("There is no book with this ID: [%s]", book_id)
         raise BookNotFoundError(book_id)
 
-    if book.amount < 1:
+    hold = await repository.get_ready_hold(session, book_id, reader_id)
+    if hold is None and book.amount < 1:
         logger.warning("There is no instance of the book available. with this ID [%s]", book_id)
         raise BookUnavailableError(book_id)
 
@@ -257,14 +497,20 @@ async def borrow_book(
         raise MaxBooksLimitReachedError(reader_id)
 
     try:
-        record = await repository.borrow_book(session, book, reader_id)
-        logger.info(
-            "A book issue record has been created. record ID: [%s]", record.library_card_id
-        )
+        record = await repository.borrow_book(session, book, reader_id, hold)
     except IntegrityError as e:
         logger.warning("There is no reader with such ID: [%s]", reader_id)
         raise ReaderNotFoundError(reader_id) from e
-    return ResponseScheme(data=record)
+    if record is None:
+        logger.warning("The last instance of the book ID: [%s] was taken concurrently", book_id)
+        raise BookUnavailableError(book_id)
+    logger.info("A book issue record has been created. record ID: [%s]", record.library_card_id)
+    await audit.record(
+        current_user.admin_id, "borrow", "loan", record.library_card_id,
+        {"book_id": book_id, "reader_id": reader_id},
+    )
+    [expanded] = await expand_loans(repository, session, [record], include)
+    return ResponseScheme(data=expanded)
 
 
 @router.post("/readers/{reader_id}/returns/{book_id}", status_code=status.HTTP_200_OK)
@@ -272,9 +518,11 @@ async def return_book(
     book_id: int,
     reader_id: int,
     repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
     session: Annotated[AsyncSession, Depends(get_session)],
     current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
-) -> ResponseScheme[LibraryCardCSchemes]:
+    include: Annotated[frozenset[str], Depends(Includes("book", "reader"))],
+) -> ResponseScheme[LoanExpandedScheme]:
     record = await repository.get_unreturned_library_record(session, book_id, reader_id)
     if record is None:
         logger.warning(
@@ -291,4 +539,179 @@ async def return_book(
     logger.info(
         "The book ID: [%s] was successfully returned by the reader: [%s]", book_id, reader_id
     )
-    return ResponseScheme(body=record)
+    await audit.record(
+        current_user.admin_id, "return", "loan", record.library_card_id,
+        {"book_id": book_id, "reader_id": reader_id},
+    )
+    [expanded] = await expand_loans(repository, session, [record], include)
+    return ResponseScheme(data=expanded)
+
+
+# TODO: Очередь ожидания (holds) на недоступные книги
+@router.post("/readers/{reader_id}/holds/{book_id}", status_code=status.HTTP_201_CREATED)
+async def place_hold(
+    book_id: int,
+    reader_id: int,
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> ResponseScheme[HoldReadScheme]:
+    try:
+        hold = await repository.place_hold(session, book_id, reader_id)
+    except BookAvailableError:
+        logger.warning("The book ID: [%s] is available, hold is not needed", book_id)
+        raise
+    except IntegrityError as e:
+        if e.orig.pgcode == '23505':
+            logger.warning(
+                "Reader ID: [%s] already has an active hold on the book: [%s]", reader_id, book_id
+            )
+            raise HoldAlreadyExistsError(book_id, reader_id) from e
+        logger.warning("There is no reader with such ID: [%s]", reader_id)
+        raise ReaderNotFoundError(reader_id) from e
+    if hold is None:
+        logger.warning("There is no book with this ID: [%s]", book_id)
+        raise BookNotFoundError(book_id)
+    logger.info("Hold ID: [%s] placed on the book: [%s]", hold.hold_id, book_id)
+    await audit.record(
+        current_user.admin_id, "place", "hold", hold.hold_id,
+        {"book_id": book_id, "reader_id": reader_id},
+    )
+    return ResponseScheme(data=hold)
+
+
+@router.delete("/readers/{reader_id}/holds/{book_id}", status_code=status.HTTP_200_OK)
+async def cancel_hold(
+    book_id: int,
+    reader_id: int,
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    audit: Annotated[AuditLog, Depends(get_audit_log)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> ResponseScheme[HoldReadScheme]:
+    hold = await repository.cancel_hold(session, book_id, reader_id)
+    if hold is None:
+        logger.warning(
+            "No active hold with such book_id: [%s], reader_id: [%s]", book_id, reader_id
+        )
+        raise HoldNotFoundError(book_id, reader_id)
+    logger.info("Hold ID: [%s] has been cancelled", hold.hold_id)
+    await audit.record(current_user.admin_id, "cancel", "hold", hold.hold_id)
+    return ResponseScheme(data=hold)
+
+
+# TODO: Автодополнение названий книг и имён авторов: из памяти, иначе по триграммным индексам
+@router.get("/autocomplete", status_code=status.HTTP_200_OK)
+async def autocomplete(
+    prefix: Annotated[str, Query(min_length=1, max_length=200)],
+    store: Annotated[Store, Depends(get_store)],
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+) -> ResponseScheme[list[AutocompleteScheme]]:
+    matches = store.autocomplete.lookup(prefix, limit)
+    # No exact prefix in memory may still be a typo, worth a similarity search
+    if matches is None or (
+        not matches and len(prefix) >= store.config.AUTOCOMPLETE_FUZZY_MIN_PREFIX
+    ):
+        matches = await repository.search_names(session, prefix, limit)
+    return ResponseScheme(data=[
+        AutocompleteScheme(kind=kind, id=item_id, text=text) for kind, item_id, text, *_ in matches
+    ])
+
+
+# TODO: Лента изменений для инкрементальной синхронизации зеркал
+@router.get("/changes", status_code=status.HTTP_200_OK)
+async def get_changes(
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    since: Annotated[str, Query(pattern=r"^\d+(:\d+)?$")] = "0:0",
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+) -> ResponseScheme[ChangeFeedScheme]:
+    if ":" in since:
+        txid, change_id = map(int, since.split(":"))
+        cursor = (txid, change_id)
+    else:
+        # A bare change_id, the cursor of the feed before txids
+        cursor = await repository.get_change_cursor(session, int(since))
+    records = await repository.get_changes(session, cursor, limit)
+    changes = [ChangeScheme.model_validate(record) for record in records]
+    next_cursor = f"{changes[-1].txid}:{changes[-1].change_id}" if changes else since
+    return ResponseScheme(data=ChangeFeedScheme(changes=changes, next_cursor=next_cursor))
+
+
+# TODO: Просроченные выдачи с контактами читателей, построчно (NDJSON) через серверный курсор
+@router.get(
+    "/loans/overdue",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+)
+async def stream_overdue_loans(
+    store: Annotated[Store, Depends(get_store)],
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> StreamingResponse:
+    logger.info("Overdue loans report requested by admin ID: [%s]", current_user.admin_id)
+
+    # The request session is closed before the body is sent, the stream holds its own
+    async def lines() -> AsyncIterator[str]:
+        async with store.database.session_maker() as session:
+            async for loan in repository.stream_overdue_loans(session):
+                yield OverdueLoanScheme.model_validate(loan).model_dump_json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+# TODO: Статистика выдач из дневных агрегатов, по умолчанию за текущий месяц
+async def stats_period(
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    since: date | None = None,
+    until: date | None = None,
+) -> tuple[date, date]:
+    if since is not None and until is not None:
+        return since, until
+    # The rollups are keyed by current_date of the database, not of this process
+    today = await repository.get_current_date(session)
+    return since or today.replace(day=1), until or today
+
+
+@router.get("/stats/top-books", status_code=status.HTTP_200_OK)
+async def get_top_books(
+    period: Annotated[tuple[date, date], Depends(stats_period)],
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+) -> ResponseScheme[list[TopBookScheme]]:
+    books = await repository.get_top_books(session, *period, limit)
+    return ResponseScheme(data=[TopBookScheme.model_validate(book) for book in books])
+
+
+@router.get("/stats/daily", status_code=status.HTTP_200_OK)
+async def get_daily_circulation(
+    period: Annotated[tuple[date, date], Depends(stats_period)],
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> ResponseScheme[list[DailyCirculationScheme]]:
+    days = await repository.get_daily_circulation(session, *period)
+    return ResponseScheme(data=[DailyCirculationScheme.model_validate(day) for day in days])
+
+
+@router.get("/stats/active-readers", status_code=status.HTTP_200_OK)
+async def get_active_readers(
+    period: Annotated[tuple[date, date], Depends(stats_period)],
+    repository: Annotated[LibraryRepository, Depends(get_library_repo)],
+    session: Annotated[AsyncSession, Depends(get_session)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+) -> ResponseScheme[ActiveReadersScheme]:
+    active_readers = await repository.count_active_readers(session, *period)
+    since, until = period
+    return ResponseScheme(
+        data=ActiveReadersScheme(since=since, until=until, active_readers=active_readers)
+    )
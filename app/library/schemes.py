@@ -1,4 +1,5 @@
-from datetime import datetime
+from datetime import date, datetime
+from typing import Literal
 
 from pydantic import EmailStr, Field
 
@@ -13,6 +14,14 @@ class AuthorReadScheme(AuthorCreateScheme):
     author_id: int
 
 
+class AuthorStatsScheme(AuthorReadScheme):
+    books: int
+    # Copies on the shelf, out on loan or set aside for a hold
+    total_copies: int
+    # Copies on the shelf
+    available_copies: int
+
+
 class BookCreateScheme(BaseScheme):
     title: str
     author_id: int
@@ -25,6 +34,17 @@ class BookReadScheme(BookCreateScheme):
     book_id: int
 
 
+class BookExpandedScheme(BookReadScheme):
+    # Embedded with ?include=author
+    author: AuthorReadScheme | None = None
+
+
+class AuthorBooksScheme(BaseScheme):
+    books: list[BookReadScheme]
+    # Keyset cursor of the next page, pass it back as after_id
+    next_after_id: int | None
+
+
 class ReaderCreateScheme(BaseScheme):
     name: str
     email: EmailStr
@@ -40,3 +60,112 @@ class LibraryCardCSchemes(BaseScheme):
     book_id: int
     borrow_date: datetime
     return_date: datetime | None = Field(default=None)
+    due_date: datetime | None = Field(default=None)
+
+
+class LoanExpandedScheme(LibraryCardCSchemes):
+    # Embedded with ?include=book,reader
+    book: BookReadScheme | None = None
+    reader: ReaderReadScheme | None = None
+
+
+class OverdueLoanScheme(BaseScheme):
+    library_card_id: int
+    book_id: int
+    title: str
+    borrow_date: datetime
+    due_date: datetime
+    reader_id: int
+    reader_name: str
+    email: EmailStr
+
+
+class MonthlyLoansScheme(BaseScheme):
+    month: date
+    loans: int
+    running_total: int
+
+
+class LoanHistoryScheme(BaseScheme):
+    loans: list[LoanExpandedScheme]
+    # Keyset cursor of the next page, pass both back as before/before_id
+    next_before: datetime | None
+    next_before_id: int | None
+    monthly: list[MonthlyLoansScheme] | None = None
+
+
+class RecommendationScheme(BaseScheme):
+    book_id: int
+    title: str
+    author_id: int
+    # Readers who borrowed this book and the one it is recommended for
+    readers: int
+
+
+class TopBookScheme(BaseScheme):
+    book_id: int
+    title: str
+    loans: int
+
+
+class DailyCirculationScheme(BaseScheme):
+    day: date
+    loans: int
+    returns: int
+
+
+class ActiveReadersScheme(BaseScheme):
+    since: date
+    until: date
+    active_readers: int
+
+
+class DashboardLoanScheme(BaseScheme):
+    library_card_id: int
+    borrow_date: datetime
+    due_date: datetime | None
+    book_id: int
+    title: str
+    author_id: int
+    author_name: str
+    year: int | None
+    isbn: str | None
+
+
+class ReaderDashboardScheme(BaseScheme):
+    reader_id: int
+    name: str
+    email: EmailStr
+    active_loans: list[DashboardLoanScheme]
+    active_loans_count: int
+    remaining_allowance: int
+
+
+class ChangeScheme(BaseScheme):
+    change_id: int
+    txid: int
+    entity: str
+    entity_id: int
+    operation: str
+    payload: dict | None
+    created_at: datetime
+
+
+class ChangeFeedScheme(BaseScheme):
+    changes: list[ChangeScheme]
+    next_cursor: str
+
+
+class HoldReadScheme(BaseScheme):
+    hold_id: int
+    book_id: int
+    reader_id: int
+    status: str
+    created_at: datetime
+    expires_at: datetime | None = Field(default=None)
+
+
+class AutocompleteScheme(BaseScheme):
+    kind: Literal["book", "author"]
+    id: int
+    text: str
@@ -0,0 +1,59 @@
+"""Embedding of related entities asked for with ?include=, one query per relation."""
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.base.schemes import BaseScheme
+from app.library.repository import LibraryRepository
+from app.library.schemes import (
+    AuthorReadScheme,
+    BookExpandedScheme,
+    BookReadScheme,
+    LibraryCardCSchemes,
+    LoanExpandedScheme,
+    ReaderReadScheme,
+)
+
+
+def _expand[Expanded: BaseScheme](
+    scheme: type[Expanded], base: type[BaseScheme], item: Any
+) -> Expanded:
+    # Read through the base scheme: the relationships of an ORM object are never touched,
+    # they raise or would be loaded one by one
+    return scheme.model_validate(base.model_validate(item), from_attributes=True)
+
+
+async def expand_books(
+    repository: LibraryRepository,
+    session: AsyncSession,
+    books: Sequence[Any],
+    include: frozenset[str],
+) -> list[BookExpandedScheme]:
+    expanded = [_expand(BookExpandedScheme, BookReadScheme, book) for book in books]
+    if "author" in include and expanded:
+        rows = await repository.get_authors_by_ids(session, {book.author_id for book in expanded})
+        authors = {row.author_id: AuthorReadScheme.model_validate(row) for row in rows}
+        for book in expanded:
+            book.author = authors.get(book.author_id)
+    return expanded
+
+
+async def expand_loans(
+    repository: LibraryRepository,
+    session: AsyncSession,
+    loans: Sequence[Any],
+    include: frozenset[str],
+) -> list[LoanExpandedScheme]:
+    expanded = [_expand(LoanExpandedScheme, LibraryCardCSchemes, loan) for loan in loans]
+    if "book" in include and expanded:
+        rows = await repository.get_books_by_ids(session, {loan.book_id for loan in expanded})
+        books = {row.book_id: BookReadScheme.model_validate(row) for row in rows}
+        for loan in expanded:
+            loan.book = books.get(loan.book_id)
+    if "reader" in include and expanded:
+        rows = await repository.get_readers_by_ids(session, {loan.reader_id for loan in expanded})
+        readers = {row.reader_id: ReaderReadScheme.model_validate(row) for row in rows}
+        for loan in expanded:
+            loan.reader = readers.get(loan.reader_id)
+    return expanded
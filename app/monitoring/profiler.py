@@ -0,0 +1,155 @@
+import asyncio
+import os
+import sys
+import threading
+import typing
+from collections import Counter
+from types import FrameType
+
+from app.web.exceptions import ProfilerBusyError
+
+# (function, file, first line of the function), lines are left out so a function is one node
+Frame = tuple[str, str, int]
+Stack = tuple[Frame, ...]
+
+
+class SamplingProfiler:
+    """Samples the thread and asyncio task stacks of this worker on demand.
+
+    Nothing is installed while idle. A profile is a daemon thread reading
+    ``sys._current_frames()`` every interval, plus a loop callback walking the
+    coroutine chains of pending tasks, so it shows both what the threads run
+    and what every task is awaiting.
+    """
+
+    def __init__(self) -> None:
+        self._running = False
+
+    async def profile(self, duration: float, interval: float) -> Counter[Stack]:
+        if self._running:
+            raise ProfilerBusyError
+        self._running = True
+        try:
+            # Each counter is written by one thread only, the sampler or the event loop
+            thread_stacks: Counter[Stack] = Counter()
+            task_stacks: Counter[Stack] = Counter()
+            stop = threading.Event()
+            sampler = threading.Thread(
+                target=self._sample,
+                args=(asyncio.get_running_loop(), asyncio.current_task(), interval, stop,
+                      thread_stacks, task_stacks),
+                name="sampling-profiler",
+                daemon=True,
+            )
+            sampler.start()
+            try:
+                await asyncio.sleep(duration)
+            finally:
+                stop.set()
+                await asyncio.to_thread(sampler.join)
+            return thread_stacks + task_stacks
+        finally:
+            self._running = False
+
+    def _sample(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        own_task: asyncio.Task | None,
+        interval: float,
+        stop: threading.Event,
+        thread_stacks: Counter[Stack],
+        task_stacks: Counter[Stack],
+    ) -> None:
+        own_thread = threading.get_ident()
+        tasks_pending = threading.Event()
+
+        def sample_tasks() -> None:
+            tasks_pending.clear()
+            for task in asyncio.all_tasks(loop):
+                if task is not own_task:
+                    root = ("asyncio task", "", 0)
+                    task_stacks[root, *_coroutine_stack(task.get_coro())] += 1
+
+        while not stop.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident != own_thread:
+                    root = (f"thread {names.get(ident, ident)}", "", 0)
+                    thread_stacks[root, *_frame_stack(frame)] += 1
+            # A blocked loop would otherwise pile up callbacks sampling the same state
+            if not tasks_pending.is_set():
+                tasks_pending.set()
+                loop.call_soon_threadsafe(sample_tasks)
+
+
+def _frame_key(frame: FrameType) -> Frame:
+    code = frame.f_code
+    return code.co_qualname, code.co_filename, code.co_firstlineno
+
+
+def _frame_stack(frame: FrameType | None) -> list[Frame]:
+    stack = []
+    while frame is not None:
+        stack.append(_frame_key(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _coroutine_stack(coro: typing.Any) -> list[Frame]:
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_key(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return stack
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})" if filename else name
+
+
+def to_collapsed(stacks: Counter[Stack]) -> str:
+    """Brendan Gregg's collapsed format, as read by flamegraph.pl and speedscope."""
+    return "".join(
+        f"{';'.join(_frame_label(frame) for frame in stack)} {count}\n"
+        for stack, count in stacks.most_common()
+    )
+
+
+def to_speedscope(stacks: Counter[Stack], interval: float, name: str) -> dict[str, typing.Any]:
+    """A speedscope file with one sampled profile for threads and one for tasks."""
+    frames: dict[Frame, int] = {}
+    profiles = {}
+    for kind in ("thread", "asyncio task"):
+        samples, weights = [], []
+        for stack, count in stacks.items():
+            if not stack[0][0].startswith(kind):
+                continue
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(round(count * interval * 1000, 3))
+        profiles[kind] = {
+            "type": "sampled",
+            "name": f"{name} - {kind}s",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "app.monitoring.profiler",
+        "shared": {
+            "frames": [
+                {"name": frame_name, "file": filename, "line": line} if filename
+                else {"name": frame_name}
+                for frame_name, filename, line in frames
+            ]
+        },
+        "profiles": list(profiles.values()),
+    }
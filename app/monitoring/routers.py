@@ -0,0 +1,82 @@
+import logging
+import os
+import time
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, Query, Response, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from app.admin.schemes import AdminScheme
+from app.auth.bearer import AccessTokenBearer
+from app.monitoring.profiler import to_collapsed, to_speedscope
+from app.monitoring.tracing import TracedRoute
+from app.store.admission import Priority
+from app.store.store import Store
+from app.web.dependencies import get_store
+from app.web.exceptions import ServiceNotReadyError
+
+router = APIRouter(route_class=TracedRoute)
+logger = logging.getLogger(__name__)
+
+
+@router.get("/metrics", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+async def get_metrics(store: Annotated[Store, Depends(get_store)]) -> str:
+    admission = store.admission
+    lines = [
+        "# TYPE admission_in_flight gauge",
+        f"admission_in_flight {admission.in_flight}",
+        "# TYPE admission_queue_depth gauge",
+        f"admission_queue_depth {admission.queue_depth}",
+        "# TYPE admission_admitted_total counter",
+        f"admission_admitted_total {admission.admitted_total}",
+        "# TYPE admission_shed_total counter",
+        *(
+            f'admission_shed_total{{priority="{priority.name.lower()}"}} '
+            f"{admission.shed_total[priority]}"
+            for priority in Priority
+        ),
+        "# TYPE audit_pending gauge",
+        f"audit_pending {store.audit_log.pending}",
+        "# TYPE audit_written_total counter",
+        f"audit_written_total {store.audit_log.written_total}",
+        "# TYPE audit_dropped_total counter",
+        f"audit_dropped_total {store.audit_log.dropped_total}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/health/live", status_code=status.HTTP_200_OK)
+async def liveness() -> dict[str, str]:
+    return {"status": "ok"}
+
+
+@router.get("/health/ready", status_code=status.HTTP_200_OK)
+async def readiness(store: Annotated[Store, Depends(get_store)]) -> dict[str, str]:
+    if not store.ready:
+        raise ServiceNotReadyError
+    return {"status": "ready"}
+
+
+@router.post("/profile", status_code=status.HTTP_200_OK, response_class=Response)
+async def profile_worker(
+    store: Annotated[Store, Depends(get_store)],
+    current_user: Annotated[AdminScheme, Depends(AccessTokenBearer())],
+    seconds: Annotated[float, Query(gt=0, le=60)] = 10,
+    interval_ms: Annotated[int, Query(ge=1, le=1000)] = 10,
+    output: Literal["speedscope", "collapsed"] = "speedscope",
+) -> Response:
+    logger.info(
+        "Profiling worker [%s] for [%s] s, admin ID: [%s]", os.getpid(), seconds,
+        current_user.admin_id,
+    )
+    stacks = await store.profiler.profile(seconds, interval_ms / 1000)
+    name = f"worker-{os.getpid()}-{time.strftime('%Y%m%dT%H%M%S')}"
+    if output == "collapsed":
+        return PlainTextResponse(
+            to_collapsed(stacks),
+            headers={"Content-Disposition": f'attachment; filename="{name}.collapsed.txt"'},
+        )
+    return JSONResponse(
+        to_speedscope(stacks, interval_ms / 1000, name),
+        headers={"Content-Disposition": f'attachment; filename="{name}.speedscope.json"'},
+    )
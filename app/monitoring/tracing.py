@@ -0,0 +1,368 @@
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import time
+import typing
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.web.config import Config
+from app.web.logger import ContextQueueHandler
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SAMPLED_FLAG = 0x01
+
+
+class SpanKind(IntEnum):
+    """Span kinds as numbered by OTLP."""
+
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+class Trace:
+    __slots__ = ("spans", "trace_id")
+
+    def __init__(self, trace_id: str) -> None:
+        self.trace_id = trace_id
+        self.spans: list[Span] = []
+
+
+class Span:
+    __slots__ = (
+        "attributes",
+        "end_ns",
+        "error",
+        "kind",
+        "name",
+        "parent_id",
+        "span_id",
+        "start_ns",
+        "trace",
+    )
+
+    def __init__(
+        self,
+        trace: Trace,
+        name: str,
+        parent_id: str | None = None,
+        kind: SpanKind = SpanKind.INTERNAL,
+        attributes: dict[str, typing.Any] | None = None,
+    ) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.error: str | None = None
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+
+    def end(self) -> None:
+        if not self.end_ns:
+            self.end_ns = time.time_ns()
+            self.trace.spans.append(self)
+
+    def child(
+        self, name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes: typing.Any
+    ) -> "Span":
+        return Span(self.trace, name, self.span_id, kind, attributes)
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Samples requests, records their spans and exports finished traces to a rotating file.
+
+    Unsampled requests have no current span, so every instrumentation point
+    reduces to one context variable lookup.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.sample_rate = config.TRACE_SAMPLE_RATE
+        self._logger = logging.getLogger("app.traces")
+        self._logger.propagate = False
+        self._listener: QueueListener | None = None
+
+    def start(self) -> None:
+        directory = os.path.dirname(self.config.TRACE_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            self.config.TRACE_FILE,
+            maxBytes=self.config.TRACE_FILE_MAX_BYTES,
+            backupCount=self.config.TRACE_FILE_BACKUP_COUNT,
+        )
+        file_handler.setFormatter(OtlpJsonFormatter(self.config.TRACE_SERVICE_NAME))
+        export_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._logger.handlers = [ContextQueueHandler(export_queue)]
+        self._logger.setLevel(logging.INFO)
+        self._listener = QueueListener(export_queue, file_handler)
+        self._listener.start()
+
+    def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+    def start_trace(self, name: str, traceparent: str | None = None) -> Span | None:
+        match = TRACEPARENT_RE.match(traceparent or "")
+        if match and int(match[1], 16) and int(match[2], 16):
+            if not int(match[3], 16) & SAMPLED_FLAG:
+                return None
+            return Span(Trace(match[1]), name, match[2], SpanKind.SERVER)
+        if random.random() >= self.sample_rate:
+            return None
+        return Span(Trace(os.urandom(16).hex()), name, kind=SpanKind.SERVER)
+
+    def finish_trace(self, root: Span) -> None:
+        root.end()
+        if self._listener is not None:
+            self._logger.info(root.trace.spans)
+
+    @contextmanager
+    def span(
+        self, name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes: typing.Any
+    ) -> Iterator[Span | None]:
+        parent = current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = parent.child(name, kind, **attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{e.__class__.__name__}: {e}"
+            raise
+        finally:
+            current_span.reset(token)
+            span.end()
+
+    def instrument_repository(self, repository: object) -> None:
+        """Wrap every public coroutine method of the repository into a span."""
+        prefix = type(repository).__name__
+        for name, method in inspect.getmembers(repository, inspect.iscoroutinefunction):
+            if not name.startswith("_"):
+                setattr(repository, name, self._traced(f"{prefix}.{name}", method))
+
+    def _traced(
+        self, name: str, method: Callable[..., Awaitable[typing.Any]]
+    ) -> Callable[..., Awaitable[typing.Any]]:
+        @functools.wraps(method)
+        async def traced(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            if current_span.get() is None:
+                return await method(*args, **kwargs)
+            with self.span(name):
+                return await method(*args, **kwargs)
+
+        return traced
+
+    def instrument_engine(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: typing.Any,
+    statement: str,
+    parameters: typing.Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    parent = current_span.get()
+    if parent is not None:
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        context._trace_span = parent.child(  # type: ignore[attr-defined]
+            f"db {operation}",
+            SpanKind.CLIENT,
+            **{"db.system": "postgresql", "db.statement": statement},
+        )
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: typing.Any,
+    statement: str,
+    parameters: typing.Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.end()
+
+
+def _handle_error(exception_context: typing.Any) -> None:
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.error = repr(exception_context.original_exception)
+        span.end()
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    parent = current_span.get()
+    if parent is not None:
+        session.info["trace_commit_span"] = parent.child("db COMMIT", SpanKind.CLIENT)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    span = session.info.pop("trace_commit_span", None)
+    if span is not None:
+        span.end()
+
+
+class TracingMiddleware:
+    """Opens the server span of a sampled request and answers with its traceparent."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        store = scope.get("state", {}).get("store")
+        if scope["type"] != "http" or store is None:
+            await self.app(scope, receive, send)
+            return
+        traceparent = dict(scope["headers"]).get(b"traceparent", b"").decode()
+        tracer: Tracer = store.tracer
+        root = tracer.start_trace(f"{scope['method']} {scope['path']}", traceparent)
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_traceparent(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                header = f"00-{root.trace.trace_id}-{root.span_id}-01".encode()
+                message["headers"] = [*message.get("headers", []), (b"traceparent", header)]
+            await send(message)
+
+        token = current_span.set(root)
+        try:
+            await self.app(scope, receive, send_with_traceparent)
+        finally:
+            current_span.reset(token)
+            route = scope.get("route")
+            if route is not None:
+                root.name = f"{scope['method']} {route.path}"
+            root.attributes["http.method"] = scope["method"]
+            root.attributes["http.target"] = scope["path"]
+            tracer.finish_trace(root)
+
+
+class TracedRoute(APIRoute):
+    """Splits a sampled request into dependencies, endpoint and serialisation spans."""
+
+    def get_route_handler(self) -> Callable[[Request], Awaitable[Response]]:
+        endpoint = self.dependant.call
+        if not inspect.iscoroutinefunction(endpoint):
+            return super().get_route_handler()
+
+        @functools.wraps(endpoint)  # type: ignore[arg-type]
+        async def traced_endpoint(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            dependencies = current_span.get()
+            if dependencies is None:
+                return await endpoint(*args, **kwargs)  # type: ignore[misc]
+            dependencies.end()
+            span = Span(dependencies.trace, "endpoint", dependencies.parent_id)
+            current_span.set(span)
+            try:
+                return await endpoint(*args, **kwargs)  # type: ignore[misc]
+            except BaseException as e:
+                span.error = f"{e.__class__.__name__}: {e}"
+                raise
+            finally:
+                span.end()
+                # Everything FastAPI does after the endpoint is response validation and encoding
+                current_span.set(Span(dependencies.trace, "serialisation", dependencies.parent_id))
+
+        self.dependant.call = traced_endpoint
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Request) -> Response:
+            root = current_span.get()
+            if root is None:
+                return await handler(request)
+            token = current_span.set(root.child("dependencies"))
+            try:
+                return await handler(request)
+            finally:
+                phase = current_span.get()
+                if phase is not None:
+                    phase.end()
+                current_span.reset(token)
+
+        return traced_handler
+
+
+class OtlpJsonFormatter(logging.Formatter):
+    """Renders the spans of one trace as an OTLP/JSON ExportTraceServiceRequest line."""
+
+    def __init__(self, service_name: str) -> None:
+        super().__init__()
+        self.resource = {
+            "attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]
+        }
+
+    def format(self, record: logging.LogRecord) -> str:
+        spans: list[Span] = record.msg  # type: ignore[assignment]
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": self.resource,
+                "scopeSpans": [{
+                    "scope": {"name": "app.monitoring.tracing"},
+                    "spans": [self._span(span) for span in spans],
+                }],
+            }]
+        })
+
+    @staticmethod
+    def _span(span: Span) -> dict[str, typing.Any]:
+        data: dict[str, typing.Any] = {
+            "traceId": span.trace.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": int(span.kind),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()
+            ],
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            data["parentSpanId"] = span.parent_id
+        return data
+
+
+def _otlp_value(value: typing.Any) -> dict[str, typing.Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
@@ -0,0 +1,99 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from collections import Counter
+from enum import IntEnum
+
+from app.web.exceptions import ServiceOverloadedError
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class AdmissionController:
+    """Caps concurrent database work and queues the excess by priority.
+
+    Waiters are served lowest ``Priority`` first and FIFO within a priority. When
+    the queue is full a newcomer displaces the least important waiter, or is shed
+    itself if nobody queued is less important.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, retry_after: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.admitted_total = 0
+        self.shed_total: Counter[Priority] = Counter()
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._sequence = itertools.count()
+
+    async def acquire(self, priority: Priority, max_wait: float) -> None:
+        if self.in_flight < self.max_in_flight and not self.queue_depth:
+            self.in_flight += 1
+            self.admitted_total += 1
+            return
+        if self.queue_depth >= self.max_queue and not self._displace(priority):
+            self._shed(priority)
+            raise ServiceOverloadedError(self.retry_after)
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        self.queue_depth += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), max_wait)
+        except TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                self.queue_depth -= 1
+                self._shed(priority)
+                raise ServiceOverloadedError(self.retry_after) from None
+            # Handed a slot, or displaced, right as the timeout fired
+            await waiter
+        except asyncio.CancelledError:
+            if not waiter.done():
+                waiter.cancel()
+                self.queue_depth -= 1
+            elif waiter.exception() is None:
+                self.release()
+            raise
+        self.admitted_total += 1
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if waiter.done():
+                continue
+            # Hand the slot straight to the next waiter, in_flight stays the same
+            self.queue_depth -= 1
+            waiter.set_result(None)
+            return
+        self.in_flight -= 1
+
+    def _displace(self, priority: Priority) -> bool:
+        waiting = [entry for entry in self._waiters if not entry[2].done()]
+        if not waiting:
+            return False
+        worst_priority, _, worst = max(waiting, key=lambda entry: (entry[0], entry[1]))
+        if worst_priority <= priority:
+            return False
+        worst.set_exception(ServiceOverloadedError(self.retry_after))
+        self.queue_depth -= 1
+        self._shed(Priority(worst_priority))
+        return True
+
+    def _shed(self, priority: Priority) -> None:
+        self.shed_total[priority] += 1
+        logger.warning(
+            "Request shed, priority: [%s], in flight: [%s], queued: [%s]",
+            priority.name,
+            self.in_flight,
+            self.queue_depth,
+        )
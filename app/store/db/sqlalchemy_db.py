@@ -1,19 +1,28 @@
 import logging
+import time
 import typing
+from collections.abc import Awaitable, Callable
+from contextlib import AsyncExitStack
 
+from sqlalchemy import Connection, event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session, SessionTransaction
+
+from app.web.exceptions import RequestDeadlineExceededError
 
 if typing.TYPE_CHECKING:
     from app.store.store import Store
 
 logger = logging.getLogger(__name__)
 
+# session.info key holding the time.monotonic() deadline of the request owning the session
+DEADLINE_KEY = "deadline"
+
 
 class BaseModel(DeclarativeBase):
     pass
@@ -27,10 +36,51 @@ class Database:
         self.session_maker: async_sessionmaker[AsyncSession] | None = None
 
     async def connect(self) -> None:
-        self.engine = create_async_engine(url=self.store.config.ASYNC_DATABASE_URL)
+        config = self.store.config
+        self.engine = create_async_engine(
+            url=config.ASYNC_DATABASE_URL,
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            connect_args={"prepared_statement_cache_size": config.DB_PREPARED_STATEMENT_CACHE_SIZE},
+        )
+        self.store.tracer.instrument_engine(self.engine.sync_engine)
         self.session_maker = async_sessionmaker(bind=self.engine, expire_on_commit=False)
         logger.info("Connected to database")
 
+    async def warm_up(
+        self, connections: int, prime: Callable[[AsyncSession], Awaitable[None]]
+    ) -> None:
+        """Open the pool up front and run the hot queries once on every connection.
+
+        Connecting runs asyncpg type introspection, and statements are prepared
+        per connection, so each of them is held open while it is primed.
+        """
+        started = time.monotonic()
+        async with AsyncExitStack() as stack:
+            for _ in range(connections):
+                connection = await stack.enter_async_context(self.engine.connect())
+                async with self.session_maker(bind=connection) as session:
+                    await prime(session)
+        logger.info(
+            "Database warmed up, connections: [%s], took [%.3f] s",
+            connections,
+            time.monotonic() - started,
+        )
+
     async def disconnect(self) -> None:
         await self.engine.dispose()
         logger.info("Database connection closed")
+
+
+@event.listens_for(Session, "after_begin")
+def apply_statement_timeout(
+    session: Session, transaction: SessionTransaction, connection: Connection
+) -> None:
+    """Bound every transaction of a request session by what is left of its deadline."""
+    deadline = session.info.get(DEADLINE_KEY)
+    if deadline is None:
+        return
+    remaining_ms = int((deadline - time.monotonic()) * 1000)
+    if remaining_ms <= 0:
+        raise RequestDeadlineExceededError
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {remaining_ms}")
@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import typing
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+if typing.TYPE_CHECKING:
+    from app.store.store import Store
+
+logger = logging.getLogger(__name__)
+
+JobFunc = Callable[[AsyncSession], Awaitable[None]]
+
+
+class Scheduler:
+    """Runs periodic maintenance jobs, each one in its own session.
+
+    Every worker process runs a scheduler. An exclusive job takes an advisory lock
+    named after it, so one process at a time runs it and the others skip the round.
+    Jobs that only refresh the memory of their own process are not exclusive.
+    """
+
+    def __init__(self, store: "Store") -> None:
+        self.store = store
+        self._jobs: list[tuple[str, float, JobFunc, bool]] = []
+        self._tasks: list[asyncio.Task] = []
+
+    def add_job(self, name: str, interval: float, func: JobFunc, exclusive: bool = True) -> None:
+        self._jobs.append((name, interval, func, exclusive))
+
+    async def start(self) -> None:
+        for name, interval, func, exclusive in self._jobs:
+            self._tasks.append(
+                asyncio.create_task(self._run(name, interval, func, exclusive), name=name)
+            )
+        logger.info("Scheduler started with %s job(s)", len(self._tasks))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        logger.info("Scheduler stopped")
+
+    async def _run(self, name: str, interval: float, func: JobFunc, exclusive: bool) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if exclusive:
+                    await self._run_exclusive(name, func)
+                else:
+                    await self._run_once(func)
+            except Exception as e:
+                logger.error("Scheduled job [%s] failed", name, exc_info=e)
+
+    async def _run_once(self, func: JobFunc) -> None:
+        async with self.store.database.session_maker() as session:
+            await func(session)
+
+    async def _run_exclusive(self, name: str, func: JobFunc) -> bool:
+        """Run the job unless another process holds its lock, tell whether it ran."""
+        params = {"key": f"scheduler:{name}"}
+        # A session level lock on a connection of its own, jobs commit as they go
+        async with self.store.database.engine.connect() as connection:
+            lock = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            if not await lock.scalar(text("SELECT pg_try_advisory_lock(hashtext(:key))"), params):
+                logger.info("Scheduled job [%s] runs in another process, skipped", name)
+                return False
+            try:
+                await self._run_once(func)
+            finally:
+                try:
+                    await lock.execute(text("SELECT pg_advisory_unlock(hashtext(:key))"), params)
+                except BaseException:
+                    # Never hand a connection still holding the lock back to the pool
+                    await connection.invalidate()
+                    raise
+        return True
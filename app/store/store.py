@@ -4,12 +4,83 @@ from app.web.config import Config
 class Store:
     def __init__(self, config: Config) -> None:
         from app.admin.repository import AdminRepository
+        from app.audit.log import AuditLog
+        from app.jobs.repository import JobRepository
+        from app.jobs.runner import JobRunner
+        from app.library import reports
+        from app.library.autocomplete import Autocomplete
         from app.library.repository import LibraryRepository
+        from app.monitoring.profiler import SamplingProfiler
+        from app.monitoring.tracing import Tracer
+        from app.store.admission import AdmissionController
         from app.store.db.sqlalchemy_db import Database
+        from app.store.scheduler import Scheduler
 
         self.config = config
+        # Flipped by lifespan once the warm-up is done, reported by the readiness probe
+        self.ready = False
+        self.tracer = Tracer(config)
+        self.profiler = SamplingProfiler()
         self.database = Database(self)
         self.library_repo = LibraryRepository(self)
         self.admin_repo = AdminRepository(self)
+        self.job_repo = JobRepository(self)
+        self.tracer.instrument_repository(self.library_repo)
+        self.tracer.instrument_repository(self.admin_repo)
+        self.tracer.instrument_repository(self.job_repo)
+        self.scheduler = Scheduler(self)
+        self.job_runner = JobRunner(self)
+        self.audit_log = AuditLog(self)
+        self.autocomplete = Autocomplete(self)
+        pool_capacity = config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+        self.admission = AdmissionController(
+            max_in_flight=config.ADMISSION_MAX_IN_FLIGHT or pool_capacity,
+            max_queue=config.ADMISSION_MAX_QUEUE,
+            retry_after=config.ADMISSION_RETRY_AFTER,
+        )
 
+        self.scheduler.add_job(
+            "change_log_compaction",
+            config.CHANGE_LOG_COMPACTION_INTERVAL,
+            self.library_repo.compact_change_log,
+        )
+        self.scheduler.add_job(
+            "hold_expiry",
+            config.HOLD_EXPIRY_INTERVAL,
+            self.library_repo.expire_holds,
+        )
+        self.scheduler.add_job(
+            "open_loan_watermark",
+            config.OPEN_LOAN_WATERMARK_INTERVAL,
+            self.library_repo.refresh_open_loan_watermark,
+            exclusive=False,
+        )
+        self.scheduler.add_job(
+            "library_cards_partitions",
+            config.LIBRARY_CARDS_PARTITION_INTERVAL,
+            self.library_repo.create_loan_partitions,
+        )
+        self.scheduler.add_job(
+            "loan_archival",
+            config.LOAN_ARCHIVE_INTERVAL,
+            self.library_repo.archive_returned_loans,
+        )
+        self.scheduler.add_job(
+            "book_recommendations",
+            config.RECOMMENDATIONS_INTERVAL,
+            self.library_repo.refresh_recommendations,
+        )
+        self.scheduler.add_job(
+            "autocomplete_refresh",
+            config.AUTOCOMPLETE_REFRESH_INTERVAL,
+            self.autocomplete.refresh,
+            exclusive=False,
+        )
+        self.scheduler.add_job(
+            "stale_jobs",
+            config.JOB_STALE_AFTER,
+            self.job_repo.requeue_stale_jobs,
+        )
 
+        self.job_runner.add_job("inventory_reconciliation", reports.inventory_reconciliation)
+        self.job_runner.add_job("yearly_circulation", reports.yearly_circulation)
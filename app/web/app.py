@@ -1,17 +1,25 @@
 from contextlib import asynccontextmanager
 from typing import TypedDict
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from starlette.types import Lifespan
 
 from app.auth.routers import router as auth_router
+from app.jobs.routers import router as jobs_router
 from app.library.routers import router as library_router
+from app.monitoring.routers import router as monitoring_router
+from app.monitoring.tracing import TracingMiddleware
 from app.store.store import Store
 from app.web.config import load_from_env
+from app.web.dependencies import bind_log_context
 from app.web.exceptions import AppBaseError
 from app.web.handlers import handler_base_app_exc
 from app.web.logger import setup_logging
-from app.web.middlewares import ErrorHandlingMiddleware
+from app.web.middlewares import (
+    ErrorHandlingMiddleware,
+    RequestDeadlineMiddleware,
+    RequestLoggingMiddleware,
+)
 
 
 class State(TypedDict):
@@ -21,18 +29,42 @@ class State(TypedDict):
 @asynccontextmanager  # type: ignore[arg-type]
 async def lifespan(app: FastAPI) -> None:
     store = Store(load_from_env())
-    setup_logging()
+    log_listener = setup_logging(
+        json_format=store.config.LOG_JSON, info_sample_rate=store.config.LOG_INFO_SAMPLE_RATE
+    )
+    store.tracer.start()
     await store.database.connect()
+    if store.config.WARMUP_ENABLED:
+        await store.database.warm_up(
+            store.config.WARMUP_CONNECTIONS or store.config.DB_POOL_SIZE,
+            store.library_repo.warm_up,
+        )
+    await store.scheduler.start()
+    await store.job_runner.start()
+    await store.audit_log.start()
+    store.ready = True
     yield {"store": store}
+    store.ready = False
+    await store.job_runner.stop()
+    await store.scheduler.stop()
+    # After everything that may record an action, before the pool goes away
+    await store.audit_log.stop()
     await store.database.disconnect()
+    store.tracer.stop()
+    log_listener.stop()
 
 
 def create_app(lifespan: Lifespan = lifespan) -> FastAPI:
-    app = FastAPI(lifespan=lifespan)
+    app = FastAPI(lifespan=lifespan, dependencies=[Depends(bind_log_context)])
 
     app.add_middleware(ErrorHandlingMiddleware)
+    app.add_middleware(RequestDeadlineMiddleware)
+    app.add_middleware(TracingMiddleware)
+    app.add_middleware(RequestLoggingMiddleware)
     app.add_exception_handler(AppBaseError, handler_base_app_exc)  # type: ignore[arg-type]
 
     app.include_router(library_router, tags=["library"])
     app.include_router(auth_router, tags=["auth"])
+    app.include_router(jobs_router, tags=["jobs"])
+    app.include_router(monitoring_router, tags=["monitoring"])
     return app
@@ -4,6 +4,8 @@ from pydantic_settings import BaseSettings
 
 class BusinessConfig(BaseSettings):
     max_books_per_reader: int = 3
+    hold_pickup_hours: int = 48
+    loan_period_days: int = 14
 
 
 class Config(BaseSettings):
@@ -12,6 +14,10 @@ class Config(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     DB_NAME: str
+    DB_POOL_SIZE: int = 5  # per worker process
+    DB_MAX_OVERFLOW: int = 10
+    # asyncpg prepared statements kept per connection, each one holds a plan on the server
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 256
 
     JWT_SECRET: str
     JWT_ALGORITHM: str
@@ -19,6 +25,88 @@ class Config(BaseSettings):
     JWT_EXP: int = 900  # seconds
     REFRESH_JWT_EXP: int = 2  # days
 
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int | None = None  # defaults to the CPUs available to the process
+    SERVER_BACKLOG: int = 2048
+    # Above the idle timeout of the load balancer, so it never reuses a connection we closed
+    SERVER_KEEP_ALIVE: int = 65  # seconds
+    SERVER_GRACEFUL_TIMEOUT: int = 30  # seconds to drain in-flight requests on SIGTERM
+
+    WARMUP_ENABLED: bool = True
+    WARMUP_CONNECTIONS: int | None = None  # defaults to DB_POOL_SIZE
+
+    LOG_JSON: bool = True
+    LOG_INFO_SAMPLE_RATE: float = 1.0  # share of INFO lines kept, warnings are always kept
+
+    REQUEST_DEADLINE: float = 10.0  # seconds
+    # Per-route overrides, e.g. {"GET /library/readers/{reader_id}/books": 2.5}
+    ROUTE_DEADLINES: dict[str, float] = {}
+
+    # Admission control in front of the DB pool, in-flight limit defaults to the pool capacity
+    ADMISSION_MAX_IN_FLIGHT: int | None = None
+    ADMISSION_MAX_QUEUE: int = 100
+    ADMISSION_QUEUE_TIMEOUT: float = 2.0  # seconds
+    ADMISSION_RETRY_AFTER: int = 1  # seconds
+    # Route priorities: 0 - high, 1 - normal (default), 2 - low
+    ADMISSION_ROUTE_PRIORITIES: dict[str, int] = {
+        "POST /library/readers/{reader_id}/borrow/{book_id}": 0,
+        "POST /library/readers/{reader_id}/returns/{book_id}": 0,
+        "GET /library/books": 2,
+        "GET /library/changes": 2,
+    }
+
+    # Share of requests traced, an incoming sampled traceparent is always honoured
+    TRACE_SAMPLE_RATE: float = 0.0
+    TRACE_SERVICE_NAME: str = "library-api"
+    TRACE_FILE: str = "traces/spans.jsonl"  # OTLP/JSON, one trace per line
+    TRACE_FILE_MAX_BYTES: int = 50 * 1024 * 1024
+    TRACE_FILE_BACKUP_COUNT: int = 5
+
+    CHANGE_LOG_RETENTION_DAYS: int = 7
+    CHANGE_LOG_COMPACTION_INTERVAL: int = 3600  # seconds
+    HOLD_EXPIRY_INTERVAL: int = 300  # seconds
+
+    # library_cards is range-partitioned by month of borrow_date
+    LIBRARY_CARDS_PARTITIONS_AHEAD: int = 3  # months created in advance
+    LIBRARY_CARDS_PARTITION_INTERVAL: int = 86400  # seconds
+    OPEN_LOAN_WATERMARK_INTERVAL: int = 600  # seconds
+    # Loans are stamped with the start of their transaction, so the watermark trails
+    # the clock by more than any transaction can run
+    OPEN_LOAN_WATERMARK_LAG: int = 3600  # seconds
+
+    # Returned loans older than this move to library_cards_archive in small batches
+    LOAN_ARCHIVE_AFTER_DAYS: int = 365
+    LOAN_ARCHIVE_BATCH_SIZE: int = 500
+    LOAN_ARCHIVE_BATCH_PAUSE: float = 0.5  # seconds between batches, leaves room to the app
+    LOAN_ARCHIVE_INTERVAL: int = 3600  # seconds
+
+    # Background jobs for heavy reports
+    JOB_WORKERS: int = 2  # jobs running at once per worker process
+    JOB_POLL_INTERVAL: float = 5.0  # seconds, how often idle workers look for queued jobs
+    JOB_PROGRESS_INTERVAL: float = 2.0  # seconds between progress writes of a job
+    JOB_HEARTBEAT_INTERVAL: float = 30.0  # seconds, well below JOB_STALE_AFTER
+    JOB_STALE_AFTER: int = 600  # seconds without a heartbeat before a running job is requeued
+    JOB_RESULTS_DIR: str = "job_results"
+
+    # "Also borrowed" recommendations, rebuilt from the loans a range of books at a time
+    RECOMMENDATIONS_TOP_K: int = 10
+    RECOMMENDATIONS_BATCH_SIZE: int = 200  # books per transaction
+    RECOMMENDATIONS_BATCH_PAUSE: float = 0.5  # seconds between batches
+    RECOMMENDATIONS_INTERVAL: int = 86400  # seconds
+
+    # Type-ahead over titles and author names, served from memory of each worker process
+    AUTOCOMPLETE_REFRESH_INTERVAL: float = 2.0  # seconds between catching up with the change log
+    AUTOCOMPLETE_REFRESH_BATCH_SIZE: int = 1000
+    AUTOCOMPLETE_MEMORY_MAX_PREFIX: int = 32  # longer queries go to the trigram indexes
+    AUTOCOMPLETE_FUZZY_MIN_PREFIX: int = 3  # trigram lookups need at least one trigram
+
+    # Admin actions are buffered and written to audit_log in batches
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_FLUSH_INTERVAL: float = 1.0  # seconds an action may wait in the buffer
+    AUDIT_MAX_PENDING: int = 10000  # buffered actions before recording waits
+    AUDIT_ENQUEUE_TIMEOUT: float = 1.0  # seconds to wait for room before dropping an action
+
     business_config: BusinessConfig = BusinessConfig()
 
     @property
@@ -1,21 +1,86 @@
+import time
+from collections.abc import AsyncGenerator
 from typing import Annotated, cast
 
 from fastapi import Depends, Request
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.admin.repository import AdminRepository
+from app.audit.log import AuditLog
+from app.jobs.repository import JobRepository
 from app.library.repository import LibraryRepository
+from app.store.admission import Priority
+from app.store.db.sqlalchemy_db import DEADLINE_KEY
 from app.store.store import Store
 from app.web.config import BusinessConfig, Config
+from app.web.exceptions import RequestDeadlineExceededError, UnknownIncludeError
+from app.web.logger import request_log_context
+from app.web.utils import route_key
+
+QUERY_CANCELED = "57014"
+
+
+# async, so that FastAPI does not hand this cheap call to the threadpool
+async def bind_log_context(request: Request) -> None:  # noqa: RUF029
+    context = request_log_context.get()
+    if context is not None:
+        context.route = route_key(request)
 
 
 def get_store(request: Request) -> Store:
     return cast(Store, request.state.store)
 
 
-async def get_session(store: Annotated[Store, Depends(get_store)]) -> AsyncSession:
+def get_deadline(request: Request, store: Annotated[Store, Depends(get_store)]) -> float:
+    config = store.config
+    budget = config.ROUTE_DEADLINES.get(route_key(request), config.REQUEST_DEADLINE)
+    started_at = getattr(request.state, "started_at", time.monotonic())
+    return started_at + budget
+
+
+async def admit_db_work(
+    request: Request,
+    store: Annotated[Store, Depends(get_store)],
+    deadline: Annotated[float, Depends(get_deadline)],
+) -> AsyncGenerator[None, None]:
+    config = store.config
+    priority = Priority(config.ADMISSION_ROUTE_PRIORITIES.get(route_key(request), Priority.NORMAL))
+    max_wait = min(config.ADMISSION_QUEUE_TIMEOUT, deadline - time.monotonic())
+    await store.admission.acquire(priority, max_wait)
+    try:
+        yield
+    finally:
+        store.admission.release()
+
+
+async def get_session(
+    store: Annotated[Store, Depends(get_store)],
+    deadline: Annotated[float, Depends(get_deadline)],
+    _: Annotated[None, Depends(admit_db_work)],
+) -> AsyncSession:
     async with store.database.session_maker() as session:
-        yield session
+        session.info[DEADLINE_KEY] = deadline
+        try:
+            yield session
+        except DBAPIError as e:
+            if getattr(e.orig, "pgcode", None) == QUERY_CANCELED:
+                raise RequestDeadlineExceededError from e
+            raise
+
+
+class Includes:
+    """Parses ``?include=a,b`` into the set of related entities to embed, out of allowed."""
+
+    def __init__(self, *allowed: str) -> None:
+        self.allowed = allowed
+
+    async def __call__(self, include: str | None = None) -> frozenset[str]:
+        names = frozenset(name.strip() for name in (include or "").split(",") if name.strip())
+        for name in names:
+            if name not in self.allowed:
+                raise UnknownIncludeError(name, list(self.allowed))
+        return names
 
 
 def get_library_repo(store: Annotated[Store, Depends(get_store)]) -> LibraryRepository:
@@ -26,6 +91,14 @@ def get_admin_repo(store: Annotated[Store, Depends(get_store)]) -> AdminReposito
     return store.admin_repo
 
 
+def get_job_repo(store: Annotated[Store, Depends(get_store)]) -> JobRepository:
+    return store.job_repo
+
+
+def get_audit_log(store: Annotated[Store, Depends(get_store)]) -> AuditLog:
+    return store.audit_log
+
+
 def get_business_config(store: Annotated[Store, Depends(get_store)]) -> BusinessConfig:
     return store.config.business_config
 
@@ -5,10 +5,13 @@ from fastapi import status
 
 class AppBaseError(Exception):
     """Base error for application"""
-    def __init__(self, status_code: int, detail: Any) -> None:
+    def __init__(
+        self, status_code: int, detail: Any, headers: dict[str, str] | None = None
+    ) -> None:
         super().__init__(status_code, detail)
         self.status_code = status_code
         self.detail = detail
+        self.headers = headers
 
 
 class BusinessLogicError(AppBaseError):
@@ -28,6 +31,45 @@ class EmailAlreadyTakenError(ConflictError):
         self.email = email
 
 
+class ProfilerBusyError(ConflictError):
+    """Raised when a profile is requested while another one is running on the worker"""
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running on this worker",
+        )
+
+
+class JobNotFinishedError(ConflictError):
+    """Raised when the result of a job that has not succeeded is requested"""
+    def __init__(self, job_id: int, job_status: str) -> None:
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job ID: {job_id} has no result, its status is [{job_status}]",
+        )
+        self.job_id = job_id
+
+
+class BookInUseError(ConflictError):
+    """Raised when a book to delete still has loans, holds or stock records"""
+    def __init__(self, book_id: int) -> None:
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"The book with this ID: {book_id} has loans or holds, it can't be deleted",
+        )
+        self.book_id = book_id
+
+
+class ReaderInUseError(ConflictError):
+    """Raised when a reader to delete still has loans or holds"""
+    def __init__(self, reader_id: int) -> None:
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"The reader with this ID: {reader_id} has loans or holds, it can't be deleted",
+        )
+        self.reader_id = reader_id
+
+
 class NotFoundError(AppBaseError):
     """Raised when a resource does not exist."""
 
@@ -73,6 +115,68 @@ class LibraryCardNotFoundError(NotFoundError):
         self.reader_id = reader_id
 
 
+class JobNotFoundError(NotFoundError):
+    """Raised when the job does not exist"""
+    def __init__(self, job_id: int) -> None:
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"There is no job with such ID: {job_id}"
+        )
+        self.job_id = job_id
+
+
+class UnknownJobKindError(BusinessLogicError):
+    """Raised when a job of a kind the runner does not know is submitted"""
+    def __init__(self, kind: str, kinds: list[str]) -> None:
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown job kind [{kind}], expected one of: {', '.join(kinds)}"
+        )
+        self.kind = kind
+
+
+class UnknownIncludeError(BusinessLogicError):
+    """Raised when a relation the route cannot embed is asked for in include"""
+    def __init__(self, name: str, allowed: list[str]) -> None:
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot include [{name}], expected any of: {', '.join(allowed)}"
+        )
+        self.name = name
+
+
+class HoldNotFoundError(NotFoundError):
+    """Raised when the reader has no active hold on the book"""
+    def __init__(self, book_id: int, reader_id: int) -> None:
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No active hold with such book_id: [{book_id}], reader_id: [{reader_id}]"
+        )
+        self.book_id = book_id
+        self.reader_id = reader_id
+
+
+class HoldAlreadyExistsError(ConflictError):
+    """Raised when the reader already has an active hold on the book"""
+    def __init__(self, book_id: int, reader_id: int) -> None:
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Reader ID: {reader_id}, already has an active hold on the book ID: {book_id}"
+        )
+        self.book_id = book_id
+        self.reader_id = reader_id
+
+
+class BookAvailableError(BusinessLogicError):
+    """Raised when a hold is requested for a book that can be borrowed right away"""
+    def __init__(self, book_id: int) -> None:
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"The book with this ID: {book_id} is available, borrow it instead of a hold"
+        )
+        self.book_id = book_id
+
+
 class BookUnavailableError(BusinessLogicError):
     """Raised when there are no available instance of a book"""
     def __init__(self, book_id: int) -> None:
@@ -133,3 +237,32 @@ class InvalidAccessTokenError(AuthError):
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access token incorrect or expired"
         )
+
+
+class RequestDeadlineExceededError(AppBaseError):
+    """Raised when the request ran out of its time budget before the database answered"""
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="The request did not complete within its deadline"
+        )
+
+
+class ServiceOverloadedError(AppBaseError):
+    """Raised when the request is shed because the database is saturated"""
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The service is overloaded, retry later",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.retry_after = retry_after
+
+
+class ServiceNotReadyError(AppBaseError):
+    """Raised by the readiness probe until the worker has warmed up"""
+    def __init__(self) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The service is warming up",
+        )
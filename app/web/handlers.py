@@ -16,6 +16,8 @@ HTTP_ERROR_CODES = {
     405: "not_implemented",
     409: "conflict",
     500: "internal_server_error",
+    503: "service_unavailable",
+    504: "gateway_timeout",
 }
 
 
@@ -28,5 +30,6 @@ async def handler_base_app_exc(request: Request, exc: AppBaseError) -> JSONRespo
             "detail": jsonable_encoder(exc.detail),
             "error_name": exc.__class__.__name__,
             "from_error": jsonable_encoder(exc.__cause__),
-        }
+        },
+        headers=exc.headers,
     )
@@ -1,17 +1,110 @@
+import copy
+import json
 import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
 
 
-def setup_logging(level: int = logging.INFO) -> None:
+class RequestLogContext:
+    """Per-request fields attached to every record; mutable so inner tasks can fill it in."""
+
+    __slots__ = ("admin_id", "request_id", "route")
+
+    def __init__(self, request_id: str) -> None:
+        self.request_id = request_id
+        self.route: str | None = None
+        self.admin_id: int | None = None
+
+
+request_log_context: ContextVar[RequestLogContext | None] = ContextVar(
+    "request_log_context", default=None
+)
+
+
+class ContextQueueHandler(QueueHandler):
+    """Hands records to the listener thread, which formats and writes them off the event loop."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, info_sample_rate: float = 1.0) -> None:
+        super().__init__(log_queue)
+        self.info_sample_rate = info_sample_rate
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Only routine INFO lines are sampled, warnings and errors are always kept.
+        # The queue is thread-safe, so the handler lock taken by Handler.handle is skipped.
+        if record.levelno == logging.INFO and random.random() >= self.info_sample_rate:
+            return False
+        filtered = self.filter(record)
+        if not filtered:
+            return False
+        if isinstance(filtered, logging.LogRecord):
+            record = filtered
+        self.enqueue(self.prepare(record))
+        return True
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The message is merged here, its args may change before the listener writes it.
+        # Unlike QueueHandler.prepare exc_info is kept for the formatter to render.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        context = request_log_context.get()
+        if context is not None:
+            record.request_id = context.request_id
+            record.route = context.route
+            record.admin_id = context.admin_id
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    FIELDS = ("request_id", "route", "admin_id", "status_code", "latency_ms")
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(
+    level: int = logging.INFO, json_format: bool = True, info_sample_rate: float = 1.0
+) -> QueueListener:
     log_format = (
         "[%(asctime)s.%(msecs)03d] "
         "%(module)10s:%(lineno)-4d "
         "%(levelname)-7s - %(message)s"
     )
-    logging.basicConfig(
-        level=level, datefmt="%Y-%m-%d %H:%M:%S", format=log_format
-    )
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if json_format:
+        stream_handler.setFormatter(JsonFormatter())
+        # The JSON lines carry none of these, skip collecting them on every record
+        logging.logThreads = False
+        logging.logProcesses = False
+        logging.logMultiprocessing = False
+    else:
+        stream_handler.setFormatter(logging.Formatter(log_format, datefmt="%Y-%m-%d %H:%M:%S"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    root = logging.getLogger()
+    root.handlers = [ContextQueueHandler(log_queue, info_sample_rate)]
+    root.setLevel(level)
+    listener.start()
 
     logging.getLogger("uvicorn.error").propagate = False
     logging.getLogger("uvicorn.access").propagate = False
     logging.getLogger("uvicorn").propagate = False
     logging.getLogger("uvicorn.error").disabled = True
+    return listener
+
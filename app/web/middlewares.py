@@ -1,12 +1,19 @@
+import asyncio
 import logging
+import time
 import typing
+import uuid
 
 from fastapi import Request, Response, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.web.logger import RequestLogContext, request_log_context
 
 RequestResponseEndpoint = typing.Callable[[Request], typing.Awaitable[Response]]
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.access")
 
 
 class ErrorHandlingMiddleware(BaseHTTPMiddleware):
@@ -26,3 +33,100 @@ class ErrorHandlingMiddleware(BaseHTTPMiddleware):
                     "message": str(e),
                 }
             )
+
+
+class RequestDeadlineMiddleware:
+    """Stamps the request start for deadlines and cancels the handler when the client leaves.
+
+    Cancelling the handler task cancels the query it is awaiting, so the pooled
+    connection is released instead of serving a response nobody will read.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        scope.setdefault("state", {})["started_at"] = time.monotonic()
+
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        response_sent = asyncio.Event()
+
+        async def send_tracked(message: Message) -> None:
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                response_sent.set()
+
+        handler = asyncio.create_task(self.app(scope, messages.get, send_tracked))
+        watcher = asyncio.create_task(
+            self._watch_disconnect(receive, messages, handler, response_sent)
+        )
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not (watcher.done() and not watcher.cancelled() and watcher.result()):
+                raise
+            logger.info(
+                "Client disconnected, request cancelled - %s %s", scope["method"], scope["path"]
+            )
+        finally:
+            watcher.cancel()
+            handler.cancel()
+
+    @staticmethod
+    async def _watch_disconnect(
+        receive: Receive,
+        messages: asyncio.Queue[Message],
+        handler: asyncio.Task,
+        response_sent: asyncio.Event,
+    ) -> bool:
+        while True:
+            message = await receive()
+            messages.put_nowait(message)
+            if message["type"] == "http.disconnect":
+                # After the response went out a disconnect is normal, let the handler finish
+                if response_sent.is_set():
+                    return False
+                handler.cancel()
+                return True
+
+
+class RequestLoggingMiddleware:
+    """Binds the request id to the log context and writes one access line per request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = dict(scope["headers"]).get(b"x-request-id", b"").decode() or uuid.uuid4().hex
+        token = request_log_context.set(RequestLogContext(request_id))
+        started_at = time.perf_counter()
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = message.get("headers", [])
+                message["headers"] = [*headers, (b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            access_logger.info(
+                "%s %s - %s",
+                scope["method"],
+                scope["path"],
+                status_code,
+                extra={
+                    "status_code": status_code,
+                    "latency_ms": round((time.perf_counter() - started_at) * 1000, 3),
+                },
+            )
+            request_log_context.reset(token)
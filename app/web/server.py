@@ -0,0 +1,60 @@
+import argparse
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+from app.web.config import load_from_env
+
+logger = logging.getLogger(__name__)
+
+
+def available_cpus() -> int:
+    # Honours taskset/cpuset limits, unlike os.cpu_count()
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def run(workers: int | None = None) -> None:
+    """Production launcher, ``python -m app.web.server``.
+
+    Workers are spawned before the application is imported, each one builds its
+    own Store and connects its own pool in lifespan, so no connection is shared
+    across processes. On SIGTERM uvicorn stops accepting connections, lets
+    in-flight requests finish within SERVER_GRACEFUL_TIMEOUT and then runs the
+    lifespan shutdown, which stops the scheduler and disposes of the pool.
+    Every worker runs a scheduler, the exclusive maintenance jobs lock each
+    other out across workers.
+    """
+    config = load_from_env()
+    workers = workers or config.SERVER_WORKERS or available_cpus()
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    logging.basicConfig(level=logging.INFO)
+    logger.info(
+        "Starting [%s] worker(s) on %s:%s, loop: [%s], http: [%s]",
+        workers, config.SERVER_HOST, config.SERVER_PORT, loop, http,
+    )
+    uvicorn.run(
+        "app.web.app:create_app",
+        factory=True,
+        host=config.SERVER_HOST,
+        port=config.SERVER_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=config.SERVER_BACKLOG,
+        timeout_keep_alive=config.SERVER_KEEP_ALIVE,
+        timeout_graceful_shutdown=config.SERVER_GRACEFUL_TIMEOUT,
+        # Requests are logged by RequestLoggingMiddleware, the logging setup is done in lifespan
+        access_log=False,
+        log_config=None,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=None)
+    run(parser.parse_args().workers)
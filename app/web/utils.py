@@ -1,6 +1,10 @@
+import json
+from collections.abc import Sequence
 from typing import TypeVar
 
+from fastapi import Request, Response
 from pydantic.generics import GenericModel
+from sqlalchemy import Row
 
 T = TypeVar("T")
 
@@ -8,3 +12,32 @@ T = TypeVar("T")
 class ResponseScheme[T](GenericModel):
     status: str = "ok"
     data: T | list[T] | None = None
+
+
+def route_key(request: Request) -> str:
+    """Identify the matched route as "METHOD /path/{param}" for per-route settings."""
+    route = request.scope.get("route")
+    return f"{request.method} {getattr(route, 'path', request.url.path)}"
+
+
+class RowsResponse(Response):
+    """Encodes Core rows straight into the ResponseScheme envelope.
+
+    Skips ORM hydration and pydantic validation for list endpoints, the selected
+    columns have to match the read scheme declared as the route's response_model.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Sequence[Row]) -> bytes:
+        fields = content[0]._fields if content else ()
+        data = [dict(zip(fields, row, strict=True)) for row in content]
+        return json.dumps(
+            {"status": "ok", "data": data}, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class JSONTextResponse(Response):
+    """Sends a JSON document that was already rendered, e.g. by Postgres json functions."""
+
+    media_type = "application/json"
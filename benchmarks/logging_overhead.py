@@ -0,0 +1,82 @@
+"""Caller-side cost of one hot-path INFO line, i.e. the time the event loop is blocked.
+
+Compares the previous synchronous ``basicConfig`` stream handler with the
+queue-backed JSON pipeline from ``app.web.logger``, with and without sampling.
+Output goes to /dev/null so only the logging machinery is measured::
+
+    python -m benchmarks.logging_overhead
+"""
+import argparse
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueListener
+
+from app.web.logger import (
+    ContextQueueHandler,
+    JsonFormatter,
+    RequestLogContext,
+    request_log_context,
+)
+
+LEGACY_FORMAT = "[%(asctime)s.%(msecs)03d] %(module)10s:%(lineno)-4d %(levelname)-7s - %(message)s"
+
+
+def measure(logger: logging.Logger, lines: int) -> float:
+    started = time.perf_counter()
+    for book_id in range(lines):
+        logger.info("Book with ID: [%s] successfully added", book_id)
+    return (time.perf_counter() - started) / lines * 1_000_000
+
+
+def run_sync(lines: int) -> float:
+    logger = logging.getLogger("bench.sync")
+    with open(os.devnull, "w") as sink:
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter(LEGACY_FORMAT))
+        logger.handlers = [handler]
+        return measure(logger, lines)
+
+
+def run_queued(lines: int, sample_rate: float) -> tuple[float, float]:
+    """Return the caller-side cost and the listener thread's cost per line."""
+    logger = logging.getLogger(f"bench.queued.{sample_rate}")
+    with open(os.devnull, "w") as sink:
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(JsonFormatter())
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, handler)
+        logger.handlers = [ContextQueueHandler(log_queue, sample_rate)]
+        # The listener is started afterwards so the two costs do not mix on the GIL
+        caller = measure(logger, lines)
+        started = time.perf_counter()
+        listener.start()
+        listener.stop()
+        background = (time.perf_counter() - started) / lines * 1_000_000
+        return caller, background
+
+
+def main(lines: int) -> None:
+    context = RequestLogContext("3f1c2a")
+    context.route, context.admin_id = "POST /library/books", 1
+    request_log_context.set(context)
+    for logger in ("bench.sync", "bench.queued.1.0", "bench.queued.0.1"):
+        logging.getLogger(logger).propagate = False
+        logging.getLogger(logger).setLevel(logging.INFO)
+
+    print(f"{lines} INFO lines, cost per line (event loop / listener thread)")
+    print(f"{'sync basicConfig stream':<30}: {run_sync(lines):6.2f} us")
+    # setup_logging(json_format=True) stops collecting caller, thread and process info
+    logging._srcfile = None
+    logging.logThreads = logging.logProcesses = logging.logMultiprocessing = False
+    for label, sample_rate in (("queue + JSON", 1.0), ("queue + JSON, 10% INFO kept", 0.1)):
+        caller, background = run_queued(lines, sample_rate)
+        print(f"{label:<30}: {caller:6.2f} us / {background:6.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.lines)
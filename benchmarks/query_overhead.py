@@ -0,0 +1,87 @@
+"""Python-side cost of the hot borrow/return lookups, select() against lambda_stmt.
+
+The queries run through an ORM session on in-memory SQLite with empty tables,
+so the database side is next to free and the numbers are what SQLAlchemy spends
+building, cache-keying and executing a statement::
+
+    python -m benchmarks.query_overhead
+"""
+import argparse
+import time
+from collections.abc import Callable
+
+from sqlalchemy import Executable, and_, create_engine, func, lambda_stmt, select
+from sqlalchemy.orm import Session
+
+from app.library.models import AuthorModel, BookModel, LibraryCardModel, ReaderModel
+
+
+def get_book(book_id: int) -> Executable:
+    return select(BookModel).where(BookModel.book_id == book_id)
+
+
+def get_book_lambda(book_id: int) -> Executable:
+    return lambda_stmt(lambda: select(BookModel).where(BookModel.book_id == book_id))
+
+
+def count_reader_books(reader_id: int) -> Executable:
+    return select(func.count(1)).where(
+        and_(LibraryCardModel.reader_id == reader_id, LibraryCardModel.return_date.is_(None))
+    )
+
+
+def count_reader_books_lambda(reader_id: int) -> Executable:
+    return lambda_stmt(lambda: select(func.count(1)).where(
+        and_(LibraryCardModel.reader_id == reader_id, LibraryCardModel.return_date.is_(None))
+    ))
+
+
+def get_unreturned(entity_id: int) -> Executable:
+    return select(LibraryCardModel).where(and_(
+        LibraryCardModel.book_id == entity_id,
+        LibraryCardModel.reader_id == entity_id,
+        LibraryCardModel.return_date.is_(None),
+    ))
+
+
+def get_unreturned_lambda(entity_id: int) -> Executable:
+    return lambda_stmt(lambda: select(LibraryCardModel).where(and_(
+        LibraryCardModel.book_id == entity_id,
+        LibraryCardModel.reader_id == entity_id,
+        LibraryCardModel.return_date.is_(None),
+    )))
+
+
+QUERIES: dict[str, tuple[Callable[[int], Executable], Callable[[int], Executable]]] = {
+    "get_book": (get_book, get_book_lambda),
+    "count_reader_books": (count_reader_books, count_reader_books_lambda),
+    "get_unreturned_library_record": (get_unreturned, get_unreturned_lambda),
+}
+
+
+def measure(session: Session, build: Callable[[int], Executable], calls: int) -> float:
+    for i in range(100):
+        session.execute(build(i)).all()
+    started = time.perf_counter()
+    for i in range(calls):
+        session.execute(build(i)).all()
+    return (time.perf_counter() - started) / calls * 1_000_000
+
+
+def main(calls: int) -> None:
+    engine = create_engine("sqlite://")
+    tables = [model.__table__ for model in (AuthorModel, BookModel, ReaderModel, LibraryCardModel)]
+    BookModel.metadata.create_all(engine, tables=tables)
+    print(f"{calls} calls each, microseconds per query")
+    print(f"{'query':<32}{'select()':>10}{'lambda_stmt':>14}")
+    with Session(engine) as session:
+        for name, (plain, cached) in QUERIES.items():
+            before, after = measure(session, plain, calls), measure(session, cached, calls)
+            print(f"{name:<32}{before:>10.1f}{after:>14.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=20_000)
+    args = parser.parse_args()
+    main(args.calls)
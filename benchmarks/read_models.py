@@ -0,0 +1,82 @@
+"""Memory and time to serve ``GET /library/books``: ORM entities against Core rows.
+
+Both paths run on in-memory SQLite filled with ``--rows`` books. The ORM path
+is what the endpoints did before, entities validated and encoded by FastAPI's
+own ``serialize_response``. The Core path selects the read columns and renders
+them with ``RowsResponse``. Peak memory is traced from the query to the body::
+
+    python -m benchmarks.read_models --rows 100000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.library.models import AuthorModel, BookModel, BookStockShardModel
+from app.library.repository import LibraryRepository
+from app.library.schemes import BookReadScheme
+from app.web.utils import ResponseScheme, RowsResponse
+
+RESPONSE_FIELD = create_model_field("Response_get_books", ResponseScheme[list[BookReadScheme]])
+
+
+def orm_path(session: Session) -> bytes:
+    books = session.scalars(select(BookModel)).all()
+    content = asyncio.run(serialize_response(
+        field=RESPONSE_FIELD, response_content=ResponseScheme(data=list(books)), is_coroutine=True
+    ))
+    return JSONResponse(content).body
+
+
+def core_path(session: Session) -> bytes:
+    columns = LibraryRepository(None)._book_read_columns()
+    return RowsResponse(session.execute(select(*columns)).all()).body
+
+
+def measure(engine: object, path: Callable[[Session], bytes]) -> tuple[float, float, int]:
+    # Timed and traced in separate runs, tracemalloc slows allocation down several times
+    with Session(engine) as session:
+        started = time.perf_counter()
+        body = path(session)
+        elapsed = time.perf_counter() - started
+    with Session(engine) as session:
+        tracemalloc.start()
+        path(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, len(body)
+
+
+def main(rows: int) -> None:
+    engine = create_engine("sqlite://")
+    tables = [model.__table__ for model in (AuthorModel, BookModel, BookStockShardModel)]
+    BookModel.metadata.create_all(engine, tables=tables)
+    with Session(engine) as session:
+        session.execute(insert(AuthorModel), [{"author_id": 1, "name": "Author"}])
+        session.execute(insert(BookModel), [
+            {"title": f"Book {n}", "author_id": 1, "year": 2000, "isbn": f"isbn-{n}", "amount": 3}
+            for n in range(rows)
+        ])
+        session.commit()
+
+    print(f"{rows} books, query to response body")
+    results = {"ORM + pydantic": measure(engine, orm_path), "Core rows": measure(engine, core_path)}
+    for label, (elapsed, peak, size) in results.items():
+        print(f"{label:<16}: {elapsed:6.2f} s, {rows / elapsed:9.0f} rows/s, peak {peak:7.1f} MiB,"
+              f" body {size / 1024 / 1024:.1f} MiB")
+    orm_body, core_body = (path(Session(engine)) for path in (orm_path, core_path))
+    assert orm_body == core_body, "both paths have to render the same body"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+    main(args.rows)
@@ -0,0 +1,96 @@
+"""Requests per second of the single-worker uvicorn launch against app.web.server.
+
+Both servers are started in turn from the current directory, so the usual .env
+is needed, and hammered on ``GET /metrics`` which never touches the database,
+so the numbers measure the server stack rather than Postgres::
+
+    python -m benchmarks.server_throughput --clients 4 --concurrency 64
+
+The load generator shares the machine, keep ``--clients`` well under the CPU
+count or it becomes the bottleneck.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import subprocess
+import sys
+import time
+
+import httpx
+
+from app.web.config import load_from_env
+
+
+async def hammer(url: str, concurrency: int, duration: float) -> int:
+    done = 0
+    deadline = time.monotonic() + duration
+
+    async def connection(client: httpx.AsyncClient) -> None:
+        nonlocal done
+        while time.monotonic() < deadline:
+            response = await client.get(url)
+            response.raise_for_status()
+            done += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        await asyncio.gather(*(connection(client) for _ in range(concurrency)))
+    return done
+
+
+def client_process(args: tuple[str, int, float]) -> int:
+    return asyncio.run(hammer(*args))
+
+
+def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url).raise_for_status()
+        except httpx.HTTPError:
+            time.sleep(0.2)
+        else:
+            return
+    raise RuntimeError(f"Server did not come up on {url}")
+
+
+def measure(command: list[str], url: str, clients: int, concurrency: int, duration: float) -> float:
+    server = subprocess.Popen(command)
+    try:
+        wait_until_up(url)
+        with multiprocessing.Pool(clients) as pool:
+            started = time.perf_counter()
+            total = sum(pool.map(client_process, [(url, concurrency, duration)] * clients))
+            return total / (time.perf_counter() - started)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(clients: int, concurrency: int, duration: float, workers: int | None) -> None:
+    config = load_from_env()
+    url = f"http://127.0.0.1:{config.SERVER_PORT}/metrics"
+    launches = {
+        "uvicorn, 1 worker (previous)": [
+            sys.executable, "-m", "uvicorn", "app.web.app:create_app", "--factory",
+            "--port", str(config.SERVER_PORT),
+        ],
+        "app.web.server": [
+            sys.executable, "-m", "app.web.server",
+            *(["--workers", str(workers)] if workers else []),
+        ],
+    }
+    print(f"{clients} client process(es) x {concurrency} connections, {duration} s each")
+    for label, command in launches.items():
+        rps = measure(command, url, clients, concurrency, duration)
+        print(f"{label:<30}: {rps:10.0f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    main(args.clients, args.concurrency, args.duration, args.workers)
@@ -0,0 +1,80 @@
+"""Borrow throughput of one popular book: single-row stock vs sharded stock.
+
+Every borrower runs in its own session and goes through ``LibraryRepository``
+the same way the borrow route does. Runs against the test database::
+
+    docker compose up test_db -d
+    python -m benchmarks.stock_contention --borrowers 64 --shards 16
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from app.library.models import AuthorModel, BookModel, ReaderModel
+from app.store.db.sqlalchemy_db import BaseModel
+from app.store.store import Store
+from app.web.config import load_from_test_env
+
+
+async def prepare_book(store: Store, borrowers: int, copies: int) -> tuple[int, list[int]]:
+    async with store.database.session_maker() as session:
+        author = AuthorModel(name=f"bench-{uuid.uuid4()}")
+        session.add(author)
+        await session.flush()
+        book = BookModel(title="Bestseller", author_id=author.author_id, amount=copies)
+        readers = [
+            ReaderModel(name="Reader", email=f"{uuid.uuid4()}@bench.io") for _ in range(borrowers)
+        ]
+        session.add_all([book, *readers])
+        await session.commit()
+        return book.book_id, [reader.reader_id for reader in readers]
+
+
+async def run(store: Store, borrowers: int, borrows_each: int, shards: int) -> float:
+    repository = store.library_repo
+    book_id, reader_ids = await prepare_book(store, borrowers, borrowers * borrows_each)
+    if shards:
+        async with store.database.session_maker() as session:
+            await repository.split_book_stock(session, book_id, shards)
+
+    async def borrower(reader_id: int) -> None:
+        for _ in range(borrows_each):
+            async with store.database.session_maker() as session:
+                book = await repository.get_book(session, book_id)
+                if await repository.borrow_book(session, book, reader_id) is None:
+                    raise RuntimeError("Stock ran out before the benchmark finished")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(borrower(reader_id) for reader_id in reader_ids))
+    return borrowers * borrows_each / (time.perf_counter() - started)
+
+
+async def main(borrowers: int, borrows_each: int, shards: int) -> None:
+    config = load_from_test_env()
+    config.DB_POOL_SIZE = borrowers
+    config.DB_MAX_OVERFLOW = 0
+    store = Store(config)
+    await store.database.connect()
+    async with store.database.engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.create_all)
+    try:
+        single = await run(store, borrowers, borrows_each, shards=0)
+        sharded = await run(store, borrowers, borrows_each, shards=shards)
+    finally:
+        async with store.database.engine.begin() as conn:
+            await conn.run_sync(BaseModel.metadata.drop_all)
+        await store.database.disconnect()
+
+    print(f"{borrowers} concurrent borrowers x {borrows_each} borrows of one book")
+    print(f"single row : {single:8.1f} borrows/s")
+    print(f"{shards:2d} shards  : {sharded:8.1f} borrows/s ({sharded / single:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--borrowers", type=int, default=64)
+    parser.add_argument("--borrows-each", type=int, default=20)
+    parser.add_argument("--shards", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.borrowers, args.borrows_each, args.shards))
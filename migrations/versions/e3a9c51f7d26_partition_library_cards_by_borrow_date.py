@@ -0,0 +1,108 @@
+"""Partition library_cards by borrow_date
+
+Revision ID: e3a9c51f7d26
+Revises: c6a2f8e04b17
+Create Date: 2026-10-19 17:12:40.531876
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a9c51f7d26'
+down_revision: Union[str, None] = 'c6a2f8e04b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Same default as LIBRARY_CARDS_PARTITIONS_AHEAD, the scheduler keeps it up from here on
+MONTHS_AHEAD = 3
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_library_cards_reader_history', table_name='library_cards')
+    op.drop_index('ix_library_cards_book_history', table_name='library_cards')
+    op.rename_table('library_cards', 'library_cards_unpartitioned')
+    op.execute('ALTER INDEX library_cards_pkey RENAME TO library_cards_unpartitioned_pkey')
+    # The partition key has to be part of the primary key, ids keep coming from the old sequence
+    op.execute("""
+        CREATE TABLE library_cards (
+            library_card_id integer NOT NULL
+                DEFAULT nextval('library_cards_library_card_id_seq'::regclass),
+            reader_id integer NOT NULL,
+            book_id integer NOT NULL,
+            borrow_date timestamp without time zone NOT NULL DEFAULT now(),
+            return_date timestamp without time zone,
+            CONSTRAINT library_cards_pkey PRIMARY KEY (library_card_id, borrow_date),
+            CONSTRAINT library_cards_reader_id_fkey
+                FOREIGN KEY (reader_id) REFERENCES readers (reader_id),
+            CONSTRAINT library_cards_book_id_fkey
+                FOREIGN KEY (book_id) REFERENCES books (book_id)
+        ) PARTITION BY RANGE (borrow_date)
+    """)
+    op.execute(
+        'ALTER SEQUENCE library_cards_library_card_id_seq OWNED BY library_cards.library_card_id'
+    )
+    # One partition per month, from the oldest loan up to the months ahead
+    op.execute(f"""
+        DO $$
+        DECLARE
+            partition_start date := date_trunc(
+                'month', coalesce((SELECT min(borrow_date) FROM library_cards_unpartitioned), localtimestamp)
+            );
+        BEGIN
+            WHILE partition_start < date_trunc('month', localtimestamp) + interval '{MONTHS_AHEAD + 1} months' LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF library_cards FOR VALUES FROM (%L) TO (%L)',
+                    'library_cards_p' || to_char(partition_start, 'YYYY_MM'),
+                    partition_start,
+                    (partition_start + interval '1 month')::date
+                );
+                partition_start := partition_start + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute("""
+        INSERT INTO library_cards (library_card_id, reader_id, book_id, borrow_date, return_date)
+        SELECT library_card_id, reader_id, book_id, borrow_date, return_date
+        FROM library_cards_unpartitioned
+    """)
+    op.drop_table('library_cards_unpartitioned')
+    # Indexes on the parent are created on every partition, present and future
+    op.create_index('ix_library_cards_book_history', 'library_cards', ['book_id', 'borrow_date', 'library_card_id'], unique=False)
+    op.create_index('ix_library_cards_reader_history', 'library_cards', ['reader_id', 'borrow_date', 'library_card_id'], unique=False)
+    op.create_index('ix_library_cards_open_borrow_date', 'library_cards', ['borrow_date'], unique=False, postgresql_where=sa.text('return_date IS NULL'))
+    op.execute('ANALYZE library_cards')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_library_cards_open_borrow_date', table_name='library_cards', postgresql_where=sa.text('return_date IS NULL'))
+    op.drop_index('ix_library_cards_reader_history', table_name='library_cards')
+    op.drop_index('ix_library_cards_book_history', table_name='library_cards')
+    op.rename_table('library_cards', 'library_cards_partitioned')
+    op.execute('ALTER INDEX library_cards_pkey RENAME TO library_cards_partitioned_pkey')
+    op.create_table('library_cards',
+    sa.Column('library_card_id', sa.Integer(), server_default=sa.text("nextval('library_cards_library_card_id_seq'::regclass)"), nullable=False),
+    sa.Column('reader_id', sa.Integer(), nullable=False),
+    sa.Column('book_id', sa.Integer(), nullable=False),
+    sa.Column('borrow_date', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('return_date', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['book_id'], ['books.book_id'], ),
+    sa.ForeignKeyConstraint(['reader_id'], ['readers.reader_id'], ),
+    sa.PrimaryKeyConstraint('library_card_id')
+    )
+    op.execute(
+        'ALTER SEQUENCE library_cards_library_card_id_seq OWNED BY library_cards.library_card_id'
+    )
+    op.execute("""
+        INSERT INTO library_cards (library_card_id, reader_id, book_id, borrow_date, return_date)
+        SELECT library_card_id, reader_id, book_id, borrow_date, return_date
+        FROM library_cards_partitioned
+    """)
+    # Drops the partitions along with it
+    op.drop_table('library_cards_partitioned')
+    op.create_index('ix_library_cards_book_history', 'library_cards', ['book_id', 'borrow_date', 'library_card_id'], unique=False)
+    op.create_index('ix_library_cards_reader_history', 'library_cards', ['reader_id', 'borrow_date', 'library_card_id'], unique=False)
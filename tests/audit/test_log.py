@@ -0,0 +1,46 @@
+import asyncio
+
+from app.audit.log import AuditEvent, AuditLog
+from app.store.store import Store
+from app.web.config import Config
+
+
+class RecordingAuditLog(AuditLog):
+    def __init__(self, store: Store) -> None:
+        super().__init__(store)
+        self.batches: list[list[AuditEvent]] = []
+
+    async def _write(self, batch: list[AuditEvent]) -> None:
+        self.batches.append(list(batch))
+        self.written_total += len(batch)
+
+
+def make_audit_log(**settings: object) -> RecordingAuditLog:
+    config = Config(
+        DB_USER="u", DB_PASS="p", DB_HOST="h", DB_PORT=1, DB_NAME="n",
+        JWT_SECRET="s", JWT_ALGORITHM="HS256", **settings,
+    )
+    return RecordingAuditLog(Store(config))
+
+
+async def test__flush__full_batch_is_written_without_waiting_for_interval() -> None:
+    audit = make_audit_log(AUDIT_BATCH_SIZE=3, AUDIT_FLUSH_INTERVAL=60)
+    await audit.start()
+    for book_id in range(4):
+        await audit.record(1, "delete", "book", book_id)
+    await asyncio.sleep(0.05)
+
+    assert [len(batch) for batch in audit.batches] == [3]
+    await audit.stop()
+    assert [len(batch) for batch in audit.batches] == [3, 1]
+    assert audit.pending == 0
+
+
+async def test__record__full_buffer_drops_after_timeout() -> None:
+    audit = make_audit_log(AUDIT_MAX_PENDING=1, AUDIT_ENQUEUE_TIMEOUT=0.01)
+    await audit.record(1, "create", "book", 1)
+    await audit.record(1, "create", "book", 2, {"isbn": "x"})
+
+    assert audit.dropped_total == 1
+    await audit.stop()
+    assert audit.written_total == 1
@@ -7,6 +7,7 @@ from asgi_lifespan import LifespanManager
 from faker import Faker
 from fastapi import FastAPI
 from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.library.models import AuthorModel, BookModel, ReaderModel
@@ -43,7 +44,11 @@ async def app(store: Store) -> AsyncGenerator[FastAPI, None]:
         await store.database.connect()
         engine = store.database.engine
         async with engine.begin() as conn:
+            # The trigram indexes need it, migrations create it the same way
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             await conn.run_sync(BaseModel.metadata.create_all)
+        async with store.database.session_maker() as session:
+            await store.library_repo.create_loan_partitions(session)
         yield {"store": store}
         async with engine.begin() as conn:
             await conn.run_sync(BaseModel.metadata.drop_all)
@@ -0,0 +1,23 @@
+from app.jobs.models import JobModel, JobStatus
+from app.jobs.schemes import JobCreateScheme
+from app.store.store import Store
+
+
+async def test__finish_job__ignored_after_job_was_requeued(app, store: Store) -> None:  # type: ignore[no-untyped-def]
+    repository = store.job_repo
+    store.config.JOB_STALE_AFTER = -1
+    kinds = ["inventory_reconciliation"]
+    async with store.database.session_maker() as session:
+        await repository.add_job(session, JobCreateScheme(kind=kinds[0]), None)
+        stale = await repository.claim_job(session, kinds)
+        await repository.requeue_stale_jobs(session)
+    async with store.database.session_maker() as session:
+        current = await repository.claim_job(session, kinds)
+
+        finished = await repository.finish_job(session, stale, "stale.csv")
+        alive = await repository.touch_job(session, current)
+        job = await session.get(JobModel, current.job_id, populate_existing=True)
+
+    assert (finished, alive) == (False, True)
+    assert job.status == JobStatus.RUNNING
+    assert job.result_file is None
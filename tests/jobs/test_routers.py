@@ -0,0 +1,40 @@
+import asyncio
+import csv
+import io
+
+from httpx import AsyncClient
+
+from app.store.store import Store
+
+
+async def test__inventory_reconciliation__runs_in_background_and_downloads(  # type: ignore[no-untyped-def]
+    auth_client: AsyncClient, make_book, store: Store, tmp_path
+) -> None:
+    store.config.JOB_RESULTS_DIR = str(tmp_path)
+    store.config.JOB_WORKERS = 1
+    book = await make_book(amount=3)
+    await store.job_runner.start()
+    try:
+        response = await auth_client.post("/jobs", json={"kind": "inventory_reconciliation"})
+        job_id = response.json()["data"]["job_id"]
+        for _ in range(50):
+            job = (await auth_client.get(f"/jobs/{job_id}")).json()["data"]
+            if job["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.1)
+        result = await auth_client.get(f"/jobs/{job_id}/result")
+    finally:
+        await store.job_runner.stop()
+
+    assert response.status_code == 202
+    assert job["status"] == "succeeded"
+    assert job["progress"] == 1.0
+    rows = list(csv.DictReader(io.StringIO(result.text)))
+    assert [(int(row["book_id"]), int(row["on_shelf"])) for row in rows] == [(book.book_id, 3)]
+
+
+async def test__submit_job__rejects_unknown_kind(auth_client: AsyncClient) -> None:
+    response = await auth_client.post("/jobs", json={"kind": "no_such_report"})
+
+    assert response.status_code == 400
+    assert response.json()["error_name"] == "UnknownJobKindError"
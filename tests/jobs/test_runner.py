@@ -0,0 +1,26 @@
+import os
+
+from app.jobs.models import JobModel, JobStatus
+from app.jobs.runner import JobContext
+from app.jobs.schemes import JobCreateScheme
+from app.store.store import Store
+
+
+async def test__run__failed_job_leaves_no_partial_file(app, store: Store, tmp_path) -> None:  # type: ignore[no-untyped-def]
+    async def broken(context: JobContext) -> None:
+        await context.write_rows([["book_id", "amount"], [1, 2]])
+        raise RuntimeError("report went wrong")
+
+    store.config.JOB_RESULTS_DIR = str(tmp_path)
+    store.job_runner.add_job("broken", broken)
+    async with store.database.session_maker() as session:
+        await store.job_repo.add_job(session, JobCreateScheme(kind="broken"), None)
+        job = await store.job_repo.claim_job(session, ["broken"])
+
+    await store.job_runner._run(job)
+
+    async with store.database.session_maker() as session:
+        failed = await session.get(JobModel, job.job_id)
+    assert failed.status == JobStatus.FAILED
+    assert failed.error == "RuntimeError: report went wrong"
+    assert os.listdir(tmp_path) == []
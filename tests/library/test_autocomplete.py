@@ -0,0 +1,32 @@
+from app.library.autocomplete import PrefixIndex
+
+
+def make_index() -> PrefixIndex:
+    index = PrefixIndex()
+    index.load([
+        ("book", 1, "War and Peace"),
+        ("book", 2, "Warlock"),
+        ("author", 1, "Wallace, David Foster"),
+        ("book", 3, "Anna  Karenina"),
+    ])
+    return index
+
+
+def test__lookup__matches_prefix_case_insensitively() -> None:
+    index = make_index()
+
+    assert index.lookup("WAR", 10) == [("book", 1, "War and Peace"), ("book", 2, "Warlock")]
+    assert index.lookup("wa", 1) == [("author", 1, "Wallace, David Foster")]
+    assert index.lookup("anna k", 10) == [("book", 3, "Anna  Karenina")]
+    assert index.lookup("zz", 10) == []
+
+
+def test__put_and_remove__follow_changes() -> None:
+    index = make_index()
+    index.put("book", 2, "Anna's Warlock")
+    index.remove("book", 1)
+    index.remove("book", 42)
+
+    assert index.lookup("war", 10) == []
+    assert [item_id for _, item_id, _ in index.lookup("anna", 10)] == [3, 2]
+    assert len(index) == 3
@@ -0,0 +1,68 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import insert, text
+
+from app.library.models import LibraryCardModel
+from app.library.partitions import (
+    add_months,
+    create_partitions,
+    detach_partitions,
+    partition_month,
+    partition_name,
+)
+
+
+@pytest.mark.parametrize(
+    ("month", "months", "expected"),
+    [
+        (date(2024, 1, 1), 0, date(2024, 1, 1)),
+        (date(2024, 11, 1), 3, date(2025, 2, 1)),
+        (date(2024, 1, 1), -1, date(2023, 12, 1)),
+    ],
+)
+def test__add_months__wraps_around_years(month: date, months: int, expected: date) -> None:
+    assert add_months(month, months) == expected
+
+
+def test__partition_name__round_trips_through_partition_month() -> None:
+    assert partition_name(date(2024, 3, 1)) == "library_cards_p2024_03"
+    assert partition_month("library_cards_p2024_03") == date(2024, 3, 1)
+    assert partition_month("library_cards_default") is None
+
+
+async def test__detach_partitions__keeps_partition_with_returned_loans(  # type: ignore[no-untyped-def]
+    app, store, make_book, make_reader
+) -> None:
+    reader, book = await make_reader(), await make_book()
+    old = date(2000, 1, 1)
+    engine = store.database.engine
+    async with engine.begin() as connection:
+        await connection.execute(text(
+            f"CREATE TABLE {partition_name(old)} PARTITION OF library_cards "
+            f"FOR VALUES FROM ('{old}') TO ('{add_months(old, 1)}')"
+        ))
+        await connection.execute(
+            insert(LibraryCardModel).values(
+                reader_id=reader.reader_id,
+                book_id=book.book_id,
+                borrow_date=datetime(2000, 1, 10),
+                return_date=datetime(2000, 1, 20),
+            )
+        )
+
+    async with engine.connect() as connection:
+        autocommit = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        kept = await detach_partitions(autocommit, date(2000, 2, 1))
+        await autocommit.execute(text(f"DELETE FROM {partition_name(old)}"))
+        detached = await detach_partitions(autocommit, date(2000, 2, 1))
+        await autocommit.execute(text(f"DROP TABLE {partition_name(old)}"))
+
+    assert kept == []
+    assert detached == [partition_name(old)]
+
+
+async def test__create_partitions__skips_existing_ones(app, store, session) -> None:  # type: ignore[no-untyped-def]
+    created = await create_partitions(session, store.config.LIBRARY_CARDS_PARTITIONS_AHEAD)
+
+    assert created == []
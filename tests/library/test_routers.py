@@ -1,9 +1,14 @@
+import json
 import random
 from collections.abc import Callable, Coroutine
 
+import pytest
 from httpx import AsyncClient
+from sqlalchemy import func, select, update
 
 from app.library.models import BookModel
+from app.library.repository import RECOMMENDATIONS_LOCK
+from app.web.exceptions import LibraryCardNotFoundError
 
 
 async def test__get_books__returns_all_created_books_successfully(
@@ -48,6 +53,48 @@ async def test__add_book__creates_book_when_authorized(
     assert response.status_code == 201
 
 
+async def test__del_book__book_is_gone_after_delete(  # type: ignore[no-untyped-def]
+    auth_client, make_book
+) -> None:
+    book = await make_book()
+
+    deleted = await auth_client.delete(f"/library/books/{book.book_id}")
+    response = await auth_client.get(f"/library/books/{book.book_id}")
+
+    assert deleted.status_code == 200
+    assert response.status_code == 404
+
+
+async def test__del_reader__reader_is_gone_after_delete(  # type: ignore[no-untyped-def]
+    auth_client, make_reader
+) -> None:
+    reader = await make_reader()
+
+    deleted = await auth_client.delete(f"/library/readers/{reader.reader_id}")
+    response = await auth_client.get(f"/library/readers/{reader.reader_id}")
+
+    assert deleted.status_code == 200
+    assert response.status_code == 404
+
+
+async def test__del_book__error_409_when_book_has_loan_history(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader
+) -> None:
+    reader, book = await make_reader(), await make_book()
+    await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{book.book_id}")
+    await auth_client.post(f"/library/readers/{reader.reader_id}/returns/{book.book_id}")
+
+    book_deleted = await auth_client.delete(f"/library/books/{book.book_id}")
+    reader_deleted = await auth_client.delete(f"/library/readers/{reader.reader_id}")
+    response = await auth_client.get(f"/library/books/{book.book_id}")
+
+    assert book_deleted.status_code == 409
+    assert book_deleted.json()["error_name"] == "BookInUseError"
+    assert reader_deleted.status_code == 409
+    assert reader_deleted.json()["error_name"] == "ReaderInUseError"
+    assert response.status_code == 200
+
+
 async def test__borrow_book__error_404_when_book_not_in_db(
     auth_client: AsyncClient, make_reader: Callable[[], Coroutine]
 ) -> None:
@@ -120,3 +167,424 @@ async def test__borrow_book__book_amount_decreased_by_one(  # type: ignore[no-un
     book_from_db = await session.get(BookModel, book.book_id, populate_existing=True)
     assert response.status_code == 200
     assert book_from_db.amount == 2
+
+
+async def test__get_changes__returns_changes_after_cursor(  # type: ignore[no-untyped-def]
+    auth_client, make_book_scheme
+) -> None:
+    book_sh = await make_book_scheme()
+    await auth_client.post("/library/books", json=book_sh.dict())
+
+    response = await auth_client.get("/library/changes", params={"since": "0:0"})
+    feed = response.json()["data"]
+    last = feed["changes"][-1]
+
+    assert response.status_code == 200
+    assert [c["entity"] for c in feed["changes"]] == ["books"]
+    assert feed["changes"][0]["payload"]["title"] == book_sh.title
+    assert feed["next_cursor"] == f"{last['txid']}:{last['change_id']}"
+
+
+async def test__get_changes__empty_when_cursor_is_up_to_date(  # type: ignore[no-untyped-def]
+    auth_client, make_book_scheme
+) -> None:
+    book_sh = await make_book_scheme()
+    await auth_client.post("/library/books", json=book_sh.dict())
+    cursor = (await auth_client.get("/library/changes")).json()["data"]["next_cursor"]
+
+    response = await auth_client.get("/library/changes", params={"since": cursor})
+
+    assert response.json()["data"] == {"changes": [], "next_cursor": cursor}
+
+
+async def test__get_changes__resumes_from_bare_change_id(  # type: ignore[no-untyped-def]
+    auth_client, make_book_scheme
+) -> None:
+    for _ in range(2):
+        book_sh = await make_book_scheme()
+        await auth_client.post("/library/books", json=book_sh.dict())
+    first, second = (await auth_client.get("/library/changes")).json()["data"]["changes"]
+
+    response = await auth_client.get("/library/changes", params={"since": first["change_id"]})
+
+    assert [c["change_id"] for c in response.json()["data"]["changes"]] == [second["change_id"]]
+
+
+async def test__place_hold__error_409_when_book_is_available(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader
+) -> None:
+    reader = await make_reader()
+    book = await make_book(amount=1)
+
+    response = await auth_client.post(f"/library/readers/{reader.reader_id}/holds/{book.book_id}")
+
+    assert response.status_code == 409
+    assert response.json()["error_name"] == "BookAvailableError"
+
+
+async def test__return_book__allocates_copy_to_first_hold_in_queue(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader, session
+) -> None:
+    borrower = await make_reader()
+    waiting_reader = await make_reader()
+    late_reader = await make_reader()
+    book = await make_book(amount=1)
+    await auth_client.post(f"/library/readers/{borrower.reader_id}/borrow/{book.book_id}")
+    hold = await auth_client.post(
+        f"/library/readers/{waiting_reader.reader_id}/holds/{book.book_id}"
+    )
+    await auth_client.post(f"/library/readers/{late_reader.reader_id}/holds/{book.book_id}")
+
+    await auth_client.post(f"/library/readers/{borrower.reader_id}/returns/{book.book_id}")
+    late = await auth_client.post(f"/library/readers/{late_reader.reader_id}/borrow/{book.book_id}")
+    response = await auth_client.post(
+        f"/library/readers/{waiting_reader.reader_id}/borrow/{book.book_id}"
+    )
+
+    book_from_db = await session.get(BookModel, book.book_id, populate_existing=True)
+    assert hold.status_code == 201
+    assert late.status_code == 409
+    assert response.status_code == 200
+    assert book_from_db.amount == 0
+
+
+async def test__split_book_stock__amount_stays_consolidated_after_borrow(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader
+) -> None:
+    reader = await make_reader()
+    book = await make_book(amount=10)
+
+    split = await auth_client.put(f"/library/books/{book.book_id}/stock-shards", json={"shards": 4})
+    await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{book.book_id}")
+    response = await auth_client.get(f"/library/books/{book.book_id}")
+
+    assert split.json()["data"]["amount"] == 10
+    assert response.json()["data"]["amount"] == 9
+
+
+async def test__get_book__counts_shelf_counter_of_sharded_book(  # type: ignore[no-untyped-def]
+    auth_client, make_book, session
+) -> None:
+    book = await make_book(amount=10)
+    await auth_client.put(f"/library/books/{book.book_id}/stock-shards", json={"shards": 4})
+    # A return that raced the split puts its copy back on the shelf counter
+    await session.execute(
+        update(BookModel).where(BookModel.book_id == book.book_id).values(amount=1)
+    )
+    await session.commit()
+
+    response = await auth_client.get(f"/library/books/{book.book_id}")
+    books = await auth_client.get("/library/books")
+
+    assert response.json()["data"]["amount"] == 11
+    assert [b["amount"] for b in books.json()["data"]] == [11]
+
+
+async def test__return_book__error_when_loan_returned_concurrently(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader, store, session
+) -> None:
+    reader, book = await make_reader(), await make_book()
+    book_id, reader_id = book.book_id, reader.reader_id
+    await auth_client.post(f"/library/readers/{reader_id}/borrow/{book_id}")
+    repository = store.library_repo
+    note = await repository.get_unreturned_library_record(session, book_id, reader_id)
+    await auth_client.post(f"/library/readers/{reader_id}/returns/{book_id}")
+
+    with pytest.raises(LibraryCardNotFoundError):
+        await repository.return_book(session, book, note)
+    await session.rollback()
+    response = await auth_client.get(f"/library/books/{book_id}")
+
+    assert response.json()["data"]["amount"] == 1
+
+
+async def test__return_book__copy_kept_when_stock_folded_back_meanwhile(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader, store
+) -> None:
+    reader, book = await make_reader(), await make_book(amount=2)
+    book_id, reader_id = book.book_id, reader.reader_id
+    await auth_client.put(f"/library/books/{book_id}/stock-shards", json={"shards": 2})
+    await auth_client.post(f"/library/readers/{reader_id}/borrow/{book_id}")
+    repository = store.library_repo
+    async with store.database.session_maker() as returning:
+        # Loaded while the stock was still split, as by a return racing the unsplit
+        stale = await repository.get_book(returning, book_id)
+        note = await repository.get_unreturned_library_record(returning, book_id, reader_id)
+        await auth_client.put(f"/library/books/{book_id}/stock-shards", json={"shards": 0})
+
+        await repository.return_book(returning, stale, note)
+    response = await auth_client.get(f"/library/books/{book_id}")
+
+    assert response.json()["data"]["amount"] == 2
+
+
+async def test__get_books__error_504_when_route_deadline_exhausted(  # type: ignore[no-untyped-def]
+    client, config
+) -> None:
+    config.ROUTE_DEADLINES = {"GET /library/books": 0}
+
+    response = await client.get("/library/books")
+
+    assert response.status_code == 504
+    assert response.json()["error_name"] == "RequestDeadlineExceededError"
+
+
+async def test__get_reader_dashboard__returns_active_loans_and_allowance(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader
+) -> None:
+    reader = await make_reader()
+    book = await make_book()
+    await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{book.book_id}")
+
+    response = await auth_client.get(f"/library/readers/{reader.reader_id}/dashboard")
+
+    data = response.json()["data"]
+    assert response.status_code == 200
+    assert data["email"] == reader.email
+    assert data["active_loans_count"] == 1
+    assert data["remaining_allowance"] == 2
+    assert [loan["book_id"] for loan in data["active_loans"]] == [book.book_id]
+
+
+async def test__get_reader_dashboard__error_404_when_reader_not_found(  # type: ignore[no-untyped-def]
+    auth_client,
+) -> None:
+    response = await auth_client.get("/library/readers/0/dashboard")
+
+    assert response.status_code == 404
+    assert response.json()["error_name"] == "ReaderNotFoundError"
+
+
+async def test__get_reader_history__pages_through_loans_newest_first(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader
+) -> None:
+    reader = await make_reader()
+    books = [await make_book() for _ in range(3)]
+    for book in books:
+        await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{book.book_id}")
+        await auth_client.post(f"/library/readers/{reader.reader_id}/returns/{book.book_id}")
+
+    first = await auth_client.get(
+        f"/library/readers/{reader.reader_id}/history", params={"limit": 2, "monthly": True}
+    )
+    page = first.json()["data"]
+    second = await auth_client.get(
+        f"/library/readers/{reader.reader_id}/history",
+        params={"limit": 2, "before": page["next_before"], "before_id": page["next_before_id"]},
+    )
+
+    seen = [loan["book_id"] for loan in page["loans"] + second.json()["data"]["loans"]]
+    assert seen == [book.book_id for book in reversed(books)]
+    assert second.json()["data"]["next_before"] is None
+    assert page["monthly"][-1]["running_total"] == 3
+
+
+async def test__get_reader_history__includes_archived_loans(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader, store, session
+) -> None:
+    store.config.LOAN_ARCHIVE_AFTER_DAYS = 0
+    store.config.LOAN_ARCHIVE_BATCH_PAUSE = 0
+    reader = await make_reader()
+    archived, hot = await make_book(), await make_book()
+    for book in (archived, hot):
+        await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{book.book_id}")
+    await auth_client.post(f"/library/readers/{reader.reader_id}/returns/{archived.book_id}")
+
+    await store.library_repo.archive_returned_loans(session)
+    response = await auth_client.get(
+        f"/library/readers/{reader.reader_id}/history", params={"monthly": True}
+    )
+
+    page = response.json()["data"]
+    assert [loan["book_id"] for loan in page["loans"]] == [hot.book_id, archived.book_id]
+    assert page["monthly"][-1]["running_total"] == 2
+
+
+async def test__stats__rollups_follow_borrow_and_return(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader
+) -> None:
+    reader = await make_reader()
+    popular, other = await make_book(amount=5), await make_book()
+    for book in (popular, popular, other):
+        await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{book.book_id}")
+    await auth_client.post(f"/library/readers/{reader.reader_id}/returns/{other.book_id}")
+
+    top = await auth_client.get("/library/stats/top-books")
+    daily = await auth_client.get("/library/stats/daily")
+    active = await auth_client.get("/library/stats/active-readers")
+
+    assert [(b["book_id"], b["loans"]) for b in top.json()["data"]] == [
+        (popular.book_id, 2), (other.book_id, 1)
+    ]
+    assert [(d["loans"], d["returns"]) for d in daily.json()["data"]] == [(3, 1)]
+    assert active.json()["data"]["active_readers"] == 1
+
+
+async def test__stream_overdue_loans__lists_only_loans_past_due(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader, store
+) -> None:
+    reader = await make_reader()
+    overdue, on_time = await make_book(), await make_book()
+    store.config.business_config.loan_period_days = -1
+    await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{overdue.book_id}")
+    store.config.business_config.loan_period_days = 14
+    await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{on_time.book_id}")
+
+    response = await auth_client.get("/library/loans/overdue")
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    loans = [json.loads(line) for line in response.text.splitlines()]
+    assert [(loan["book_id"], loan["email"]) for loan in loans] == [
+        (overdue.book_id, reader.email)
+    ]
+
+
+async def test__get_readers__searches_name_and_email_page_by_page(  # type: ignore[no-untyped-def]
+    auth_client, make_reader
+) -> None:
+    by_name = await make_reader(name="Anna Karenina", email="anna@example.com")
+    by_email = await make_reader(name="Levin", email="karenin@example.com")
+    await make_reader(name="Vronsky", email="vronsky@example.com")
+
+    first = await auth_client.get("/library/readers", params={"q": "karenin", "limit": 1})
+    after_id = first.json()["data"][-1]["reader_id"]
+    second = await auth_client.get(
+        "/library/readers", params={"q": "KARENIN", "limit": 1, "after_id": after_id}
+    )
+
+    seen = [reader["reader_id"] for reader in first.json()["data"] + second.json()["data"]]
+    assert seen == [by_name.reader_id, by_email.reader_id]
+
+
+async def test__get_readers__matches_like_wildcards_literally(  # type: ignore[no-untyped-def]
+    auth_client, make_reader
+) -> None:
+    literal = await make_reader(name="Ivan", email="ivan_100@example.com")
+    await make_reader(name="Ivan", email="ivanx100@example.com")
+
+    response = await auth_client.get("/library/readers", params={"q": "ivan_1"})
+
+    assert response.status_code == 200
+    assert [reader["reader_id"] for reader in response.json()["data"]] == [literal.reader_id]
+
+
+async def test__get_book_recommendations__ranks_books_borrowed_by_same_readers(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader, store, session
+) -> None:
+    store.config.RECOMMENDATIONS_BATCH_PAUSE = 0
+    book, often, once = await make_book(amount=2), await make_book(amount=2), await make_book()
+    for borrowed in ((book, often, once), (book, often)):
+        reader = await make_reader()
+        for other in borrowed:
+            await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{other.book_id}")
+
+    await store.library_repo.refresh_recommendations(session)
+    response = await auth_client.get(f"/library/books/{book.book_id}/recommendations")
+
+    assert [(b["book_id"], b["readers"]) for b in response.json()["data"]] == [
+        (often.book_id, 2), (once.book_id, 1)
+    ]
+
+
+async def test__refresh_recommendations__skipped_while_another_rebuild_holds_lock(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader, store, session
+) -> None:
+    store.config.RECOMMENDATIONS_BATCH_PAUSE = 0
+    book, other = await make_book(), await make_book()
+    reader = await make_reader()
+    for borrowed in (book, other):
+        await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{borrowed.book_id}")
+
+    async with store.database.engine.begin() as rebuild:
+        await rebuild.execute(
+            select(func.pg_advisory_xact_lock(func.hashtext(RECOMMENDATIONS_LOCK)))
+        )
+        await store.library_repo.refresh_recommendations(session)
+    await session.commit()
+    response = await auth_client.get(f"/library/books/{book.book_id}/recommendations")
+
+    assert response.json()["data"] == []
+
+
+async def test__get_author__counts_books_and_copies(  # type: ignore[no-untyped-def]
+    auth_client, make_author, make_book, make_reader
+) -> None:
+    author = await make_author()
+    first = await make_book(author_id=author.author_id, amount=2)
+    second = await make_book(author_id=author.author_id, amount=1)
+    reader = await make_reader()
+    await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{first.book_id}")
+
+    detail = await auth_client.get(f"/library/author/{author.author_id}")
+    books = await auth_client.get(
+        f"/library/author/{author.author_id}/books", params={"limit": 1}
+    )
+    rest = await auth_client.get(
+        f"/library/author/{author.author_id}/books",
+        params={"limit": 1, "after_id": books.json()["data"]["next_after_id"]},
+    )
+
+    data = detail.json()["data"]
+    assert (data["books"], data["total_copies"], data["available_copies"]) == (2, 3, 2)
+    pages = books.json()["data"]["books"] + rest.json()["data"]["books"]
+    assert [book["book_id"] for book in pages] == [first.book_id, second.book_id]
+
+
+async def test__get_author_books__error_404_when_author_not_found(  # type: ignore[no-untyped-def]
+    auth_client,
+) -> None:
+    response = await auth_client.get("/library/author/0/books")
+
+    assert response.status_code == 404
+    assert response.json()["error_name"] == "AuthorNotFoundError"
+
+
+async def test__get_reader_history__embeds_included_books_and_readers(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader
+) -> None:
+    reader = await make_reader()
+    books = [await make_book() for _ in range(2)]
+    for book in books:
+        await auth_client.post(f"/library/readers/{reader.reader_id}/borrow/{book.book_id}")
+
+    response = await auth_client.get(
+        f"/library/readers/{reader.reader_id}/history", params={"include": "book,reader"}
+    )
+
+    loans = response.json()["data"]["loans"]
+    assert [loan["book"]["title"] for loan in loans] == [book.title for book in reversed(books)]
+    assert {loan["reader"]["name"] for loan in loans} == {reader.name}
+
+
+async def test__borrow_and_return_book__embed_included_book_and_reader(  # type: ignore[no-untyped-def]
+    auth_client, make_book, make_reader
+) -> None:
+    reader, book = await make_reader(), await make_book()
+
+    borrowed = await auth_client.post(
+        f"/library/readers/{reader.reader_id}/borrow/{book.book_id}", params={"include": "book"}
+    )
+    returned = await auth_client.post(
+        f"/library/readers/{reader.reader_id}/returns/{book.book_id}",
+        params={"include": "book,reader"},
+    )
+
+    assert borrowed.json()["data"]["book"]["title"] == book.title
+    assert borrowed.json()["data"]["reader"] is None
+    assert returned.json()["data"]["book"]["title"] == book.title
+    assert returned.json()["data"]["reader"]["name"] == reader.name
+    assert returned.json()["data"]["return_date"] is not None
+
+
+async def test__get_book__embeds_included_author(  # type: ignore[no-untyped-def]
+    auth_client, make_author, make_book
+) -> None:
+    author = await make_author()
+    book = await make_book(author_id=author.author_id)
+
+    response = await auth_client.get(f"/library/books/{book.book_id}", params={"include": "author"})
+    unknown = await auth_client.get(f"/library/books/{book.book_id}", params={"include": "reader"})
+
+    assert response.json()["data"]["author"] == {"name": author.name, "author_id": author.author_id}
+    assert unknown.status_code == 400
+    assert unknown.json()["error_name"] == "UnknownIncludeError"
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.monitoring.profiler import SamplingProfiler, to_collapsed, to_speedscope
+from app.web.exceptions import ProfilerBusyError
+
+
+def spin_thread(stop: threading.Event) -> None:
+    while not stop.is_set():
+        time.sleep(0.001)
+
+
+async def wait_in_task() -> None:
+    await asyncio.sleep(10)
+
+
+async def test__profile__captures_thread_and_task_stacks() -> None:
+    profiler = SamplingProfiler()
+    stop = threading.Event()
+    thread = threading.Thread(target=spin_thread, args=(stop,), name="spinner")
+    thread.start()
+    task = asyncio.create_task(wait_in_task())
+
+    stacks = await profiler.profile(duration=0.2, interval=0.01)
+    stop.set()
+    thread.join()
+    task.cancel()
+
+    collapsed = to_collapsed(stacks)
+    assert any(
+        line.startswith("thread spinner;") and "spin_thread" in line
+        for line in collapsed.splitlines()
+    )
+    assert any(
+        line.startswith("asyncio task;wait_in_task") for line in collapsed.splitlines()
+    )
+    speedscope = to_speedscope(stacks, 0.01, "test")
+    assert [profile["name"] for profile in speedscope["profiles"]] == [
+        "test - threads", "test - asyncio tasks"
+    ]
+    frames = speedscope["shared"]["frames"]
+    for profile in speedscope["profiles"]:
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert all(index < len(frames) for sample in profile["samples"] for index in sample)
+
+
+async def test__profile__only_one_profile_at_a_time() -> None:
+    profiler = SamplingProfiler()
+    running = asyncio.create_task(profiler.profile(duration=0.1, interval=0.01))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ProfilerBusyError):
+        await profiler.profile(duration=0.1, interval=0.01)
+    await running
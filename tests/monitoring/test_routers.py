@@ -0,0 +1,23 @@
+from fastapi import FastAPI
+from httpx import AsyncClient
+
+from app.store.store import Store
+
+
+async def test__readiness__reports_503_until_warmed_up(client: AsyncClient, store: Store) -> None:
+    not_ready = await client.get("/health/ready")
+    store.ready = True
+    ready = await client.get("/health/ready")
+
+    assert not_ready.status_code == 503
+    assert not_ready.json()["error_name"] == "ServiceNotReadyError"
+    assert ready.status_code == 200
+
+
+async def test__warm_up__leaves_primed_connections_in_pool(
+    app: FastAPI, store: Store
+) -> None:
+    # Through the app, so the hot queries run against the created schema
+    await store.database.warm_up(3, store.library_repo.warm_up)
+
+    assert store.database.engine.pool.checkedin() == 3
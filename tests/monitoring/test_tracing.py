@@ -0,0 +1,73 @@
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from asgi_lifespan import LifespanManager
+from fastapi import APIRouter, Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.monitoring.tracing import OtlpJsonFormatter, TracedRoute, Tracer, TracingMiddleware
+from app.web.config import Config
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+def make_tracer(sample_rate: float) -> Tracer:
+    config = Config(
+        DB_USER="user", DB_PASS="pass", DB_HOST="localhost", DB_PORT=5432, DB_NAME="db",
+        JWT_SECRET="secret", JWT_ALGORITHM="HS256", TRACE_SAMPLE_RATE=sample_rate,
+    )
+    return Tracer(config)
+
+
+def test__start_trace__honours_incoming_traceparent() -> None:
+    tracer = make_tracer(sample_rate=0.0)
+
+    sampled = tracer.start_trace("GET /", f"00-{TRACE_ID}-00f067aa0ba902b7-01")
+    unsampled = tracer.start_trace("GET /", f"00-{TRACE_ID}-00f067aa0ba902b7-00")
+    malformed = tracer.start_trace("GET /", "00-zz-00f067aa0ba902b7-01")
+
+    assert sampled is not None
+    assert sampled.trace.trace_id == TRACE_ID
+    assert sampled.parent_id == "00f067aa0ba902b7"
+    assert unsampled is None
+    assert malformed is None
+
+
+async def test__traced_route__records_request_phases() -> None:
+    tracer = make_tracer(sample_rate=1.0)
+    exported = []
+    tracer.finish_trace = lambda root: (root.end(), exported.extend(root.trace.spans))
+
+    def dependency() -> int:
+        return 1
+
+    router = APIRouter(route_class=TracedRoute)
+
+    @router.get("/items/{item_id}")
+    async def get_item(item_id: int, value: int = Depends(dependency)) -> dict[str, int]:
+        with tracer.span("repository"):
+            return {"item_id": item_id, "value": value}
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> None:  # noqa: RUF029
+        yield {"store": SimpleNamespace(tracer=tracer)}
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(TracingMiddleware)
+    app.include_router(router)
+    async with (
+        LifespanManager(app) as manager,
+        AsyncClient(transport=ASGITransport(app=manager.app), base_url="http://test") as client,
+    ):
+        response = await client.get("/items/5")
+
+    spans = {span.name: span for span in exported}
+    root = spans["GET /items/{item_id}"]
+    assert response.headers["traceparent"] == f"00-{root.trace.trace_id}-{root.span_id}-01"
+    assert {spans[name].parent_id for name in ("dependencies", "endpoint", "serialisation")} == {
+        root.span_id
+    }
+    assert spans["repository"].parent_id == spans["endpoint"].span_id
+    line = json.loads(OtlpJsonFormatter("library-api").format(SimpleNamespace(msg=exported)))
+    assert len(line["resourceSpans"][0]["scopeSpans"][0]["spans"]) == len(exported)
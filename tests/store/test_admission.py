@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app.store.admission import AdmissionController, Priority
+from app.web.exceptions import ServiceOverloadedError
+
+
+async def test__acquire__waiters_are_served_by_priority() -> None:
+    controller = AdmissionController(max_in_flight=1, max_queue=10, retry_after=1)
+    await controller.acquire(Priority.NORMAL, max_wait=1)
+    served = []
+
+    async def request(priority: Priority) -> None:
+        await controller.acquire(priority, max_wait=1)
+        served.append(priority)
+        controller.release()
+
+    tasks = [asyncio.create_task(request(p)) for p in (Priority.LOW, Priority.HIGH)]
+    await asyncio.sleep(0)
+    controller.release()
+    await asyncio.gather(*tasks)
+
+    assert served == [Priority.HIGH, Priority.LOW]
+    assert controller.in_flight == 0
+
+
+async def test__acquire__full_queue_sheds_lower_priority_waiter() -> None:
+    controller = AdmissionController(max_in_flight=1, max_queue=1, retry_after=3)
+    await controller.acquire(Priority.HIGH, max_wait=1)
+    low = asyncio.create_task(controller.acquire(Priority.LOW, max_wait=1))
+    await asyncio.sleep(0)
+
+    high = asyncio.create_task(controller.acquire(Priority.HIGH, max_wait=1))
+    await asyncio.sleep(0)
+    controller.release()
+    await high
+
+    with pytest.raises(ServiceOverloadedError) as exc:
+        await low
+    assert exc.value.headers == {"Retry-After": "3"}
+    assert controller.shed_total[Priority.LOW] == 1
+
+
+async def test__acquire__sheds_newcomer_when_queue_full_of_same_priority() -> None:
+    controller = AdmissionController(max_in_flight=1, max_queue=1, retry_after=1)
+    await controller.acquire(Priority.LOW, max_wait=1)
+    queued = asyncio.create_task(controller.acquire(Priority.LOW, max_wait=1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceOverloadedError):
+        await controller.acquire(Priority.LOW, max_wait=1)
+    assert controller.queue_depth == 1
+    queued.cancel()
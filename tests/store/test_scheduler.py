@@ -0,0 +1,20 @@
+from sqlalchemy import text
+
+from app.store.store import Store
+
+
+async def test__run_exclusive__skips_job_locked_by_another_process(app, store: Store) -> None:  # type: ignore[no-untyped-def]
+    runs = []
+
+    async def job(session) -> None:  # type: ignore[no-untyped-def]
+        runs.append(await session.scalar(text("SELECT 1")))
+
+    async with store.database.engine.connect() as other:
+        await other.execute(text("SELECT pg_advisory_lock(hashtext('scheduler:maintenance'))"))
+        skipped = await store.scheduler._run_exclusive("maintenance", job)
+        await other.execute(text("SELECT pg_advisory_unlock(hashtext('scheduler:maintenance'))"))
+        await other.commit()
+    ran = await store.scheduler._run_exclusive("maintenance", job)
+
+    assert (skipped, ran) == (False, True)
+    assert runs == [1]
@@ -0,0 +1,59 @@
+import json
+import logging
+import queue
+
+from app.web.logger import (
+    ContextQueueHandler,
+    JsonFormatter,
+    RequestLogContext,
+    request_log_context,
+)
+
+
+def make_record(level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("app.test", level, __file__, 1, "Book [%s] added", (7,), None)
+
+
+def test__context_queue_handler__attaches_request_context_to_json_line() -> None:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    context = RequestLogContext("req-1")
+    context.route, context.admin_id = "POST /library/books", 3
+    token = request_log_context.set(context)
+
+    ContextQueueHandler(log_queue).handle(make_record())
+    request_log_context.reset(token)
+    line = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+
+    assert line["message"] == "Book [7] added"
+    assert line["request_id"] == "req-1"
+    assert line["route"] == "POST /library/books"
+    assert line["admin_id"] == 3
+
+
+def test__context_queue_handler__samples_info_but_keeps_warnings() -> None:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ContextQueueHandler(log_queue, info_sample_rate=0.0)
+
+    handler.handle(make_record(logging.INFO))
+    handler.handle(make_record(logging.WARNING))
+
+    assert log_queue.qsize() == 1
+    assert log_queue.get_nowait().levelno == logging.WARNING
+
+
+def test__context_queue_handler__applies_filters_and_merges_args_before_queueing() -> None:
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = ContextQueueHandler(log_queue)
+    handler.addFilter(lambda record: record.levelno >= logging.WARNING)
+    titles = ["Dune"]
+    record = logging.LogRecord(
+        "app.test", logging.WARNING, __file__, 1, "Titles %s", (titles,), None
+    )
+
+    handler.handle(make_record(logging.INFO))
+    handler.handle(record)
+    titles.append("Solaris")
+    line = json.loads(JsonFormatter().format(log_queue.get_nowait()))
+
+    assert line["message"] == "Titles ['Dune']"
+    assert log_queue.empty()